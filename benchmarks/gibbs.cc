@@ -0,0 +1,134 @@
+// Copyright (c) 2014, Salesforce.com, Inc.  All rights reserved.
+//
+// Redistribution and use in source and binary forms, with or without
+// modification, are permitted provided that the following conditions
+// are met:
+//
+// - Redistributions of source code must retain the above copyright
+//   notice, this list of conditions and the following disclaimer.
+// - Redistributions in binary form must reproduce the above copyright
+//   notice, this list of conditions and the following disclaimer in the
+//   documentation and/or other materials provided with the distribution.
+// - Neither the name of Salesforce.com nor the names of its contributors
+//   may be used to endorse or promote products derived from this
+//   software without specific prior written permission.
+//
+// THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+// "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+// LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+// FOR A PARTICULAR PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE
+// COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+// INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+// BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS
+// OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+// ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR
+// TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
+// USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#include <iostream>
+#include <iomanip>
+#include <algorithm>
+#include <thread>  // NOLINT(*)
+#include <vector>
+#include <distributions/random.hpp>
+#include <distributions/clustering.hpp>
+#include <distributions/gibbs.hpp>
+#include <distributions/models/nich.hpp>
+#include <distributions/timers.hpp>
+
+using namespace distributions;  // NOLINT(*)
+
+typedef Clustering<int>::PitmanYor Clustering_;
+typedef NormalInverseChiSq Feature;
+
+rng_t rng;
+
+void speedtest(
+        size_t row_count,
+        size_t feature_count,
+        size_t thread_count,
+        size_t passes) {
+    Clustering_ clustering;
+    clustering.alpha = 1.0;
+    clustering.d = 0.1;
+
+    const size_t empty_group_count = 10;
+    Clustering_::Mixture mixture;
+    mixture.counts() = std::vector<int>(empty_group_count, 0);
+    mixture.init(clustering);
+    MixtureIdTracker id_tracker;
+    id_tracker.init(empty_group_count);
+
+    const auto shared = Feature::Shared::EXAMPLE();
+    std::vector<Feature::Mixture> feature_mixtures(feature_count);
+    std::vector<std::vector<Feature::Value>> columns(feature_count);
+    std::vector<MixtureFeature *> features;
+    for (size_t f = 0; f < feature_count; ++f) {
+        Feature::Mixture & feature_mixture = feature_mixtures[f];
+        feature_mixture.init(shared, rng);
+        for (size_t i = 0; i < empty_group_count; ++i) {
+            feature_mixture.add_group(shared, rng);
+        }
+        for (size_t i = 0; i < row_count; ++i) {
+            columns[f].push_back(sample_std_normal(rng));
+        }
+        features.push_back(new MixtureFeature_<Feature>(
+            shared,
+            feature_mixture,
+            columns[f].data(),
+            row_count));
+    }
+
+    std::vector<MixtureIdTracker::Id> assignments(row_count);
+    gibbs_init(
+        clustering,
+        mixture,
+        id_tracker,
+        features,
+        row_count,
+        assignments.data(),
+        thread_count,
+        rng);
+
+    int64_t time = -current_time_us();
+    for (size_t i = 0; i < passes; ++i) {
+        gibbs_pass(
+            clustering,
+            mixture,
+            id_tracker,
+            features,
+            row_count,
+            assignments.data(),
+            thread_count,
+            rng);
+    }
+    time += current_time_us();
+    double rows_per_sec = passes * row_count / (time * 1e-6);
+
+    std::cout <<
+        feature_count << '\t' <<
+        thread_count << '\t' <<
+        std::right << std::setw(6) << mixture.counts().size() << '\t' <<
+        std::right << std::setw(12) << std::fixed << std::setprecision(1) <<
+        rows_per_sec << '\n';
+
+    for (auto * feature : features) {
+        delete feature;
+    }
+}
+
+int main() {
+    const size_t row_count = 10000;
+    const size_t passes = 10;
+    const size_t max_thread_count =
+        std::max(1U, std::thread::hardware_concurrency());
+    std::cout << "Features\tThreads\tGroups\tRows/sec\n";
+    for (size_t feature_count = 1; feature_count <= 64; feature_count *= 4) {
+        for (size_t thread_count = 1;
+                thread_count <= max_thread_count;
+                thread_count *= 2) {
+            speedtest(row_count, feature_count, thread_count, passes);
+        }
+    }
+
+    return 0;
+}
@@ -28,6 +28,7 @@
 #include <iostream>
 #include <iomanip>
 #include <typeinfo>
+#include <vector>
 #include <distributions/vector.hpp>
 #include <distributions/models/bb.hpp>
 #include <distributions/models/dd.hpp>
@@ -25,6 +25,8 @@
 // TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
 // USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+#include <vector>
+#include <algorithm>
 #include <iostream>
 #include <iomanip>
 #include <cstdio>
@@ -46,7 +48,12 @@ inline int max(const std::vector<int> & counts) {
     return result;
 }
 
-size_t speedtest(size_t size, size_t iters, float alpha, float d) {
+size_t speedtest(
+        size_t size,
+        size_t iters,
+        float alpha,
+        float d,
+        bool sublinear) {
     Clustering<int>::PitmanYor model;
     model.alpha = alpha;
     model.d = d;
@@ -58,7 +65,10 @@ size_t speedtest(size_t size, size_t iters, float alpha, float d) {
     size_t bogus = 0;
     double total_cats = 0;
     for (size_t i = 0; i < iters; ++i) {
-        total_cats += max(model.sample_assignments(size, rng));
+        total_cats += max(
+            sublinear
+            ? model.sample_assignments_sublinear(size, rng)
+            : model.sample_assignments(size, rng));
     }
 
     time += current_time_us();
@@ -79,16 +89,18 @@ size_t speedtest(size_t size, size_t iters, float alpha, float d) {
 int main(int argc, char ** argv) {
     float alpha = (argc > 1) ? atof(argv[1]) : 1.0f;
     float d = (argc > 2) ? atof(argv[2]) : 0.2f;
+    bool sublinear = (argc > 3) ? atoi(argv[3]) : false;
 
     std::cout << "size" << '\t' << "cats" << '\t' << "samples/sec";
-    std::cout << " (alpha = " << alpha << ", d = " << d << ")\n";
+    std::cout << " (alpha = " << alpha << ", d = " << d;
+    std::cout << ", sublinear = " << sublinear << ")\n";
 
     size_t min_exponent = 3;
     size_t max_exponent = 6;
     for (size_t i = min_exponent; i <= max_exponent; ++i) {
         size_t size = size_t(round(pow(10, i)));
         size_t iters = 10000000 / size;
-        speedtest(size, iters, alpha, d);
+        speedtest(size, iters, alpha, d, sublinear);
     }
 
     return 0;
@@ -153,9 +153,7 @@ class Shared(SharedMixin, SharedIoMixin):
             del self.counts[value]
             self.beta0 += self.betas.pop(value)
 
-    def realize(self):
-        max_size = 10000
-        min_beta0 = 1e-4
+    def realize(self, max_size=10000, min_beta0=1e-4):
         new_value = 1 + max(self.betas.iterkeys()) if self.betas else 0
         while len(self.betas) < max_size - 1 and self.beta0 > min_beta0:
             self.add_value(new_value)
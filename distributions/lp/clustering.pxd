@@ -0,0 +1,147 @@
+# Copyright (c) 2014, Salesforce.com, Inc.  All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# - Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# - Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# - Neither the name of Salesforce.com nor the names of its contributors
+#   may be used to endorse or promote products derived from this
+#   software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS
+# OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR
+# TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
+# USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from libcpp.vector cimport vector
+from libcpp.utility cimport pair
+from distributions.rng_cc cimport rng_t
+from distributions.lp.vector cimport VectorFloat, AlignedFloats
+
+
+cdef extern from 'distributions/mixture.hpp':
+    cppclass IdSet "distributions::MixtureIdSet":
+        const size_t * data() nogil
+        size_t size() nogil
+
+
+cdef extern from 'distributions/clustering.hpp':
+    cppclass Assignments "distributions::Clustering<int>::Assignments":
+        Assignments() nogil except +
+        cppclass iterator:
+            pair[int, int] & operator*() nogil
+            iterator operator++() nogil
+            bint operator!=(iterator) nogil
+        int & operator[](int) nogil
+        iterator begin() nogil
+        iterator end() nogil
+
+    ctypedef vector[pair[int, int]] CountHistogram \
+            "distributions::Clustering<int>::CountHistogram"
+
+    cdef vector[int] count_assignments_cc \
+            "distributions::Clustering<int>::count_assignments" \
+            (Assignments & assignments) nogil except +
+
+    cdef vector[int] count_assignments_array_cc \
+            "distributions::Clustering<int>::count_assignments" \
+            (
+                size_t size,
+                int * assignments,
+                int * weights,
+                int * packed_assignments,
+                vector[int] * relabel) nogil except +
+
+    cppclass PitmanYor_cc "distributions::Clustering<int>::PitmanYor":
+        float alpha
+        float d
+        vector[int] sample_assignments(int size, rng_t & rng) nogil except +
+        vector[int] sample_assignments_sublinear \
+            (int size, rng_t & rng) nogil except +
+        cppclass Mixture:
+            size_t size "counts().size" () nogil except +
+            IdSet & empty_groupids () nogil except +
+            void set_counts "counts() = " (vector[int] &) nogil except +
+            void init (PitmanYor_cc &) nogil except +
+            bint add_value (PitmanYor_cc &, size_t) nogil except +
+            bint remove_value (PitmanYor_cc &, size_t) nogil except +
+            void score_value (PitmanYor_cc &, VectorFloat &) nogil except +
+            void score_value (PitmanYor_cc &, AlignedFloats) nogil except +
+            float score_data (PitmanYor_cc &) nogil except +
+        float score_counts(vector[int] & counts) nogil except +
+        float score_counts(size_t size, int * counts) nogil except +
+        float score_count_histogram(CountHistogram &) nogil except +
+        float score_add_value (
+                int group_size,
+                int nonempty_group_count,
+                int sample_size,
+                int empty_group_count) nogil except +
+        float score_remove_value (
+                int group_size,
+                int nonempty_group_count,
+                int sample_size,
+                int empty_group_count) nogil except +
+
+    cppclass LowEntropy_cc "distributions::Clustering<int>::LowEntropy":
+        int dataset_size
+        vector[int] sample_assignments(int size, rng_t & rng) nogil except +
+        cppclass Mixture:
+            size_t size "counts().size" () nogil except +
+            IdSet & empty_groupids () nogil except +
+            void set_counts "counts() = " (vector[int] &) nogil except +
+            void init (LowEntropy_cc &) nogil except +
+            bint add_value (LowEntropy_cc &, size_t) nogil except +
+            bint remove_value (LowEntropy_cc &, size_t) nogil except +
+            void score_value (LowEntropy_cc &, VectorFloat &) nogil except +
+            void score_value (LowEntropy_cc &, AlignedFloats) nogil except +
+            float score_data (LowEntropy_cc &) nogil except +
+        float score_counts(vector[int] & counts) nogil except +
+        float score_counts(size_t size, int * counts) nogil except +
+        float score_count_histogram(CountHistogram &) nogil except +
+        float score_add_value (
+                int group_size,
+                int nonempty_group_count,
+                int sample_size,
+                int empty_group_count) nogil except +
+        float score_remove_value (
+                int group_size,
+                int nonempty_group_count,
+                int sample_size,
+                int empty_group_count) nogil except +
+
+
+cdef extern from 'distributions/cython.hpp' namespace 'distributions':
+    void mixture_score_value \
+        (PitmanYor_cc.Mixture &, PitmanYor_cc &, float *, size_t) \
+        nogil except +
+    void mixture_score_value \
+        (LowEntropy_cc.Mixture &, LowEntropy_cc &, float *, size_t) \
+        nogil except +
+
+
+cdef class PitmanYor_cy:
+    cdef PitmanYor_cc * ptr
+
+
+cdef class PitmanYorMixture:
+    cdef PitmanYor_cc.Mixture * ptr
+
+
+cdef class LowEntropy_cy:
+    cdef LowEntropy_cc * ptr
+
+
+cdef class LowEntropyMixture:
+    cdef LowEntropy_cc.Mixture * ptr
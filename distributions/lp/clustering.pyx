@@ -25,98 +25,19 @@
 # TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
 # USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-from libcpp.vector cimport vector
-from libcpp.utility cimport pair
 cimport numpy
+import numpy
 numpy.import_array()
 from cython import address
 from cython.operator cimport dereference as deref, preincrement as inc
-from distributions.rng_cc cimport rng_t
 from distributions.global_rng cimport get_rng
-from distributions.lp.vector cimport VectorFloat, vector_float_to_ndarray
+from distributions.lp.vector cimport (
+    ndarray_is_aligned,
+    vector_float_to_ndarray,
+)
 from distributions.mixins import SharedIoMixin
 
 
-cdef extern from 'distributions/mixture.hpp':
-    cppclass IdSet \
-            "std::unordered_set<size_t, distributions::TrivialHash<size_t>>":
-        cppclass iterator "const_iterator":
-            size_t & operator*()
-            iterator operator++() nogil
-            bint operator!=(iterator) nogil
-        iterator begin() nogil
-        iterator end() nogil
-
-
-cdef extern from 'distributions/clustering.hpp':
-    cppclass Assignments "distributions::Clustering<int>::Assignments":
-        Assignments() nogil except +
-        cppclass iterator:
-            pair[int, int] & operator*() nogil
-            iterator operator++() nogil
-            bint operator!=(iterator) nogil
-        int & operator[](int) nogil
-        iterator begin() nogil
-        iterator end() nogil
-
-    cdef vector[int] count_assignments_cc \
-            "distributions::Clustering<int>::count_assignments" \
-            (Assignments & assignments) nogil except +
-
-    cppclass PitmanYor_cc "distributions::Clustering<int>::PitmanYor":
-        float alpha
-        float d
-        vector[int] sample_assignments(int size, rng_t & rng) nogil except +
-        cppclass Mixture:
-            size_t size "counts().size" () nogil except +
-            IdSet.iterator empty_groupids_begin \
-                    "empty_groupids().begin" () nogil except +
-            IdSet.iterator empty_groupids_end \
-                    "empty_groupids().end" () nogil except +
-            void set_counts "counts() = " (vector[int] &) nogil except +
-            void init (PitmanYor_cc &) nogil except +
-            bint add_value (PitmanYor_cc &, size_t) nogil except +
-            bint remove_value (PitmanYor_cc &, size_t) nogil except +
-            void score_value (PitmanYor_cc &, VectorFloat &) nogil except +
-        float score_counts(vector[int] & counts) nogil except +
-        float score_add_value (
-                int group_size,
-                int nonempty_group_count,
-                int sample_size,
-                int empty_group_count) nogil except +
-        float score_remove_value (
-                int group_size,
-                int nonempty_group_count,
-                int sample_size,
-                int empty_group_count) nogil except +
-
-    cppclass LowEntropy_cc "distributions::Clustering<int>::LowEntropy":
-        int dataset_size
-        vector[int] sample_assignments(int size, rng_t & rng) nogil except +
-        cppclass Mixture:
-            size_t size "counts().size" () nogil except +
-            IdSet.iterator empty_groupids_begin \
-                    "empty_groupids().begin" () nogil except +
-            IdSet.iterator empty_groupids_end \
-                    "empty_groupids().end" () nogil except +
-            void set_counts "counts() = " (vector[int] &) nogil except +
-            void init (LowEntropy_cc &) nogil except +
-            bint add_value (LowEntropy_cc &, size_t) nogil except +
-            bint remove_value (LowEntropy_cc &, size_t) nogil except +
-            void score_value (LowEntropy_cc &, VectorFloat &) nogil except +
-        float score_counts(vector[int] & counts) nogil except +
-        float score_add_value (
-                int group_size,
-                int nonempty_group_count,
-                int sample_size,
-                int empty_group_count) nogil except +
-        float score_remove_value (
-                int group_size,
-                int nonempty_group_count,
-                int sample_size,
-                int empty_group_count) nogil except +
-
-
 cpdef list count_assignments(dict assignments):
     cdef Assignments assignments_cc
     cdef int value_id
@@ -136,11 +57,77 @@ cdef dict dump_assignments(Assignments & assignments):
     return raw
 
 
+cdef CountHistogram _count_histogram(dict histogram):
+    cdef CountHistogram histogram_cc
+    cdef int group_size
+    cdef int group_count
+    for group_size, group_count in sorted(histogram.iteritems()):
+        histogram_cc.push_back(pair[int, int](group_size, group_count))
+    return histogram_cc
+
+
+cdef numpy.ndarray _empty_groupids(IdSet & ids):
+    cdef size_t size = ids.size()
+    cdef const size_t * data = ids.data()
+    cdef numpy.ndarray[numpy.int64_t, ndim=1, mode='c'] result = \
+        numpy.empty(size, dtype=numpy.int64)
+    cdef size_t i
+    for i in xrange(size):
+        result[i] = data[i]
+    return result
+
+
+cdef numpy.ndarray _vector_int_to_ndarray(vector[int] & values):
+    cdef size_t size = values.size()
+    cdef numpy.ndarray[numpy.int32_t, ndim=1, mode='c'] result = \
+        numpy.empty(size, dtype=numpy.int32)
+    cdef size_t i
+    for i in xrange(size):
+        result[i] = values[i]
+    return result
+
+
+def count_assignments_array(assignments, weights=None, bint relabel=False):
+    '''
+    Count group sizes of an int32 assignment array, relabeling groups to
+    contiguous ids in order of original groupid, in a single C++ call.
+    Optional weights give the count of each row (default 1).
+
+    Returns (counts, packed_assignments), plus relabel_map if relabel=True,
+    where relabel_map[packed_groupid] = original_groupid.
+    '''
+    cdef numpy.ndarray[numpy.int32_t, ndim=1, mode='c'] assignments_array = \
+        numpy.ascontiguousarray(assignments, dtype=numpy.int32)
+    cdef size_t size = assignments_array.shape[0]
+    cdef numpy.ndarray[numpy.int32_t, ndim=1, mode='c'] packed = \
+        numpy.empty(size, dtype=numpy.int32)
+    cdef numpy.ndarray[numpy.int32_t, ndim=1, mode='c'] weights_array
+    cdef int * weights_data = NULL
+    if weights is not None:
+        weights_array = numpy.ascontiguousarray(weights, dtype=numpy.int32)
+        assert len(weights_array) == size, 'weights have wrong length'
+        weights_data = <int *> weights_array.data
+    cdef vector[int] relabel_cc
+    cdef vector[int] * relabel_ptr = NULL
+    if relabel:
+        relabel_ptr = &relabel_cc
+    cdef vector[int] counts_cc = count_assignments_array_cc(
+        size,
+        <int *> assignments_array.data,
+        weights_data,
+        <int *> packed.data,
+        relabel_ptr)
+    cdef numpy.ndarray counts = _vector_int_to_ndarray(counts_cc)
+    if relabel:
+        return counts, packed, _vector_int_to_ndarray(relabel_cc)
+    else:
+        return counts, packed
+
+
 #-----------------------------------------------------------------------------
 # Pitman-Yor
 
 cdef class PitmanYor_cy:
-    cdef PitmanYor_cc * ptr
     def __cinit__(self):
         self.ptr = new PitmanYor_cc()
     def __dealloc__(self):
@@ -175,13 +162,44 @@ cdef class PitmanYor_cy:
             'd': self.ptr.d,
         }
 
-    def sample_assignments(self, int size):
-        cdef list assignments = self.ptr.sample_assignments(size, get_rng()[0])
-        return assignments
+    def sample_assignments(self, int size, bint sublinear=False):
+        '''
+        Sample an assignment vector of given size, as a numpy int32 array.
+        Set sublinear=True to sample tables in O(log(table_count)) time,
+        which is faster for very large sizes when d > 0.
+        '''
+        cdef vector[int] assignments
+        if sublinear:
+            assignments = self.ptr.sample_assignments_sublinear(
+                size,
+                get_rng()[0])
+        else:
+            assignments = self.ptr.sample_assignments(size, get_rng()[0])
+        return _vector_int_to_ndarray(assignments)
+
+    def score_counts(self, counts):
+        '''
+        Score a list or numpy array of group sizes.
+        '''
+        cdef numpy.ndarray[numpy.int32_t, ndim=1, mode='c'] counts_array
+        cdef vector[int] counts_cc
+        cdef float score
+        if isinstance(counts, numpy.ndarray):
+            counts_array = numpy.ascontiguousarray(counts, dtype=numpy.int32)
+            score = self.ptr.score_counts(
+                counts_array.shape[0],
+                <int *> counts_array.data)
+        else:
+            counts_cc = counts
+            score = self.ptr.score_counts(counts_cc)
+        return score
 
-    def score_counts(self, list counts):
-        cdef vector[int] counts_cc = counts
-        cdef float score = self.ptr.score_counts(counts_cc)
+    def score_count_histogram(self, dict histogram):
+        '''
+        Score a dict mapping group_size -> number of groups of that size.
+        '''
+        cdef CountHistogram histogram_cc = _count_histogram(histogram)
+        cdef float score = self.ptr.score_count_histogram(histogram_cc)
         return score
 
     def score_add_value(
@@ -218,7 +236,6 @@ cdef class PitmanYor_cy:
 
 
 cdef class PitmanYorMixture:
-    cdef PitmanYor_cc.Mixture * ptr
     def __cinit__(self):
         self.ptr = new PitmanYor_cc.Mixture()
     def __dealloc__(self):
@@ -229,14 +246,13 @@ cdef class PitmanYorMixture:
 
     property empty_groupids:
         def __get__(self):
-            cdef PitmanYor_cc.Mixture * ptr = self.ptr
-            cdef IdSet.iterator i = ptr.empty_groupids_begin()
-            cdef IdSet.iterator end = ptr.empty_groupids_end()
-            while i != end:
-                yield deref(i)
-                inc(i)
-
-    def init(self, PitmanYor_cy model, list counts):
+            return _empty_groupids(self.ptr.empty_groupids())
+
+    def init(self, PitmanYor_cy model, counts):
+        '''
+        Initialize from a list or array of group sizes, including at least
+        one empty group.
+        '''
         cdef vector[int] counts_cc = counts
         self.ptr.set_counts(counts_cc)
         self.ptr.init(model.ptr[0])
@@ -247,14 +263,24 @@ cdef class PitmanYorMixture:
     def remove_value(self, PitmanYor_cy model, int groupid):
         return self.ptr.remove_value(model.ptr[0], groupid)
 
+    def score_data(self, PitmanYor_cy model):
+        return self.ptr.score_data(model.ptr[0])
+
     def score_value(
             self,
             PitmanYor_cy model,
             numpy.ndarray[numpy.float32_t, ndim=1] scores):
         cdef VectorFloat scores_cc
-        scores_cc.resize(self.ptr.size())
-        self.ptr.score_value(model.ptr[0], scores_cc)
-        vector_float_to_ndarray(scores_cc, scores)
+        if ndarray_is_aligned(scores) and len(scores) == self.ptr.size():
+            mixture_score_value(
+                self.ptr[0],
+                model.ptr[0],
+                <float *> scores.data,
+                len(scores))
+        else:
+            scores_cc.resize(self.ptr.size())
+            self.ptr.score_value(model.ptr[0], scores_cc)
+            vector_float_to_ndarray(scores_cc, scores)
 
 
 class PitmanYor(PitmanYor_cy, SharedIoMixin):
@@ -275,7 +301,6 @@ class PitmanYor(PitmanYor_cy, SharedIoMixin):
 # Low Entropy
 
 cdef class LowEntropy_cy:
-    cdef LowEntropy_cc * ptr
     def __cinit__(self):
         self.ptr = new LowEntropy_cc()
     def __dealloc__(self):
@@ -300,12 +325,33 @@ cdef class LowEntropy_cy:
         return {'dataset_size': self.ptr.dataset_size}
 
     def sample_assignments(self, int size):
-        cdef list assignments = self.ptr.sample_assignments(size, get_rng()[0])
-        return assignments
+        cdef vector[int] assignments = \
+            self.ptr.sample_assignments(size, get_rng()[0])
+        return _vector_int_to_ndarray(assignments)
+
+    def score_counts(self, counts):
+        '''
+        Score a list or numpy array of group sizes.
+        '''
+        cdef numpy.ndarray[numpy.int32_t, ndim=1, mode='c'] counts_array
+        cdef vector[int] counts_cc
+        cdef float score
+        if isinstance(counts, numpy.ndarray):
+            counts_array = numpy.ascontiguousarray(counts, dtype=numpy.int32)
+            score = self.ptr.score_counts(
+                counts_array.shape[0],
+                <int *> counts_array.data)
+        else:
+            counts_cc = counts
+            score = self.ptr.score_counts(counts_cc)
+        return score
 
-    def score_counts(self, list counts):
-        cdef vector[int] counts_cc = counts
-        cdef float score = self.ptr.score_counts(counts_cc)
+    def score_count_histogram(self, dict histogram):
+        '''
+        Score a dict mapping group_size -> number of groups of that size.
+        '''
+        cdef CountHistogram histogram_cc = _count_histogram(histogram)
+        cdef float score = self.ptr.score_count_histogram(histogram_cc)
         return score
 
     def score_add_value(
@@ -341,7 +387,6 @@ cdef class LowEntropy_cy:
 
 
 cdef class LowEntropyMixture:
-    cdef LowEntropy_cc.Mixture * ptr
     def __cinit__(self):
         self.ptr = new LowEntropy_cc.Mixture()
     def __dealloc__(self):
@@ -352,14 +397,13 @@ cdef class LowEntropyMixture:
 
     property empty_groupids:
         def __get__(self):
-            cdef LowEntropy_cc.Mixture * ptr = self.ptr
-            cdef IdSet.iterator i = ptr.empty_groupids_begin()
-            cdef IdSet.iterator end = ptr.empty_groupids_end()
-            while i != end:
-                yield deref(i)
-                inc(i)
-
-    def init(self, LowEntropy_cy model, list counts):
+            return _empty_groupids(self.ptr.empty_groupids())
+
+    def init(self, LowEntropy_cy model, counts):
+        '''
+        Initialize from a list or array of group sizes, including at least
+        one empty group.
+        '''
         cdef vector[int] counts_cc = counts
         self.ptr.set_counts(counts_cc)
         self.ptr.init(model.ptr[0])
@@ -370,14 +414,24 @@ cdef class LowEntropyMixture:
     def remove_value(self, LowEntropy_cy model, int groupid):
         return self.ptr.remove_value(model.ptr[0], groupid)
 
+    def score_data(self, LowEntropy_cy model):
+        return self.ptr.score_data(model.ptr[0])
+
     def score_value(
             self,
             LowEntropy_cy model,
             numpy.ndarray[numpy.float32_t, ndim=1] scores):
         cdef VectorFloat scores_cc
-        scores_cc.resize(self.ptr.size())
-        self.ptr.score_value(model.ptr[0], scores_cc)
-        vector_float_to_ndarray(scores_cc, scores)
+        if ndarray_is_aligned(scores) and len(scores) == self.ptr.size():
+            mixture_score_value(
+                self.ptr[0],
+                model.ptr[0],
+                <float *> scores.data,
+                len(scores))
+        else:
+            scores_cc.resize(self.ptr.size())
+            self.ptr.score_value(model.ptr[0], scores_cc)
+            vector_float_to_ndarray(scores_cc, scores)
 
 
 class LowEntropy(LowEntropy_cy, SharedIoMixin):
@@ -0,0 +1,66 @@
+# Copyright (c) 2014, Salesforce.com, Inc.  All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# - Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# - Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# - Neither the name of Salesforce.com nor the names of its contributors
+#   may be used to endorse or promote products derived from this
+#   software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS
+# OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR
+# TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
+# USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from libc.stdint cimport uint32_t
+from libcpp.vector cimport vector
+from distributions.rng_cc cimport rng_t
+
+
+cdef extern from "distributions/mixture.hpp":
+    cppclass MixtureIdTracker_cc "distributions::MixtureIdTracker":
+        void init (size_t group_count) nogil except +
+        void add_group () nogil except +
+        void remove_group (uint32_t packed) nogil except +
+        uint32_t packed_to_global (uint32_t packed) nogil except +
+        uint32_t global_to_packed (uint32_t packed) nogil except +
+        void packed_to_global (
+                size_t size,
+                const uint32_t * packed,
+                uint32_t * global_) nogil except +
+        void global_to_packed (
+                size_t size,
+                const uint32_t * global_,
+                uint32_t * packed) nogil except +
+        void compact () nogil except +
+        size_t packed_size () nogil except +
+        size_t global_size () nogil except +
+        size_t index_size () nogil except +
+
+
+cdef extern from "distributions/gibbs.hpp":
+    cppclass MixtureFeature_cc "distributions::MixtureFeature":
+        size_t row_count () nogil except +
+        size_t group_count () nogil except +
+
+
+cdef class MixtureIdTracker:
+    cdef MixtureIdTracker_cc * ptr
+
+
+cdef class MixtureFeature:
+    cdef MixtureFeature_cc * ptr
+    cdef tuple refs
@@ -25,20 +25,99 @@
 # TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
 # USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-from libc.stdint cimport uint32_t
+from libcpp.string cimport string
+cimport numpy
+import numpy
+numpy.import_array()
+from distributions.global_rng cimport get_rng
+from distributions.lp.clustering cimport (
+    PitmanYor_cc,
+    PitmanYor_cy,
+    PitmanYorMixture,
+    LowEntropy_cc,
+    LowEntropy_cy,
+    LowEntropyMixture,
+)
 
 
-cdef extern from "distributions/mixture.hpp":
-    cppclass MixtureIdTracker_cc "distributions::MixtureIdTracker":
-        void init (size_t group_count) nogil except +
-        void add_group () nogil except +
-        void remove_group (uint32_t packed) nogil except +
-        uint32_t packed_to_global (uint32_t packed) nogil except +
-        uint32_t global_to_packed (uint32_t packed) nogil except +
+cdef extern from "distributions/gibbs.hpp":
+    void pitman_yor_gibbs_init "distributions::gibbs_init" (
+            PitmanYor_cc &,
+            PitmanYor_cc.Mixture &,
+            MixtureIdTracker_cc &,
+            vector[MixtureFeature_cc *] &,
+            size_t,
+            uint32_t *,
+            size_t,
+            rng_t &) nogil except +
+    void pitman_yor_gibbs_pass "distributions::gibbs_pass" (
+            PitmanYor_cc &,
+            PitmanYor_cc.Mixture &,
+            MixtureIdTracker_cc &,
+            vector[MixtureFeature_cc *] &,
+            size_t,
+            uint32_t *,
+            size_t,
+            rng_t &) nogil except +
+    void low_entropy_gibbs_init "distributions::gibbs_init" (
+            LowEntropy_cc &,
+            LowEntropy_cc.Mixture &,
+            MixtureIdTracker_cc &,
+            vector[MixtureFeature_cc *] &,
+            size_t,
+            uint32_t *,
+            size_t,
+            rng_t &) nogil except +
+    void low_entropy_gibbs_pass "distributions::gibbs_pass" (
+            LowEntropy_cc &,
+            LowEntropy_cc.Mixture &,
+            MixtureIdTracker_cc &,
+            vector[MixtureFeature_cc *] &,
+            size_t,
+            uint32_t *,
+            size_t,
+            rng_t &) nogil except +
+    size_t pitman_yor_split_merge_pass "distributions::split_merge_pass" (
+            PitmanYor_cc &,
+            PitmanYor_cc.Mixture &,
+            MixtureIdTracker_cc &,
+            vector[MixtureFeature_cc *] &,
+            size_t,
+            uint32_t *,
+            size_t,
+            rng_t &) nogil except +
+    size_t low_entropy_split_merge_pass "distributions::split_merge_pass" (
+            LowEntropy_cc &,
+            LowEntropy_cc.Mixture &,
+            MixtureIdTracker_cc &,
+            vector[MixtureFeature_cc *] &,
+            size_t,
+            uint32_t *,
+            size_t,
+            rng_t &) nogil except +
+    void pitman_yor_checkpoint_dump "distributions::checkpoint_dump" (
+            string &,
+            PitmanYor_cc.Mixture &,
+            MixtureIdTracker_cc &,
+            vector[MixtureFeature_cc *] &) nogil except +
+    void pitman_yor_checkpoint_load "distributions::checkpoint_load" (
+            string &,
+            PitmanYor_cc.Mixture &,
+            MixtureIdTracker_cc &,
+            vector[MixtureFeature_cc *] &) nogil except +
+    void low_entropy_checkpoint_dump "distributions::checkpoint_dump" (
+            string &,
+            LowEntropy_cc.Mixture &,
+            MixtureIdTracker_cc &,
+            vector[MixtureFeature_cc *] &) nogil except +
+    void low_entropy_checkpoint_load "distributions::checkpoint_load" (
+            string &,
+            LowEntropy_cc.Mixture &,
+            MixtureIdTracker_cc &,
+            vector[MixtureFeature_cc *] &) nogil except +
 
 
 cdef class MixtureIdTracker:
-    cdef MixtureIdTracker_cc * ptr
     def __cinit__(self):
         self.ptr = new MixtureIdTracker_cc()
     def __dealloc__(self):
@@ -58,3 +137,293 @@ cdef class MixtureIdTracker:
 
     def global_to_packed(self, int global_):
         return self.ptr.global_to_packed(global_)
+
+    def packed_to_global_many(
+            self,
+            numpy.ndarray[numpy.int32_t, ndim=1, mode='c'] packed):
+        cdef numpy.ndarray[numpy.int32_t, ndim=1, mode='c'] global_ = \
+            numpy.empty_like(packed)
+        cdef size_t size = packed.shape[0]
+        cdef uint32_t * packed_data = <uint32_t *> packed.data
+        cdef uint32_t * global_data = <uint32_t *> global_.data
+        with nogil:
+            self.ptr.packed_to_global(size, packed_data, global_data)
+        return global_
+
+    def global_to_packed_many(
+            self,
+            numpy.ndarray[numpy.int32_t, ndim=1, mode='c'] global_):
+        cdef numpy.ndarray[numpy.int32_t, ndim=1, mode='c'] packed = \
+            numpy.empty_like(global_)
+        cdef size_t size = global_.shape[0]
+        cdef uint32_t * global_data = <uint32_t *> global_.data
+        cdef uint32_t * packed_data = <uint32_t *> packed.data
+        with nogil:
+            self.ptr.global_to_packed(size, global_data, packed_data)
+        return packed
+
+    def compact(self):
+        self.ptr.compact()
+
+    property packed_size:
+        def __get__(self):
+            return self.ptr.packed_size()
+
+    property global_size:
+        def __get__(self):
+            return self.ptr.global_size()
+
+    property index_size:
+        def __get__(self):
+            return self.ptr.index_size()
+
+
+cdef class MixtureFeature:
+    '''
+    A feature Mixture bound to its Shared model and a column of values,
+    as created by Mixture.bind(shared, values).
+    '''
+    def __cinit__(self):
+        self.ptr = NULL
+
+    def __dealloc__(self):
+        del self.ptr
+
+    def __len__(self):
+        return self.ptr.row_count()
+
+
+cdef void _gibbs(
+        bint init,
+        model,
+        mixture,
+        MixtureIdTracker id_tracker,
+        list features,
+        numpy.ndarray[numpy.int32_t, ndim=1, mode='c'] assignments,
+        size_t thread_count) except *:
+    assert thread_count > 0, 'invalid thread_count: {}'.format(thread_count)
+    cdef vector[MixtureFeature_cc *] features_cc
+    cdef MixtureFeature feature
+    for feature in features:
+        assert feature.ptr != NULL, 'uninitialized feature'
+        features_cc.push_back(feature.ptr)
+    cdef size_t row_count = assignments.shape[0]
+    cdef uint32_t * assignments_data = <uint32_t *> assignments.data
+    cdef rng_t * rng = get_rng()
+    cdef PitmanYor_cc * pitman_yor
+    cdef PitmanYor_cc.Mixture * pitman_yor_mixture
+    cdef LowEntropy_cc * low_entropy
+    cdef LowEntropy_cc.Mixture * low_entropy_mixture
+    if isinstance(model, PitmanYor_cy):
+        pitman_yor = (<PitmanYor_cy> model).ptr
+        pitman_yor_mixture = (<PitmanYorMixture?> mixture).ptr
+        with nogil:
+            if init:
+                pitman_yor_gibbs_init(
+                    pitman_yor[0],
+                    pitman_yor_mixture[0],
+                    id_tracker.ptr[0],
+                    features_cc,
+                    row_count,
+                    assignments_data,
+                    thread_count,
+                    rng[0])
+            else:
+                pitman_yor_gibbs_pass(
+                    pitman_yor[0],
+                    pitman_yor_mixture[0],
+                    id_tracker.ptr[0],
+                    features_cc,
+                    row_count,
+                    assignments_data,
+                    thread_count,
+                    rng[0])
+    elif isinstance(model, LowEntropy_cy):
+        low_entropy = (<LowEntropy_cy> model).ptr
+        low_entropy_mixture = (<LowEntropyMixture?> mixture).ptr
+        with nogil:
+            if init:
+                low_entropy_gibbs_init(
+                    low_entropy[0],
+                    low_entropy_mixture[0],
+                    id_tracker.ptr[0],
+                    features_cc,
+                    row_count,
+                    assignments_data,
+                    thread_count,
+                    rng[0])
+            else:
+                low_entropy_gibbs_pass(
+                    low_entropy[0],
+                    low_entropy_mixture[0],
+                    id_tracker.ptr[0],
+                    features_cc,
+                    row_count,
+                    assignments_data,
+                    thread_count,
+                    rng[0])
+    else:
+        raise ValueError('unsupported clustering model: {}'.format(model))
+
+
+def gibbs_init(
+        model,
+        mixture,
+        MixtureIdTracker id_tracker,
+        list features,
+        numpy.ndarray[numpy.int32_t, ndim=1, mode='c'] assignments,
+        int thread_count=1):
+    '''
+    Sequentially add every row, sampling each assignment conditioned on
+    the rows added before it.  Global groupids are written to assignments.
+    Feature scoring is split among thread_count threads.
+    '''
+    _gibbs(True, model, mixture, id_tracker, features, assignments,
+           thread_count)
+
+
+def gibbs_pass(
+        model,
+        mixture,
+        MixtureIdTracker id_tracker,
+        list features,
+        numpy.ndarray[numpy.int32_t, ndim=1, mode='c'] assignments,
+        int thread_count=1):
+    '''
+    Resample the assignment of every row, in order.  Every row must
+    already be added, and assignments holds their global groupids.
+    Feature scoring is split among thread_count threads.
+    '''
+    _gibbs(False, model, mixture, id_tracker, features, assignments,
+           thread_count)
+
+
+def split_merge(
+        model,
+        mixture,
+        MixtureIdTracker id_tracker,
+        list features,
+        numpy.ndarray[numpy.int32_t, ndim=1, mode='c'] assignments,
+        int move_count):
+    '''
+    Propose move_count sequentially-allocated split-merge moves, each
+    splitting one group in two or merging two groups into one.  Every row
+    must already be added.  Returns the number of accepted moves.
+    '''
+    assert move_count >= 0, 'invalid move_count: {}'.format(move_count)
+    cdef vector[MixtureFeature_cc *] features_cc
+    cdef MixtureFeature feature
+    for feature in features:
+        assert feature.ptr != NULL, 'uninitialized feature'
+        features_cc.push_back(feature.ptr)
+    cdef size_t row_count = assignments.shape[0]
+    cdef uint32_t * assignments_data = <uint32_t *> assignments.data
+    cdef rng_t * rng = get_rng()
+    cdef PitmanYor_cc * pitman_yor
+    cdef PitmanYor_cc.Mixture * pitman_yor_mixture
+    cdef LowEntropy_cc * low_entropy
+    cdef LowEntropy_cc.Mixture * low_entropy_mixture
+    cdef size_t accepted
+    if isinstance(model, PitmanYor_cy):
+        pitman_yor = (<PitmanYor_cy> model).ptr
+        pitman_yor_mixture = (<PitmanYorMixture?> mixture).ptr
+        with nogil:
+            accepted = pitman_yor_split_merge_pass(
+                pitman_yor[0],
+                pitman_yor_mixture[0],
+                id_tracker.ptr[0],
+                features_cc,
+                row_count,
+                assignments_data,
+                move_count,
+                rng[0])
+    elif isinstance(model, LowEntropy_cy):
+        low_entropy = (<LowEntropy_cy> model).ptr
+        low_entropy_mixture = (<LowEntropyMixture?> mixture).ptr
+        with nogil:
+            accepted = low_entropy_split_merge_pass(
+                low_entropy[0],
+                low_entropy_mixture[0],
+                id_tracker.ptr[0],
+                features_cc,
+                row_count,
+                assignments_data,
+                move_count,
+                rng[0])
+    else:
+        raise ValueError('unsupported clustering model: {}'.format(model))
+    return accepted
+
+
+cdef void _checkpoint(
+        bint dump,
+        str filename,
+        mixture,
+        MixtureIdTracker id_tracker,
+        list features) except *:
+    cdef string filename_cc = filename
+    cdef vector[MixtureFeature_cc *] features_cc
+    cdef MixtureFeature feature
+    for feature in features:
+        assert feature.ptr != NULL, 'uninitialized feature'
+        features_cc.push_back(feature.ptr)
+    cdef PitmanYor_cc.Mixture * pitman_yor_mixture
+    cdef LowEntropy_cc.Mixture * low_entropy_mixture
+    if isinstance(mixture, PitmanYorMixture):
+        pitman_yor_mixture = (<PitmanYorMixture> mixture).ptr
+        with nogil:
+            if dump:
+                pitman_yor_checkpoint_dump(
+                    filename_cc,
+                    pitman_yor_mixture[0],
+                    id_tracker.ptr[0],
+                    features_cc)
+            else:
+                pitman_yor_checkpoint_load(
+                    filename_cc,
+                    pitman_yor_mixture[0],
+                    id_tracker.ptr[0],
+                    features_cc)
+    elif isinstance(mixture, LowEntropyMixture):
+        low_entropy_mixture = (<LowEntropyMixture> mixture).ptr
+        with nogil:
+            if dump:
+                low_entropy_checkpoint_dump(
+                    filename_cc,
+                    low_entropy_mixture[0],
+                    id_tracker.ptr[0],
+                    features_cc)
+            else:
+                low_entropy_checkpoint_load(
+                    filename_cc,
+                    low_entropy_mixture[0],
+                    id_tracker.ptr[0],
+                    features_cc)
+    else:
+        raise ValueError('unsupported clustering mixture: {}'.format(mixture))
+
+
+def checkpoint_dump(
+        str filename,
+        mixture,
+        MixtureIdTracker id_tracker,
+        list features):
+    '''
+    Write a binary checkpoint of a clustering mixture, its id tracker and
+    every feature mixture, including cached scores.  Checkpoints are only
+    readable on the same build and architecture.
+    '''
+    _checkpoint(True, filename, mixture, id_tracker, features)
+
+
+def checkpoint_load(
+        str filename,
+        mixture,
+        MixtureIdTracker id_tracker,
+        list features):
+    '''
+    Restore a checkpoint written by checkpoint_dump into existing objects,
+    without recomputing cached scores.  Each feature must be bound to the
+    same shared model and column of values as when it was dumped.
+    '''
+    _checkpoint(False, filename, mixture, id_tracker, features)
@@ -34,10 +34,14 @@ cimport numpy
 numpy.import_array()
 from distributions.rng_cc cimport rng_t
 from distributions.global_rng cimport get_rng
+from distributions.lp.mixture cimport MixtureFeature
 from distributions.lp.vector cimport (
     VectorFloat,
+    ndarray_is_aligned,
     vector_float_from_ndarray,
     vector_float_to_ndarray,
+    observed_to_ndarray,
+    ndarray_bool_data,
 )
 
 
@@ -56,3 +60,12 @@ cdef class Sampler:
 cdef class Mixture:
     cdef _h.Mixture * ptr
     cdef VectorFloat scores
+
+
+cdef class BlockMixture:
+    cdef _h.BlockMixture * ptr
+    cdef vector[_h.Shared] shareds
+    cdef vector[uint32_t] heads
+    cdef vector[uint32_t] present
+    cdef VectorFloat scores
+    cdef uint32_t * _pack_row(self, row, present) except? NULL
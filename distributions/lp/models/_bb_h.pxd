@@ -25,10 +25,13 @@
 # TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
 # USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+from libc.stdint cimport uint32_t
+from libcpp cimport bool
 from libcpp.vector cimport vector
 
 from distributions.rng_cc cimport rng_t
-from distributions.lp.vector cimport VectorFloat
+from distributions.lp.vector cimport VectorFloat, AlignedFloats
+from distributions.lp.mixture cimport MixtureFeature_cc
 from distributions.sparse_counter cimport SparseCounter
 
 
@@ -72,4 +75,69 @@ cdef extern from "distributions/models/bb.hpp" namespace "distributions::BetaBer
             (Shared &, size_t, Value &, rng_t &) nogil except +
         void score_value \
             (Shared &, Value &, VectorFloat &, rng_t &) nogil except +
+        void score_value \
+            (Shared &, Value &, AlignedFloats, rng_t &) nogil except +
+        void add_value_batch \
+            (Shared &, size_t, uint32_t *, bool *, bool *, rng_t &) \
+            nogil except +
+        void remove_value_batch \
+            (Shared &, size_t, uint32_t *, bool *, bool *, rng_t &) \
+            nogil except +
+        void score_value_batch \
+            (Shared &, size_t, bool *, bool *, float *, rng_t &) \
+            nogil except +
         float score_data (Shared &, rng_t &) nogil except +
+        void score_data_grid \
+            (vector[Shared] &, VectorFloat &, rng_t &) nogil except +
+
+    cppclass BlockMixture:
+        vector[vector[Group]] groups "groups()"
+        size_t column_count () nogil
+        size_t group_count () nogil
+        void init (vector[Shared] &, rng_t &) nogil except +
+        void add_group (vector[Shared] &, rng_t &) nogil except +
+        void remove_group (vector[Shared] &, size_t) nogil except +
+        void add_row \
+            (vector[Shared] &, size_t, uint32_t *, uint32_t *, rng_t &) \
+            nogil except +
+        void remove_row \
+            (vector[Shared] &, size_t, uint32_t *, uint32_t *, rng_t &) \
+            nogil except +
+        float score_row_group \
+            (vector[Shared] &, size_t, uint32_t *, uint32_t *, rng_t &) \
+            nogil except +
+        void score_row (
+                vector[Shared] &,
+                uint32_t *,
+                uint32_t *,
+                VectorFloat &,
+                rng_t &) nogil except +
+        void score_row (
+                vector[Shared] &,
+                uint32_t *,
+                uint32_t *,
+                AlignedFloats,
+                rng_t &) nogil except +
+        float score_data (vector[Shared] &, rng_t &) nogil except +
+        void validate (vector[Shared] &) nogil except +
+
+
+cdef extern from "distributions/cython.hpp" namespace "distributions":
+    void mixture_score_value \
+        (Mixture &, Shared &, Value &, float *, size_t, rng_t &) \
+        nogil except +
+    void block_mixture_score_row (
+            BlockMixture &,
+            vector[Shared] &,
+            uint32_t *,
+            uint32_t *,
+            float *,
+            size_t,
+            rng_t &) nogil except +
+
+
+cdef extern from "distributions/gibbs.hpp":
+    cppclass Feature \
+            "distributions::MixtureFeature_<distributions::BetaBernoulli>" \
+            (MixtureFeature_cc):
+        Feature (Shared &, Mixture &, bool *, size_t) nogil except +
@@ -25,6 +25,9 @@
 # TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
 # USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+from libcpp cimport bool as cpp_bool
+import numpy
+
 ctypedef _h.Value Value
 
 
@@ -130,13 +133,144 @@ cdef class Mixture:
               numpy.ndarray[numpy.float32_t, ndim=1] scores_accum):
         assert len(scores_accum) == self.ptr.groups.size(), \
             "scores_accum != len(mixture)"
-        vector_float_from_ndarray(self.scores, scores_accum)
-        self.ptr.score_value(shared.ptr[0], value, self.scores, get_rng()[0])
-        vector_float_to_ndarray(self.scores, scores_accum)
+        if ndarray_is_aligned(scores_accum):
+            _h.mixture_score_value(
+                self.ptr[0],
+                shared.ptr[0],
+                value,
+                <float *> scores_accum.data,
+                len(scores_accum),
+                get_rng()[0])
+        else:
+            vector_float_from_ndarray(self.scores, scores_accum)
+            self.ptr.score_value(
+                shared.ptr[0],
+                value,
+                self.scores,
+                get_rng()[0])
+            vector_float_to_ndarray(self.scores, scores_accum)
+
+    def add_value_batch(
+            self,
+            Shared shared,
+            groupids,
+            values,
+            observed=None):
+        '''
+        Add values[i] to group groupids[i] wherever observed[i].
+        '''
+        cdef numpy.ndarray[numpy.uint32_t, ndim=1, mode='c'] groupids_array = \
+            numpy.ascontiguousarray(groupids, dtype=numpy.uint32)
+        cdef numpy.ndarray[numpy.uint32_t, ndim=1, mode='c'] values_array = \
+            numpy.ascontiguousarray(values, dtype=numpy.uint32)
+        cdef size_t value_count = values_array.shape[0]
+        assert groupids_array.shape[0] == value_count, \
+            "len(groupids) != len(values)"
+        cdef numpy.ndarray observed_array = \
+            observed_to_ndarray(observed, value_count)
+        cdef cpp_bool * observed_data = ndarray_bool_data(observed_array)
+        cdef uint32_t * groupids_data = <uint32_t *> groupids_array.data
+        cdef uint32_t * values_data = <uint32_t *> values_array.data
+        cdef rng_t * rng = get_rng()
+        with nogil:
+            self.ptr.add_value_batch(
+                shared.ptr[0],
+                value_count,
+                groupids_data,
+                values_data,
+                observed_data,
+                rng[0])
+
+    def remove_value_batch(
+            self,
+            Shared shared,
+            groupids,
+            values,
+            observed=None):
+        '''
+        Remove values[i] from group groupids[i] wherever observed[i].
+        '''
+        cdef numpy.ndarray[numpy.uint32_t, ndim=1, mode='c'] groupids_array = \
+            numpy.ascontiguousarray(groupids, dtype=numpy.uint32)
+        cdef numpy.ndarray[numpy.uint32_t, ndim=1, mode='c'] values_array = \
+            numpy.ascontiguousarray(values, dtype=numpy.uint32)
+        cdef size_t value_count = values_array.shape[0]
+        assert groupids_array.shape[0] == value_count, \
+            "len(groupids) != len(values)"
+        cdef numpy.ndarray observed_array = \
+            observed_to_ndarray(observed, value_count)
+        cdef cpp_bool * observed_data = ndarray_bool_data(observed_array)
+        cdef uint32_t * groupids_data = <uint32_t *> groupids_array.data
+        cdef uint32_t * values_data = <uint32_t *> values_array.data
+        cdef rng_t * rng = get_rng()
+        with nogil:
+            self.ptr.remove_value_batch(
+                shared.ptr[0],
+                value_count,
+                groupids_data,
+                values_data,
+                observed_data,
+                rng[0])
+
+    def score_value_batch(
+            self,
+            Shared shared,
+            values,
+            numpy.ndarray[numpy.float32_t, ndim=2, mode='c'] scores_accum,
+            observed=None):
+        cdef numpy.ndarray[numpy.uint32_t, ndim=1, mode='c'] values_array = \
+            numpy.ascontiguousarray(values, dtype=numpy.uint32)
+        cdef size_t value_count = values_array.shape[0]
+        assert scores_accum.shape[0] == value_count, \
+            "scores_accum rows != len(values)"
+        assert scores_accum.shape[1] == self.ptr.groups.size(), \
+            "scores_accum cols != len(mixture)"
+        cdef numpy.ndarray observed_array = \
+            observed_to_ndarray(observed, value_count)
+        cdef cpp_bool * observed_data = ndarray_bool_data(observed_array)
+        cdef uint32_t * values_data = <uint32_t *> values_array.data
+        cdef float * scores_data = <float *> scores_accum.data
+        cdef rng_t * rng = get_rng()
+        with nogil:
+            self.ptr.score_value_batch(
+                shared.ptr[0],
+                value_count,
+                values_data,
+                observed_data,
+                scores_data,
+                rng[0])
 
     def score_data(self, Shared shared):
         return self.ptr.score_data(shared.ptr[0], get_rng()[0])
 
+    def score_data_grid(self, list shareds):
+        cdef vector[_h.Shared] shareds_cc
+        cdef Shared shared
+        for shared in shareds:
+            shareds_cc.push_back(shared.ptr[0])
+        cdef numpy.ndarray[numpy.float32_t, ndim=1] scores = \
+            numpy.zeros(len(shareds), dtype=numpy.float32)
+        self.scores.resize(shareds_cc.size())
+        self.ptr.score_data_grid(shareds_cc, self.scores, get_rng()[0])
+        vector_float_to_ndarray(self.scores, scores)
+        return scores
+
+    def bind(self, Shared shared, values):
+        '''
+        Bind to a shared model and a column of values, for gibbs sampling
+        via distributions.lp.mixture.gibbs_pass.
+        '''
+        cdef numpy.ndarray[numpy.uint32_t, ndim=1, mode='c'] values_array = \
+            numpy.ascontiguousarray(values, dtype=numpy.uint32)
+        cdef MixtureFeature feature = MixtureFeature()
+        feature.ptr = new _h.Feature(
+            shared.ptr[0],
+            self.ptr[0],
+            <uint32_t *> values_array.data,
+            values_array.shape[0])
+        feature.refs = (shared, self, values_array)
+        return feature
+
 
 def sample_group(Shared shared, int size):
     cdef Group group = Group()
@@ -25,10 +25,13 @@
 # TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
 # USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+from libc.stdint cimport uint32_t
+from libcpp cimport bool
 from libcpp.vector cimport vector
 
 from distributions.rng_cc cimport rng_t
-from distributions.lp.vector cimport VectorFloat
+from distributions.lp.vector cimport VectorFloat, AlignedFloats
+from distributions.lp.mixture cimport MixtureFeature_cc
 from distributions.sparse_counter cimport SparseCounter
 
 
@@ -73,4 +76,30 @@ cdef extern from "distributions/models/bnb.hpp" namespace "distributions::BetaNe
             (Shared &, size_t, Value &, rng_t &) nogil except +
         void score_value \
             (Shared &, Value &, VectorFloat &, rng_t &) nogil except +
+        void score_value \
+            (Shared &, Value &, AlignedFloats, rng_t &) nogil except +
+        void add_value_batch \
+            (Shared &, size_t, uint32_t *, uint32_t *, bool *, rng_t &) \
+            nogil except +
+        void remove_value_batch \
+            (Shared &, size_t, uint32_t *, uint32_t *, bool *, rng_t &) \
+            nogil except +
+        void score_value_batch \
+            (Shared &, size_t, uint32_t *, bool *, float *, rng_t &) \
+            nogil except +
         float score_data (Shared &, rng_t &) nogil except +
+        void score_data_grid \
+            (vector[Shared] &, VectorFloat &, rng_t &) nogil except +
+
+
+cdef extern from "distributions/cython.hpp" namespace "distributions":
+    void mixture_score_value \
+        (Mixture &, Shared &, Value &, float *, size_t, rng_t &) \
+        nogil except +
+
+
+cdef extern from "distributions/gibbs.hpp":
+    cppclass Feature \
+            "distributions::MixtureFeature_<distributions::BetaNegativeBinomial>" \
+            (MixtureFeature_cc):
+        Feature (Shared &, Mixture &, uint32_t *, size_t) nogil except +
@@ -25,6 +25,9 @@
 # TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
 # USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+from libcpp cimport bool as cpp_bool
+import numpy
+
 ctypedef _h.Value Value
 
 
@@ -130,16 +133,252 @@ cdef class Mixture:
               numpy.ndarray[numpy.float32_t, ndim=1] scores_accum):
         assert len(scores_accum) == self.ptr.groups.size(), \
             "scores_accum != len(mixture)"
-        vector_float_from_ndarray(self.scores, scores_accum)
-        self.ptr.score_value(shared.ptr[0], value, self.scores, get_rng()[0])
-        vector_float_to_ndarray(self.scores, scores_accum)
+        if ndarray_is_aligned(scores_accum):
+            _h.mixture_score_value(
+                self.ptr[0],
+                shared.ptr[0],
+                value,
+                <float *> scores_accum.data,
+                len(scores_accum),
+                get_rng()[0])
+        else:
+            vector_float_from_ndarray(self.scores, scores_accum)
+            self.ptr.score_value(
+                shared.ptr[0],
+                value,
+                self.scores,
+                get_rng()[0])
+            vector_float_to_ndarray(self.scores, scores_accum)
+
+    def add_value_batch(
+            self,
+            Shared shared,
+            groupids,
+            values,
+            observed=None):
+        '''
+        Add values[i] to group groupids[i] wherever observed[i].
+        '''
+        cdef numpy.ndarray[numpy.uint32_t, ndim=1, mode='c'] groupids_array = \
+            numpy.ascontiguousarray(groupids, dtype=numpy.uint32)
+        cdef numpy.ndarray[numpy.int32_t, ndim=1, mode='c'] values_array = \
+            numpy.ascontiguousarray(values, dtype=numpy.int32)
+        cdef size_t value_count = values_array.shape[0]
+        assert groupids_array.shape[0] == value_count, \
+            "len(groupids) != len(values)"
+        cdef numpy.ndarray observed_array = \
+            observed_to_ndarray(observed, value_count)
+        cdef cpp_bool * observed_data = ndarray_bool_data(observed_array)
+        cdef uint32_t * groupids_data = <uint32_t *> groupids_array.data
+        cdef int * values_data = <int *> values_array.data
+        cdef rng_t * rng = get_rng()
+        with nogil:
+            self.ptr.add_value_batch(
+                shared.ptr[0],
+                value_count,
+                groupids_data,
+                values_data,
+                observed_data,
+                rng[0])
+
+    def remove_value_batch(
+            self,
+            Shared shared,
+            groupids,
+            values,
+            observed=None):
+        '''
+        Remove values[i] from group groupids[i] wherever observed[i].
+        '''
+        cdef numpy.ndarray[numpy.uint32_t, ndim=1, mode='c'] groupids_array = \
+            numpy.ascontiguousarray(groupids, dtype=numpy.uint32)
+        cdef numpy.ndarray[numpy.int32_t, ndim=1, mode='c'] values_array = \
+            numpy.ascontiguousarray(values, dtype=numpy.int32)
+        cdef size_t value_count = values_array.shape[0]
+        assert groupids_array.shape[0] == value_count, \
+            "len(groupids) != len(values)"
+        cdef numpy.ndarray observed_array = \
+            observed_to_ndarray(observed, value_count)
+        cdef cpp_bool * observed_data = ndarray_bool_data(observed_array)
+        cdef uint32_t * groupids_data = <uint32_t *> groupids_array.data
+        cdef int * values_data = <int *> values_array.data
+        cdef rng_t * rng = get_rng()
+        with nogil:
+            self.ptr.remove_value_batch(
+                shared.ptr[0],
+                value_count,
+                groupids_data,
+                values_data,
+                observed_data,
+                rng[0])
+
+    def score_value_batch(
+            self,
+            Shared shared,
+            values,
+            numpy.ndarray[numpy.float32_t, ndim=2, mode='c'] scores_accum,
+            observed=None):
+        cdef numpy.ndarray[numpy.int32_t, ndim=1, mode='c'] values_array = \
+            numpy.ascontiguousarray(values, dtype=numpy.int32)
+        cdef size_t value_count = values_array.shape[0]
+        assert scores_accum.shape[0] == value_count, \
+            "scores_accum rows != len(values)"
+        assert scores_accum.shape[1] == self.ptr.groups.size(), \
+            "scores_accum cols != len(mixture)"
+        cdef numpy.ndarray observed_array = \
+            observed_to_ndarray(observed, value_count)
+        cdef cpp_bool * observed_data = ndarray_bool_data(observed_array)
+        cdef int * values_data = <int *> values_array.data
+        cdef float * scores_data = <float *> scores_accum.data
+        cdef rng_t * rng = get_rng()
+        with nogil:
+            self.ptr.score_value_batch(
+                shared.ptr[0],
+                value_count,
+                values_data,
+                observed_data,
+                scores_data,
+                rng[0])
 
     def score_data(self, Shared shared):
         return self.ptr.score_data(shared.ptr[0], get_rng()[0])
 
+    def score_data_grid(self, list shareds):
+        cdef vector[_h.Shared] shareds_cc
+        cdef Shared shared
+        for shared in shareds:
+            shareds_cc.push_back(shared.ptr[0])
+        cdef numpy.ndarray[numpy.float32_t, ndim=1] scores = \
+            numpy.zeros(len(shareds), dtype=numpy.float32)
+        self.scores.resize(shareds_cc.size())
+        self.ptr.score_data_grid(shareds_cc, self.scores, get_rng()[0])
+        vector_float_to_ndarray(self.scores, scores)
+        return scores
+
+    def bind(self, Shared shared, values):
+        '''
+        Bind to a shared model and a column of values, for gibbs sampling
+        via distributions.lp.mixture.gibbs_pass.
+        '''
+        cdef numpy.ndarray[numpy.int32_t, ndim=1, mode='c'] values_array = \
+            numpy.ascontiguousarray(values, dtype=numpy.int32)
+        cdef MixtureFeature feature = MixtureFeature()
+        feature.ptr = new _h.Feature(
+            shared.ptr[0],
+            self.ptr[0],
+            <int *> values_array.data,
+            values_array.shape[0])
+        feature.refs = (shared, self, values_array)
+        return feature
+
+
+cdef class BlockMixture:
+    '''
+    A mixture of many DirichletDiscrete columns sharing one set of groups.
+    Rows are arrays of category codes, one per column.
+    '''
+    def __cinit__(self):
+        self.ptr = new _h.BlockMixture()
+
+    def __dealloc__(self):
+        del self.ptr
+
+    def __len__(self):
+        return self.ptr.group_count()
+
+    def column_count(self):
+        return self.ptr.column_count()
+
+    def append(self, list groups):
+        '''
+        Append a column of groups; all columns must have equal length.
+        '''
+        cdef vector[_h.Group] column
+        cdef Group group
+        for group in groups:
+            column.push_back(group.ptr[0])
+        self.ptr.groups.push_back(column)
+
+    def clear(self):
+        self.ptr.groups.clear()
+        self.shareds.clear()
+
+    def init(self, list shareds):
+        self.shareds.clear()
+        cdef Shared shared
+        for shared in shareds:
+            self.shareds.push_back(shared.ptr[0])
+        self.ptr.init(self.shareds, get_rng()[0])
+
+    def add_group(self):
+        self.ptr.add_group(self.shareds, get_rng()[0])
+
+    def remove_group(self, int groupid):
+        self.ptr.remove_group(self.shareds, groupid)
+
+    def add_row(self, int groupid, row):
+        cdef numpy.ndarray[numpy.int32_t, ndim=1, mode='c'] row_array = \
+            self._row_array(row)
+        self.ptr.add_row(
+            self.shareds,
+            groupid,
+            <int *> row_array.data,
+            get_rng()[0])
+
+    def remove_row(self, int groupid, row):
+        cdef numpy.ndarray[numpy.int32_t, ndim=1, mode='c'] row_array = \
+            self._row_array(row)
+        self.ptr.remove_row(
+            self.shareds,
+            groupid,
+            <int *> row_array.data,
+            get_rng()[0])
+
+    def score_row_group(self, int groupid, row):
+        cdef numpy.ndarray[numpy.int32_t, ndim=1, mode='c'] row_array = \
+            self._row_array(row)
+        return self.ptr.score_row_group(
+            self.shareds,
+            groupid,
+            <int *> row_array.data,
+            get_rng()[0])
+
+    def score_row(self, row,
+              numpy.ndarray[numpy.float32_t, ndim=1] scores_accum):
+        assert len(scores_accum) == self.ptr.group_count(), \
+            "scores_accum != len(mixture)"
+        cdef numpy.ndarray[numpy.int32_t, ndim=1, mode='c'] row_array = \
+            self._row_array(row)
+        if ndarray_is_aligned(scores_accum):
+            _h.block_mixture_score_row(
+                self.ptr[0],
+                self.shareds,
+                <int *> row_array.data,
+                <float *> scores_accum.data,
+                len(scores_accum),
+                get_rng()[0])
+        else:
+            vector_float_from_ndarray(self.scores, scores_accum)
+            self.ptr.score_row(
+                self.shareds,
+                <int *> row_array.data,
+                self.scores,
+                get_rng()[0])
+            vector_float_to_ndarray(self.scores, scores_accum)
+
+    def score_data(self):
+        return self.ptr.score_data(self.shareds, get_rng()[0])
+
+    def _row_array(self, row):
+        row_array = numpy.ascontiguousarray(row, dtype=numpy.int32)
+        assert row_array.shape == (self.ptr.column_count(),), \
+            "len(row) != column_count"
+        return row_array
+
 
 def sample_group(Shared shared, int size):
     cdef Group group = Group()
+    group.init(shared)
     cdef _h.Sampler sampler
     sampler.init(shared.ptr[0], group.ptr[0], get_rng()[0])
     cdef list result = []
@@ -25,25 +25,29 @@
 # TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
 # USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+from libc.stdint cimport uint32_t
+from libcpp cimport bool
 from libcpp.vector cimport vector
 
 from distributions.rng_cc cimport rng_t
-from distributions.lp.vector cimport VectorFloat
+from distributions.lp.vector cimport VectorFloat, AlignedFloats
+from distributions.lp.mixture cimport MixtureFeature_cc
 from distributions.sparse_counter cimport SparseCounter
 
 
 ctypedef int Value
 
 
-cdef extern from "distributions/models/dd.hpp" namespace "distributions::DirichletDiscrete<256>":
+cdef extern from "distributions/models/dd.hpp" namespace "distributions::DirichletDiscrete<-1>":
     cppclass Shared:
         int dim
-        float alphas[256]
+        vector[float] alphas
 
 
     cppclass Group:
+        int dim
         int count_sum
-        int counts[]
+        vector[int] counts
         void init (Shared &, rng_t &) nogil except +
         void add_value (Shared &, Value &, rng_t &) nogil except +
         void add_repeated_value (Shared &, Value &, int &, rng_t &) nogil except +
@@ -72,4 +76,53 @@ cdef extern from "distributions/models/dd.hpp" namespace "distributions::Dirichl
             (Shared &, size_t, Value &, rng_t &) nogil except +
         void score_value \
             (Shared &, Value &, VectorFloat &, rng_t &) nogil except +
+        void score_value \
+            (Shared &, Value &, AlignedFloats, rng_t &) nogil except +
+        void add_value_batch \
+            (Shared &, size_t, uint32_t *, int *, bool *, rng_t &) \
+            nogil except +
+        void remove_value_batch \
+            (Shared &, size_t, uint32_t *, int *, bool *, rng_t &) \
+            nogil except +
+        void score_value_batch \
+            (Shared &, size_t, int *, bool *, float *, rng_t &) \
+            nogil except +
         float score_data (Shared &, rng_t &) nogil except +
+        void score_data_grid \
+            (vector[Shared] &, VectorFloat &, rng_t &) nogil except +
+
+    cppclass BlockMixture:
+        vector[vector[Group]] groups "groups()"
+        size_t column_count () nogil
+        size_t group_count () nogil
+        void init (vector[Shared] &, rng_t &) nogil except +
+        void add_group (vector[Shared] &, rng_t &) nogil except +
+        void remove_group (vector[Shared] &, size_t) nogil except +
+        void add_row \
+            (vector[Shared] &, size_t, Value *, rng_t &) nogil except +
+        void remove_row \
+            (vector[Shared] &, size_t, Value *, rng_t &) nogil except +
+        float score_row_group \
+            (vector[Shared] &, size_t, Value *, rng_t &) nogil except +
+        void score_row \
+            (vector[Shared] &, Value *, VectorFloat &, rng_t &) nogil except +
+        void score_row \
+            (vector[Shared] &, Value *, AlignedFloats, rng_t &) nogil except +
+        float score_data (vector[Shared] &, rng_t &) nogil except +
+        void validate (vector[Shared] &) nogil except +
+
+
+cdef extern from "distributions/cython.hpp" namespace "distributions":
+    void mixture_score_value \
+        (Mixture &, Shared &, Value &, float *, size_t, rng_t &) \
+        nogil except +
+    void block_mixture_score_row \
+        (BlockMixture &, vector[Shared] &, Value *, float *, size_t, rng_t &) \
+        nogil except +
+
+
+cdef extern from "distributions/gibbs.hpp":
+    cppclass Feature \
+            "distributions::MixtureFeature_<distributions::DirichletDiscrete<-1>>" \
+            (MixtureFeature_cc):
+        Feature (Shared &, Mixture &, int *, size_t) nogil except +
@@ -34,10 +34,14 @@ cimport numpy
 numpy.import_array()
 from distributions.rng_cc cimport rng_t
 from distributions.global_rng cimport get_rng
+from distributions.lp.mixture cimport MixtureFeature
 from distributions.lp.vector cimport (
     VectorFloat,
+    ndarray_is_aligned,
     vector_float_from_ndarray,
     vector_float_to_ndarray,
+    observed_to_ndarray,
+    ndarray_bool_data,
 )
 
 
@@ -34,6 +34,15 @@ from libcpp.vector cimport vector
 cimport numpy as np
 from distributions.rng_cc cimport rng_t
 from distributions.global_rng cimport get_rng
+from distributions.lp.mixture cimport MixtureFeature
+from distributions.lp.vector cimport (
+    VectorFloat,
+    ndarray_is_aligned,
+    vector_float_from_ndarray,
+    vector_float_to_ndarray,
+    observed_to_ndarray,
+    ndarray_bool_data,
+)
 
 cdef class Shared:
     cdef _h.Shared * ptr
@@ -43,3 +52,7 @@ cdef class Group:
 
 cdef class Sampler:
     cdef _h.Sampler * ptr
+
+cdef class Mixture:
+    cdef _h.Mixture * ptr
+    cdef VectorFloat scores
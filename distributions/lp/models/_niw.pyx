@@ -27,6 +27,7 @@
 
 ctypedef np.ndarray Value
 
+from libcpp cimport bool as cpp_bool
 import numpy as np
 cimport numpy as np
 
@@ -87,6 +88,211 @@ cdef class Sampler:
     def eval(self, Shared shared):
         return to_np_1darray(self.ptr.eval(shared.ptr[0], get_rng()[0]))
 
+
+cdef class Column:
+    '''
+    Owns a contiguous column of eigen vectors, since values cannot be
+    passed to c++ as a single numpy buffer.  Missing values may be None.
+    '''
+    cdef vector[VectorXf] values
+
+    def __init__(self, values):
+        cdef VectorXf missing
+        self.values.reserve(len(values))
+        for value in values:
+            if value is None:
+                self.values.push_back(missing)
+            else:
+                self.values.push_back(to_eigen_vecf(np.asarray(value)))
+
+
+cdef class Mixture:
+    def __cinit__(self):
+        self.ptr = new _h.Mixture()
+
+    def __dealloc__(self):
+        del self.ptr
+
+    def __len__(self):
+        return self.ptr.groups.size()
+
+    def __getitem__(self, int groupid):
+        assert groupid < len(self), "groupid out of bounds"
+        cdef Group group = Group()
+        group.ptr[0] = self.ptr.groups[groupid]
+        return group
+
+    def append(self, Group group):
+        self.ptr.groups.push_back(group.ptr[0])
+
+    def clear(self):
+        self.ptr.groups.clear()
+
+    def init(self, Shared shared):
+        self.ptr.init(shared.ptr[0], get_rng()[0])
+
+    def add_group(self, Shared shared):
+        self.ptr.add_group(shared.ptr[0], get_rng()[0])
+
+    def remove_group(self, Shared shared, int groupid):
+        self.ptr.remove_group(shared.ptr[0], groupid)
+
+    def add_value(self, Shared shared, int groupid, Value value):
+        cdef VectorXf v = to_eigen_vecf(value)
+        self.ptr.add_value(shared.ptr[0], groupid, v, get_rng()[0])
+
+    def remove_value(self, Shared shared, int groupid, Value value):
+        cdef VectorXf v = to_eigen_vecf(value)
+        self.ptr.remove_value(shared.ptr[0], groupid, v, get_rng()[0])
+
+    def score_value_group(self, Shared shared, int groupid, Value value):
+        cdef VectorXf v = to_eigen_vecf(value)
+        return self.ptr.score_value_group(
+            shared.ptr[0],
+            groupid,
+            v,
+            get_rng()[0])
+
+    def score_value(self, Shared shared, Value value,
+              np.ndarray[np.float32_t, ndim=1] scores_accum):
+        assert len(scores_accum) == self.ptr.groups.size(), \
+            "scores_accum != len(mixture)"
+        cdef VectorXf v = to_eigen_vecf(value)
+        if ndarray_is_aligned(scores_accum):
+            _h.mixture_score_value(
+                self.ptr[0],
+                shared.ptr[0],
+                v,
+                <float *> scores_accum.data,
+                len(scores_accum),
+                get_rng()[0])
+        else:
+            vector_float_from_ndarray(self.scores, scores_accum)
+            self.ptr.score_value(
+                shared.ptr[0],
+                v,
+                self.scores,
+                get_rng()[0])
+            vector_float_to_ndarray(self.scores, scores_accum)
+
+    def add_value_batch(
+            self,
+            Shared shared,
+            groupids,
+            values,
+            observed=None):
+        '''
+        Add values[i] to group groupids[i] wherever observed[i].
+        '''
+        cdef np.ndarray[np.uint32_t, ndim=1, mode='c'] groupids_array = \
+            np.ascontiguousarray(groupids, dtype=np.uint32)
+        cdef Column column = Column(values)
+        cdef size_t value_count = column.values.size()
+        assert groupids_array.shape[0] == value_count, \
+            "len(groupids) != len(values)"
+        cdef np.ndarray observed_array = \
+            observed_to_ndarray(observed, value_count)
+        cdef cpp_bool * observed_data = ndarray_bool_data(observed_array)
+        cdef uint32_t * groupids_data = <uint32_t *> groupids_array.data
+        cdef VectorXf * values_data = column.values.data()
+        cdef rng_t * rng = get_rng()
+        with nogil:
+            self.ptr.add_value_batch(
+                shared.ptr[0],
+                value_count,
+                groupids_data,
+                values_data,
+                observed_data,
+                rng[0])
+
+    def remove_value_batch(
+            self,
+            Shared shared,
+            groupids,
+            values,
+            observed=None):
+        '''
+        Remove values[i] from group groupids[i] wherever observed[i].
+        '''
+        cdef np.ndarray[np.uint32_t, ndim=1, mode='c'] groupids_array = \
+            np.ascontiguousarray(groupids, dtype=np.uint32)
+        cdef Column column = Column(values)
+        cdef size_t value_count = column.values.size()
+        assert groupids_array.shape[0] == value_count, \
+            "len(groupids) != len(values)"
+        cdef np.ndarray observed_array = \
+            observed_to_ndarray(observed, value_count)
+        cdef cpp_bool * observed_data = ndarray_bool_data(observed_array)
+        cdef uint32_t * groupids_data = <uint32_t *> groupids_array.data
+        cdef VectorXf * values_data = column.values.data()
+        cdef rng_t * rng = get_rng()
+        with nogil:
+            self.ptr.remove_value_batch(
+                shared.ptr[0],
+                value_count,
+                groupids_data,
+                values_data,
+                observed_data,
+                rng[0])
+
+    def score_value_batch(
+            self,
+            Shared shared,
+            values,
+            np.ndarray[np.float32_t, ndim=2, mode='c'] scores_accum,
+            observed=None):
+        cdef Column column = Column(values)
+        cdef size_t value_count = column.values.size()
+        assert scores_accum.shape[0] == value_count, \
+            "scores_accum rows != len(values)"
+        assert scores_accum.shape[1] == self.ptr.groups.size(), \
+            "scores_accum cols != len(mixture)"
+        cdef np.ndarray observed_array = \
+            observed_to_ndarray(observed, value_count)
+        cdef cpp_bool * observed_data = ndarray_bool_data(observed_array)
+        cdef VectorXf * values_data = column.values.data()
+        cdef float * scores_data = <float *> scores_accum.data
+        cdef rng_t * rng = get_rng()
+        with nogil:
+            self.ptr.score_value_batch(
+                shared.ptr[0],
+                value_count,
+                values_data,
+                observed_data,
+                scores_data,
+                rng[0])
+
+    def score_data(self, Shared shared):
+        return self.ptr.score_data(shared.ptr[0], get_rng()[0])
+
+    def score_data_grid(self, list shareds):
+        cdef vector[_h.Shared] shareds_cc
+        cdef Shared shared
+        for shared in shareds:
+            shareds_cc.push_back(shared.ptr[0])
+        cdef np.ndarray[np.float32_t, ndim=1] scores = \
+            np.zeros(len(shareds), dtype=np.float32)
+        self.scores.resize(shareds_cc.size())
+        self.ptr.score_data_grid(shareds_cc, self.scores, get_rng()[0])
+        vector_float_to_ndarray(self.scores, scores)
+        return scores
+
+    def bind(self, Shared shared, values):
+        '''
+        Bind to a shared model and a column of values, for gibbs sampling
+        via distributions.lp.mixture.gibbs_pass.
+        '''
+        cdef Column column = Column(values)
+        cdef MixtureFeature feature = MixtureFeature()
+        feature.ptr = new _h.Feature(
+            shared.ptr[0],
+            self.ptr[0],
+            column.values.data(),
+            column.values.size())
+        feature.refs = (shared, self, column)
+        return feature
+
+
 def sample_group(Shared shared, int size):
     cdef Group group = Group()
     group.init(shared)
@@ -25,10 +25,14 @@
 # TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
 # USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+from libc.stdint cimport uint32_t
+from libcpp cimport bool
 from libcpp.vector cimport vector
 
 from distributions.rng_cc cimport rng_t
 from distributions._eigen_h cimport VectorXf, MatrixXf
+from distributions.lp.vector cimport VectorFloat, AlignedFloats
+from distributions.lp.mixture cimport MixtureFeature_cc
 
 ctypedef VectorXf Value
 
@@ -56,3 +60,45 @@ cdef extern from "distributions/models/niw.hpp" namespace "distributions::Normal
     cppclass Sampler:
         void init (Shared &, Group &, rng_t &) nogil except +
         Value eval (Shared &, rng_t &) nogil except +
+
+
+    cppclass Mixture:
+        vector[Group] groups "groups()"
+        void init (Shared &, rng_t &) nogil except +
+        void add_group (Shared &, rng_t &) nogil except +
+        void remove_group (Shared &, size_t) nogil except +
+        void add_value \
+            (Shared &, size_t, Value &, rng_t &) nogil except +
+        void remove_value \
+            (Shared &, size_t, Value &, rng_t &) nogil except +
+        float score_value_group \
+            (Shared &, size_t, Value &, rng_t &) nogil except +
+        void score_value \
+            (Shared &, Value &, VectorFloat &, rng_t &) nogil except +
+        void score_value \
+            (Shared &, Value &, AlignedFloats, rng_t &) nogil except +
+        void add_value_batch \
+            (Shared &, size_t, uint32_t *, Value *, bool *, rng_t &) \
+            nogil except +
+        void remove_value_batch \
+            (Shared &, size_t, uint32_t *, Value *, bool *, rng_t &) \
+            nogil except +
+        void score_value_batch \
+            (Shared &, size_t, Value *, bool *, float *, rng_t &) \
+            nogil except +
+        float score_data (Shared &, rng_t &) nogil except +
+        void score_data_grid \
+            (vector[Shared] &, VectorFloat &, rng_t &) nogil except +
+
+
+cdef extern from "distributions/cython.hpp" namespace "distributions":
+    void mixture_score_value \
+        (Mixture &, Shared &, Value &, float *, size_t, rng_t &) \
+        nogil except +
+
+
+cdef extern from "distributions/gibbs.hpp":
+    cppclass Feature \
+            "distributions::MixtureFeature_<distributions::NormalInverseWishart<-1> >" \
+            (MixtureFeature_cc):
+        Feature (Shared &, Mixture &, Value *, size_t) nogil except +
@@ -89,4 +89,5 @@ class Sampler(_bb.Sampler):
 
 
 Mixture = _bb.Mixture
+BlockMixture = _bb.BlockMixture
 sample_group = _bb.sample_group
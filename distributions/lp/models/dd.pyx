@@ -54,6 +54,7 @@ cdef class _Shared(_dd.Shared):
         alphas = raw['alphas']
         cdef int dim = len(alphas)
         self.ptr.dim = dim
+        self.ptr.alphas.resize(dim)
         cdef int i
         for i in xrange(dim):
             self.ptr.alphas[i] = float(alphas[i])
@@ -68,6 +69,7 @@ cdef class _Shared(_dd.Shared):
     def protobuf_load(self, message):
         cdef int dim = len(message.alphas)
         self.ptr.dim = dim
+        self.ptr.alphas.resize(dim)
         cdef int i
         for i in xrange(self.ptr.dim):
             self.ptr.alphas[i] = message.alphas[i]
@@ -84,31 +86,24 @@ class Shared(_Shared, SharedMixin, SharedIoMixin):
 
 
 cdef class _Group(_dd.Group):
-    cdef int dim  # only required for dumping
-
-    def __cinit__(self):
-        self.dim = 0
-
     def load(self, dict raw):
         counts = raw['counts']
-        self.dim = len(counts)
+        cdef int dim = len(counts)
+        self.ptr.dim = dim
+        self.ptr.counts.resize(dim)
         self.ptr.count_sum = 0
         cdef int i
-        for i in xrange(self.dim):
+        for i in xrange(dim):
             self.ptr.count_sum += counts[i]
             self.ptr.counts[i] = counts[i]
 
     def dump(self):
         counts = []
         cdef int i
-        for i in xrange(self.dim):
+        for i in xrange(self.ptr.dim):
             counts.append(self.ptr.counts[i])
         return {'counts': counts}
 
-    def init(self, _dd.Shared shared):
-        self.dim = shared.ptr.dim
-        _dd.Group.init(self, shared)
-
 
 class Group(_Group, GroupIoMixin):
     pass
@@ -119,4 +114,5 @@ class Sampler(_dd.Sampler):
 
 
 Mixture = _dd.Mixture
+BlockMixture = _dd.BlockMixture
 sample_group = _dd.sample_group
@@ -182,4 +182,5 @@ class Group(_Group, GroupIoMixin):
 class Sampler(_niw.Sampler):
     pass
 
+Mixture = _niw.Mixture
 sample_group = _niw.sample_group
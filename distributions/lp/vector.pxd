@@ -25,6 +25,7 @@
 # TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
 # USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+from libcpp cimport bool as cpp_bool
 cimport numpy
 
 
@@ -96,6 +97,9 @@ cdef extern from "distributions/vector.hpp" namespace "distributions":
         float * data () nogil
         size_t size () nogil
 
+    size_t default_alignment
+    bint is_aligned (float *) nogil
+
 
 cdef void vector_float_from_ndarray(
         VectorFloat & vector_float,
@@ -105,3 +109,12 @@ cdef void vector_float_from_ndarray(
 cdef void vector_float_to_ndarray(
         VectorFloat & vector_float,
         numpy.ndarray[numpy.float32_t, ndim=1] ndarray)
+
+
+cdef bint ndarray_is_aligned(numpy.ndarray ndarray)
+
+
+cdef numpy.ndarray observed_to_ndarray(observed, size_t value_count)
+
+
+cdef cpp_bool * ndarray_bool_data(numpy.ndarray ndarray)
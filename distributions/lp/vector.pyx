@@ -28,6 +28,7 @@
 from libc.string cimport memcpy
 cimport numpy
 numpy.import_array()
+import numpy
 
 
 cdef void vector_float_from_ndarray(
@@ -45,3 +46,46 @@ cdef void vector_float_to_ndarray(
     cdef tuple shape = (size,)
     ndarray.resize(shape)
     memcpy(ndarray.data, vector_float.data(), size * sizeof(float))
+
+
+cdef bint ndarray_is_aligned(numpy.ndarray ndarray):
+    return (
+        numpy.PyArray_IS_C_CONTIGUOUS(ndarray) and
+        is_aligned(<float *> ndarray.data))
+
+
+cdef numpy.ndarray observed_to_ndarray(observed, size_t value_count):
+    '''
+    Convert an optional observed mask to a contiguous bool array, or None.
+    Callers must hold the result while using its ndarray_bool_data.
+    '''
+    if observed is None:
+        return None
+    cdef numpy.ndarray[cpp_bool, ndim=1, mode='c'] observed_array = \
+        numpy.ascontiguousarray(observed, dtype=numpy.bool_)
+    assert observed_array.shape[0] == value_count, \
+        "len(observed) != len(values)"
+    return observed_array
+
+
+cdef cpp_bool * ndarray_bool_data(numpy.ndarray ndarray):
+    if ndarray is None:
+        return NULL
+    return <cpp_bool *> ndarray.data
+
+
+def aligned_zeros(shape):
+    '''
+    Create a zeroed float32 array whose data is aligned for AlignedFloats.
+    Mixtures score directly into such arrays rather than copying.
+    '''
+    cdef size_t size = numpy.prod(shape, dtype=numpy.int64)
+    cdef numpy.ndarray buffer = numpy.zeros(
+        size * sizeof(float) + default_alignment,
+        dtype=numpy.uint8)
+    cdef size_t offset = (
+        default_alignment - (<size_t> buffer.data) % default_alignment
+    ) % default_alignment
+    return buffer[offset:offset + size * sizeof(float)] \
+        .view(numpy.float32) \
+        .reshape(shape)
@@ -50,7 +50,10 @@ from distributions.dbg.random import scores_to_probs
 import distributions.dbg.clustering
 require_cython()
 import distributions.lp.clustering
-from distributions.lp.clustering import count_assignments
+from distributions.lp.clustering import (
+    count_assignments,
+    count_assignments_array,
+)
 from distributions.lp.mixture import MixtureIdTracker
 
 MODELS = {
@@ -136,6 +139,31 @@ def iter_valid_sizes(example, max_size, min_size=2):
         yield size
 
 
+def test_count_assignments_array():
+    assignments = numpy.array([5, 3, 5, 9, 3, 5], dtype=numpy.int32)
+    counts, packed, relabel = count_assignments_array(
+        assignments,
+        relabel=True)
+    assert_equal(list(counts), [2, 3, 1])
+    assert_equal(list(packed), [1, 0, 1, 2, 0, 1])
+    assert_equal(list(relabel), [3, 5, 9])
+    assert_equal(list(relabel[packed]), list(assignments))
+
+    weights = numpy.array([1, 2, 3, 4, 5, 6], dtype=numpy.int32)
+    counts, packed = count_assignments_array(assignments, weights)
+    assert_equal(list(counts), [7, 10, 4])
+
+    model = distributions.lp.clustering.PitmanYor()
+    contiguous = model.sample_assignments(1000)
+    counts, packed = count_assignments_array(contiguous)
+    assert_equal(list(packed), list(contiguous))
+    assert_equal(list(counts), count_assignments(dict(enumerate(contiguous))))
+
+    mixture = model.Mixture()
+    mixture.init(model, numpy.append(counts, 0))
+    assert_equal(len(mixture), len(counts) + 1)
+
+
 @for_each_model()
 def test_sample_matches_score_counts(Model, EXAMPLE, sample_count):
     for size in iter_valid_sizes(EXAMPLE, max_size=10):
@@ -164,6 +192,34 @@ def test_sample_matches_score_counts(Model, EXAMPLE, sample_count):
         assert_greater(gof, MIN_GOODNESS_OF_FIT)
 
 
+@for_each_model(lambda Model: Model.__name__ == 'PitmanYor')
+def test_sample_sublinear_matches_score_counts(Model, EXAMPLE, sample_count):
+    for size in iter_valid_sizes(EXAMPLE, max_size=10):
+        model = Model()
+        model.load(EXAMPLE)
+
+        samples = []
+        probs_dict = {}
+        for _ in xrange(sample_count):
+            value = model.sample_assignments(size, sublinear=True)
+            assert_equal(value.dtype, numpy.int32)
+            sample = canonicalize(value)
+            samples.append(sample)
+            if sample not in probs_dict:
+                assignments = dict(enumerate(value))
+                counts = count_assignments(assignments)
+                prob = math.exp(model.score_counts(counts))
+                probs_dict[sample] = prob
+
+        total = sum(probs_dict.values())
+        for key in probs_dict:
+            probs_dict[key] /= total
+
+        gof = discrete_goodness_of_fit(samples, probs_dict, plot=True)
+        print '{} gof = {:0.3g}'.format(Model.__name__, gof)
+        assert_greater(gof, MIN_GOODNESS_OF_FIT)
+
+
 @for_each_model()
 def test_score_counts_is_normalized(Model, EXAMPLE, sample_count):
 
@@ -192,6 +248,25 @@ def test_score_counts_is_normalized(Model, EXAMPLE, sample_count):
         assert_less(abs(total - 1), tol, 'not normalized: {}'.format(total))
 
 
+@for_each_model(lambda Model: hasattr(Model, 'score_count_histogram'))
+def test_score_count_histogram_matches_score_counts(Model, EXAMPLE, *unused):
+    model = Model()
+    model.load(EXAMPLE)
+    sample_size = min(1000, EXAMPLE.get('dataset_size', 1000))
+    assignments = dict(enumerate(model.sample_assignments(sample_size)))
+    counts = count_assignments(assignments)
+    expected = model.score_counts(counts)
+
+    actual = model.score_counts(numpy.array(counts, dtype=numpy.int32))
+    assert_close(actual, expected)
+
+    histogram = defaultdict(lambda: 0)
+    for count in counts:
+        histogram[count] += 1
+    actual = model.score_count_histogram(dict(histogram))
+    assert_close(actual, expected)
+
+
 def add_to_counts(counts, pos):
     counts = counts[:]
     counts[pos] += 1
@@ -279,6 +354,11 @@ def test_mixture_score_matches_score_add_value(Model, EXAMPLE, *unused):
         assert_close(actual, expected)
         return actual
 
+    def check_score_data(mixture, counts):
+        expected = model.score_counts(counts)
+        actual = mixture.score_data(model)
+        assert_close(actual, expected)
+
     for empty_group_count in [1, 10]:
         print 'empty_group_count =', empty_group_count
         counts = nonempty_counts + [0] * empty_group_count
@@ -291,6 +371,7 @@ def test_mixture_score_matches_score_add_value(Model, EXAMPLE, *unused):
         id_tracker.init(len(counts))
         check_counts(mixture, counts, empty_group_count)
         check_scores(mixture, counts, empty_group_count)
+        check_score_data(mixture, counts)
 
         print 'adding'
         groupids = []
@@ -310,6 +391,7 @@ def test_mixture_score_matches_score_add_value(Model, EXAMPLE, *unused):
 
         check_counts(mixture, counts, empty_group_count)
         check_scores(mixture, counts, empty_group_count)
+        check_score_data(mixture, counts)
 
         print 'removing'
         for global_groupid in groupids:
@@ -325,3 +407,4 @@ def test_mixture_score_matches_score_add_value(Model, EXAMPLE, *unused):
                     counts[groupid] = back
             check_counts(mixture, counts, empty_group_count)
             check_scores(mixture, counts, empty_group_count)
+            check_score_data(mixture, counts)
@@ -0,0 +1,331 @@
+# Copyright (c) 2014, Salesforce.com, Inc.  All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# - Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# - Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# - Neither the name of Salesforce.com nor the names of its contributors
+#   may be used to endorse or promote products derived from this
+#   software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS
+# OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR
+# TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
+# USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import math
+from collections import defaultdict
+import numpy
+from nose.tools import assert_equal, assert_less, assert_greater
+from goftests import discrete_goodness_of_fit
+from distributions.fileutil import tempdir
+from distributions.tests.util import (
+    require_cython,
+    seed_all,
+    assert_close,
+    import_model,
+    list_models,
+)
+require_cython()
+from distributions.lp.clustering import PitmanYor, LowEntropy
+from distributions.lp.mixture import (
+    MixtureIdTracker,
+    gibbs_init,
+    gibbs_pass,
+    split_merge,
+    checkpoint_dump,
+    checkpoint_load,
+)
+
+CLUSTERINGS = [
+    PitmanYor.from_dict({'alpha': 2.0, 'd': 0.1}),
+    LowEntropy.from_dict({'dataset_size': 1000}),
+]
+
+FEATURES = {
+    spec['name']: import_model(spec)
+    for spec in list_models()
+    if spec['flavor'] == 'lp'
+}
+
+EMPTY_GROUP_COUNT = 3
+PASS_COUNT = 4
+MOVE_COUNT = 10
+THREAD_COUNTS = [1, 2]
+FEATURE_COUNT = 3
+SPLIT_MERGE_ROW_COUNT = 5
+SAMPLE_COUNT = 2000
+MIN_GOODNESS_OF_FIT = 1e-3
+
+
+def test_id_tracker_many():
+    id_tracker = MixtureIdTracker()
+    id_tracker.init(EMPTY_GROUP_COUNT)
+    for _ in xrange(5):
+        id_tracker.add_group()
+    for packed in [0, 3, 0]:
+        id_tracker.remove_group(packed)
+    packed = numpy.arange(id_tracker.packed_size, dtype=numpy.int32)
+    global_ = id_tracker.packed_to_global_many(packed)
+    assert_equal(
+        list(global_),
+        [id_tracker.packed_to_global(p) for p in packed])
+    assert_equal(list(id_tracker.global_to_packed_many(global_)), list(packed))
+
+    global_size = id_tracker.global_size
+    id_tracker.compact()
+    assert_equal(id_tracker.global_size, global_size)
+    assert_equal(list(id_tracker.packed_to_global_many(packed)), list(global_))
+    assert_equal(list(id_tracker.global_to_packed_many(global_)), list(packed))
+
+
+def test_id_tracker_long_lived_group():
+    id_tracker = MixtureIdTracker()
+    id_tracker.init(1)
+    for _ in xrange(10000):
+        id_tracker.add_group()
+        id_tracker.remove_group(1)
+    assert_equal(id_tracker.packed_size, 1)
+    assert_equal(id_tracker.global_size, 10001)
+    assert_equal(id_tracker.packed_to_global(0), 0)
+    assert_equal(id_tracker.global_to_packed(0), 0)
+    assert_less(id_tracker.index_size, 200)
+
+    for _ in xrange(3):
+        id_tracker.add_group()
+    id_tracker.remove_group(0)
+    id_tracker.compact()
+    packed = numpy.arange(id_tracker.packed_size, dtype=numpy.int32)
+    global_ = id_tracker.packed_to_global_many(packed)
+    assert_equal(list(global_), [10003, 10001, 10002])
+    assert_equal(list(id_tracker.global_to_packed_many(global_)), list(packed))
+
+
+def test_gibbs():
+    for clustering in CLUSTERINGS:
+        for name in sorted(FEATURES):
+            if hasattr(FEATURES[name], 'Mixture'):
+                for thread_count in THREAD_COUNTS:
+                    yield check_gibbs, clustering, name, thread_count
+
+
+def check_gibbs(clustering, name, thread_count):
+    seed_all(0)
+    module = FEATURES[name]
+    EXAMPLE = module.EXAMPLES[0]
+    shared = module.Shared.from_dict(EXAMPLE['shared'])
+    values = EXAMPLE['values'] * 10
+    for value in values:
+        shared.add_value(value)
+
+    mixture = clustering.Mixture()
+    mixture.init(clustering, [0] * EMPTY_GROUP_COUNT)
+    id_tracker = MixtureIdTracker()
+    id_tracker.init(EMPTY_GROUP_COUNT)
+    feature_mixtures = []
+    for _ in xrange(FEATURE_COUNT):
+        feature = module.Mixture()
+        feature.init(shared)
+        for _ in xrange(EMPTY_GROUP_COUNT):
+            feature.add_group(shared)
+        feature_mixtures.append(feature)
+    features = [feature.bind(shared, values) for feature in feature_mixtures]
+    assignments = numpy.zeros(len(values), dtype=numpy.int32)
+
+    def check_state():
+        groupids = id_tracker.global_to_packed_many(assignments)
+        counts = numpy.bincount(groupids, minlength=len(mixture))
+        assert_equal(len(counts), len(mixture))
+        empty_groupids = sorted(mixture.empty_groupids)
+        assert_equal(empty_groupids, sorted(numpy.where(counts == 0)[0]))
+        groups = [module.Group.from_values(shared) for _ in counts]
+        for value, groupid in zip(values, groupids):
+            groups[groupid].add_value(shared, value)
+        expected = sum(group.score_data(shared) for group in groups)
+        for feature in feature_mixtures:
+            assert_equal(len(feature), len(mixture))
+            assert_close(feature.score_data(shared), expected)
+
+    gibbs_init(
+        clustering,
+        mixture,
+        id_tracker,
+        features,
+        assignments,
+        thread_count)
+    check_state()
+    for _ in xrange(PASS_COUNT):
+        gibbs_pass(
+            clustering,
+            mixture,
+            id_tracker,
+            features,
+            assignments,
+            thread_count)
+        check_state()
+        split_merge(
+            clustering,
+            mixture,
+            id_tracker,
+            features,
+            assignments,
+            MOVE_COUNT)
+        check_state()
+
+
+def canonicalize(assignments):
+    groups = defaultdict(lambda: [])
+    for rowid, groupid in enumerate(assignments):
+        groups[groupid].append(rowid)
+    return tuple(sorted(tuple(sorted(group)) for group in groups.itervalues()))
+
+
+def iter_partitions(size):
+    if size == 0:
+        yield ()
+        return
+    for partition in iter_partitions(size - 1):
+        for i, part in enumerate(partition):
+            yield partition[:i] + (part + (size - 1,),) + partition[i + 1:]
+        yield partition + ((size - 1,),)
+
+
+def test_split_merge_posterior():
+    for clustering in CLUSTERINGS:
+        for name in sorted(FEATURES):
+            if hasattr(FEATURES[name], 'Mixture'):
+                yield check_split_merge_posterior, clustering, name
+
+
+def check_split_merge_posterior(clustering, name):
+    seed_all(0)
+    module = FEATURES[name]
+    EXAMPLE = module.EXAMPLES[0]
+    shared = module.Shared.from_dict(EXAMPLE['shared'])
+    values = (EXAMPLE['values'] * SPLIT_MERGE_ROW_COUNT)[
+        :SPLIT_MERGE_ROW_COUNT]
+    for value in values:
+        shared.add_value(value)
+
+    probs_dict = {}
+    for partition in iter_partitions(len(values)):
+        score = clustering.score_counts(map(len, partition))
+        for part in partition:
+            group = module.Group.from_values(shared, [values[i] for i in part])
+            score += group.score_data(shared)
+        probs_dict[tuple(sorted(partition))] = math.exp(score)
+    assert_equal(len(probs_dict), 52)
+    total = sum(probs_dict.values())
+    for key in probs_dict:
+        probs_dict[key] /= total
+
+    mixture = clustering.Mixture()
+    mixture.init(clustering, [0] * EMPTY_GROUP_COUNT)
+    id_tracker = MixtureIdTracker()
+    id_tracker.init(EMPTY_GROUP_COUNT)
+    feature = module.Mixture()
+    feature.init(shared)
+    for _ in xrange(EMPTY_GROUP_COUNT):
+        feature.add_group(shared)
+    features = [feature.bind(shared, values)]
+    assignments = numpy.zeros(len(values), dtype=numpy.int32)
+    gibbs_init(clustering, mixture, id_tracker, features, assignments)
+
+    samples = []
+    for _ in xrange(SAMPLE_COUNT):
+        split_merge(
+            clustering,
+            mixture,
+            id_tracker,
+            features,
+            assignments,
+            MOVE_COUNT)
+        samples.append(canonicalize(assignments))
+
+    gof = discrete_goodness_of_fit(samples, probs_dict, plot=True)
+    print '{} gof = {:0.3g}'.format(name, gof)
+    assert_greater(gof, MIN_GOODNESS_OF_FIT)
+
+
+def test_checkpoint():
+    for clustering in CLUSTERINGS:
+        for name in sorted(FEATURES):
+            if hasattr(FEATURES[name], 'Mixture'):
+                yield check_checkpoint, clustering, name
+
+
+def check_checkpoint(clustering, name):
+    seed_all(0)
+    module = FEATURES[name]
+    EXAMPLE = module.EXAMPLES[0]
+    shared = module.Shared.from_dict(EXAMPLE['shared'])
+    values = EXAMPLE['values'] * 10
+    for value in values:
+        shared.add_value(value)
+
+    def create():
+        mixture = clustering.Mixture()
+        mixture.init(clustering, [0] * EMPTY_GROUP_COUNT)
+        id_tracker = MixtureIdTracker()
+        id_tracker.init(EMPTY_GROUP_COUNT)
+        feature_mixtures = []
+        for _ in xrange(FEATURE_COUNT):
+            feature = module.Mixture()
+            feature.init(shared)
+            for _ in xrange(EMPTY_GROUP_COUNT):
+                feature.add_group(shared)
+            feature_mixtures.append(feature)
+        return mixture, id_tracker, feature_mixtures
+
+    mixture, id_tracker, feature_mixtures = create()
+    features = [feature.bind(shared, values) for feature in feature_mixtures]
+    assignments = numpy.zeros(len(values), dtype=numpy.int32)
+    gibbs_init(clustering, mixture, id_tracker, features, assignments)
+
+    with tempdir():
+        filename = os.path.abspath('checkpoint.bin')
+        checkpoint_dump(filename, mixture, id_tracker, features)
+        mixture2, id_tracker2, feature_mixtures2 = create()
+        features2 = [
+            feature.bind(shared, values)
+            for feature in feature_mixtures2
+        ]
+        checkpoint_load(filename, mixture2, id_tracker2, features2)
+
+    assert_equal(len(mixture2), len(mixture))
+    assert_equal(
+        sorted(mixture2.empty_groupids),
+        sorted(mixture.empty_groupids))
+    assert_equal(
+        list(id_tracker2.global_to_packed_many(assignments)),
+        list(id_tracker.global_to_packed_many(assignments)))
+
+    scores = numpy.zeros(len(mixture), dtype=numpy.float32)
+    scores2 = numpy.zeros(len(mixture), dtype=numpy.float32)
+    mixture.score_value(clustering, scores)
+    mixture2.score_value(clustering, scores2)
+    assert_close(scores2, scores)
+    for feature, feature2 in zip(feature_mixtures, feature_mixtures2):
+        assert_equal(len(feature2), len(feature))
+        assert_close(feature2.score_data(shared), feature.score_data(shared))
+        for value in values:
+            scores[:] = 0
+            scores2[:] = 0
+            feature.score_value(shared, value, scores)
+            feature2.score_value(shared, value, scores2)
+            assert_close(scores2, scores)
+
+    gibbs_pass(clustering, mixture2, id_tracker2, features2, assignments)
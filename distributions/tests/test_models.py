@@ -32,9 +32,11 @@ import scipy.stats
 import functools
 from collections import defaultdict
 from nose import SkipTest
+from nose.tools import assert_equal
 from nose.tools import assert_greater
 from nose.tools import assert_in
 from nose.tools import assert_is_instance
+from nose.tools import assert_less_equal
 from nose.tools import assert_not_equal
 from nose.tools import assert_true
 from goftests import density_goodness_of_fit
@@ -48,6 +50,7 @@ from distributions.tests.util import assert_hasattr
 from distributions.tests.util import import_model
 from distributions.tests.util import list_models
 from distributions.tests.util import seed_all
+from distributions.lp.vector import aligned_zeros
 
 try:
     import distributions.io.schema_pb2
@@ -147,6 +150,17 @@ def test_shared(module, EXAMPLE):
     assert_close(shared1.dump(), EXAMPLE['shared'])
 
 
+@for_each_model(lambda module: module.__name__.endswith('.dpd'))
+def test_dpd_realize(module, EXAMPLE):
+    for max_size in [1, 5, 10000]:
+        shared = module.Shared.from_dict(EXAMPLE['shared'])
+        size = len(shared.dump()['betas'])
+        shared.realize(max_size=max_size, min_beta0=1e-6)
+        betas = shared.dump()['betas']
+        assert_close(sum(betas.itervalues()), 1.0, err_msg='sum(betas)')
+        assert_less_equal(len(betas), max(size + 1, max_size))
+
+
 @for_each_model()
 def test_group(module, EXAMPLE):
     assert_hasattr(module, 'Group')
@@ -600,3 +614,235 @@ def test_mixture_score(module, EXAMPLE):
         mixture.remove_value(shared, groupid, value)
         scores = check_score_value(value)
         check_score_data()
+
+
+@for_each_model(lambda module: hasattr(module, 'Mixture'))
+def test_mixture_score_data_grid(module, EXAMPLE):
+    shared = module.Shared.from_dict(EXAMPLE['shared'])
+    values = EXAMPLE['values']
+    for value in values:
+        shared.add_value(value)
+
+    mixture = module.Mixture()
+    for value in values:
+        mixture.append(module.Group.from_values(shared, [value]))
+    mixture.append(module.Group.from_values(shared, []))
+    mixture.init(shared)
+
+    shareds = []
+    for i in xrange(4):
+        raw = shared.dump()
+        for key in ['alpha', 'beta', 'inv_beta', 'kappa', 'nu']:
+            if key in raw:
+                raw[key] += 0.5 * i
+        shareds.append(module.Shared.from_dict(raw))
+
+    expected = [mixture.score_data(grid_shared) for grid_shared in shareds]
+    actual = mixture.score_data_grid(shareds)
+    assert_close(actual, expected, err_msg='score_data_grid')
+
+
+@for_each_model(lambda module: hasattr(module, 'Mixture'))
+def test_mixture_score_value_batch(module, EXAMPLE):
+    shared = module.Shared.from_dict(EXAMPLE['shared'])
+    values = EXAMPLE['values']
+    for value in values:
+        shared.add_value(value)
+
+    mixture = module.Mixture()
+    for value in values:
+        mixture.append(module.Group.from_values(shared, [value]))
+    mixture.init(shared)
+
+    noise = numpy.random.randn(len(values), len(mixture)).astype(numpy.float32)
+    expected = noise.copy()
+    for value, scores in zip(values, expected):
+        mixture.score_value(shared, value, scores)
+    actual = noise.copy()
+    mixture.score_value_batch(shared, values, actual)
+    assert_close(actual, expected, err_msg='score_value_batch')
+
+
+@for_each_model(lambda module: hasattr(module, 'Mixture'))
+def test_mixture_value_batch_observed(module, EXAMPLE):
+    shared = module.Shared.from_dict(EXAMPLE['shared'])
+    values = EXAMPLE['values']
+    for value in values:
+        shared.add_value(value)
+    groupids = [i % 2 for i in xrange(len(values))]
+    observed = numpy.array([i % 3 for i in xrange(len(values))])
+
+    def empty_mixture():
+        mixture = module.Mixture()
+        for _ in xrange(2):
+            mixture.append(module.Group.from_values(shared, []))
+        mixture.init(shared)
+        return mixture
+
+    expected = empty_mixture()
+    for groupid, value, present in zip(groupids, values, observed):
+        if present:
+            expected.add_value(shared, groupid, value)
+    actual = empty_mixture()
+    actual.add_value_batch(shared, groupids, values, observed)
+    assert_close(
+        actual.score_data(shared),
+        expected.score_data(shared),
+        err_msg='add_value_batch')
+
+    noise = numpy.random.randn(len(values), 2).astype(numpy.float32)
+    expected_scores = noise.copy()
+    for value, scores, present in zip(values, expected_scores, observed):
+        if present:
+            expected.score_value(shared, value, scores)
+    actual_scores = noise.copy()
+    actual.score_value_batch(shared, values, actual_scores, observed)
+    assert_close(actual_scores, expected_scores, err_msg='score_value_batch')
+
+    actual.remove_value_batch(shared, groupids, values, observed)
+    assert_close(
+        actual.score_data(shared),
+        empty_mixture().score_data(shared),
+        err_msg='remove_value_batch')
+
+
+@for_each_model(lambda module: hasattr(module, 'BlockMixture'))
+def test_block_mixture_score(module, EXAMPLE):
+    shared = module.Shared.from_dict(EXAMPLE['shared'])
+    values = EXAMPLE['values']
+    for value in values:
+        shared.add_value(value)
+
+    column_count = 3
+    rows = [
+        [values[(i + c) % len(values)] for c in xrange(column_count)]
+        for i in xrange(len(values))
+    ]
+    shareds = [shared] * column_count
+    mixtures = [module.Mixture() for _ in xrange(column_count)]
+    block = module.BlockMixture()
+    for c, mixture in enumerate(mixtures):
+        groups = [module.Group.from_values(shared, [row[c]]) for row in rows]
+        for group in groups:
+            mixture.append(group)
+        mixture.init(shared)
+        block.append(groups)
+    block.init(shareds)
+    assert_equal(block.column_count(), column_count)
+
+    def check_score_row(row):
+        expected = numpy.zeros(len(block), dtype=numpy.float32)
+        for c, mixture in enumerate(mixtures):
+            mixture.score_value(shared, row[c], expected)
+        actual = numpy.zeros(len(block), dtype=numpy.float32)
+        block.score_row(row, actual)
+        assert_close(actual, expected, err_msg='score_row {}'.format(row))
+        another = [
+            block.score_row_group(i, row)
+            for i in xrange(len(block))
+        ]
+        assert_close(another, expected, err_msg='score_row_group')
+        return actual
+
+    def check_score_data():
+        expected = sum(mixture.score_data(shared) for mixture in mixtures)
+        assert_close(block.score_data(), expected, err_msg='score_data')
+
+    groupids = []
+    for row in rows:
+        scores = check_score_row(row)
+        groupid = sample_discrete(scores_to_probs(scores))
+        block.add_row(groupid, row)
+        for c, mixture in enumerate(mixtures):
+            mixture.add_value(shared, groupid, row[c])
+        groupids.append(groupid)
+        check_score_data()
+
+    block.add_group()
+    for mixture in mixtures:
+        mixture.add_group(shared)
+    check_score_row(rows[0])
+
+    for row, groupid in zip(rows, groupids):
+        block.remove_row(groupid, row)
+        for c, mixture in enumerate(mixtures):
+            mixture.remove_value(shared, groupid, row[c])
+        check_score_row(row)
+    check_score_data()
+
+    block.remove_group(0)
+    for mixture in mixtures:
+        mixture.remove_group(shared, 0)
+    assert_equal(len(block), len(rows))
+    for row in rows:
+        check_score_row(row)
+
+
+@for_each_model(
+    lambda module: hasattr(module, 'BlockMixture'),
+    lambda module: module.__name__.endswith('.bb'))
+def test_block_mixture_missing(module, EXAMPLE):
+    shared = module.Shared.from_dict(EXAMPLE['shared'])
+    values = EXAMPLE['values']
+    column_count = 40
+    rows = [
+        [values[(i + c) % len(values)] for c in xrange(column_count)]
+        for i in xrange(len(values))
+    ]
+    presents = [
+        [(i * c) % 3 != 0 for c in xrange(column_count)]
+        for i in xrange(len(values))
+    ]
+    shareds = [shared] * column_count
+    mixtures = [module.Mixture() for _ in xrange(column_count)]
+    block = module.BlockMixture()
+    for mixture in mixtures:
+        groups = [module.Group.from_values(shared, []) for _ in xrange(3)]
+        for group in groups:
+            mixture.append(group)
+        mixture.init(shared)
+        block.append(groups)
+    block.init(shareds)
+
+    for i, (row, present) in enumerate(zip(rows, presents)):
+        groupid = i % len(block)
+        expected = numpy.zeros(len(block), dtype=numpy.float32)
+        for c, mixture in enumerate(mixtures):
+            if present[c]:
+                mixture.score_value(shared, row[c], expected)
+        actual = numpy.zeros(len(block), dtype=numpy.float32)
+        block.score_row(row, actual, present)
+        assert_close(actual, expected, err_msg='score_row')
+        block.add_row(groupid, row, present)
+        for c, mixture in enumerate(mixtures):
+            if present[c]:
+                mixture.add_value(shared, groupid, row[c])
+
+    expected = sum(mixture.score_data(shared) for mixture in mixtures)
+    assert_close(block.score_data(), expected, err_msg='score_data')
+
+
+@for_each_model(lambda module: hasattr(module, 'Mixture'))
+def test_mixture_score_value_aligned(module, EXAMPLE):
+    shared = module.Shared.from_dict(EXAMPLE['shared'])
+    values = EXAMPLE['values']
+    for value in values:
+        shared.add_value(value)
+
+    mixture = module.Mixture()
+    for value in values:
+        mixture.append(module.Group.from_values(shared, [value]))
+    mixture.init(shared)
+
+    for value in values:
+        noise = numpy.random.randn(len(mixture))
+        aligned = aligned_zeros(len(mixture))
+        aligned += noise
+        unaligned = numpy.zeros(1 + len(mixture), dtype=numpy.float32)[1:]
+        unaligned += noise
+        mixture.score_value(shared, value, aligned)
+        mixture.score_value(shared, value, unaligned)
+        assert_close(
+            aligned,
+            unaligned,
+            err_msg='score_value {}'.format(value))
@@ -34,7 +34,7 @@ import scipy.ndimage
 from distributions.dbg.random import sample_discrete, sample_discrete_log
 from distributions.lp.models import nich
 from distributions.lp.clustering import PitmanYor
-from distributions.lp.mixture import MixtureIdTracker
+from distributions.lp.mixture import MixtureIdTracker, gibbs_init, gibbs_pass
 from distributions.io.stream import json_stream_load, json_stream_dump
 from multiprocessing import Process
 import parsable
@@ -110,6 +110,13 @@ class ImageModel(object):
                 self.feature_y.add_group(model.feature)
                 self.id_tracker.add_group()
 
+        def bind(self, model, xys):
+            xs, ys = numpy.array(xys, dtype=numpy.float32).T
+            return [
+                self.feature_x.bind(model.feature, xs),
+                self.feature_y.bind(model.feature, ys),
+            ]
+
         def remove_value(self, model, groupid, xy):
             x, y = xy
             group_removeed = self.clustering.remove_value(
@@ -142,16 +149,21 @@ def sample_from_image(image, sample_count):
 
 def synthesize_image(model, mixture):
     width, height = IMAGE.shape
-    image = numpy.zeros((width, height))
-    scores = numpy.zeros(len(mixture), dtype=numpy.float32)
     x_scale = 2.0 / (width - 1)
     y_scale = 2.0 / (height - 1)
-    for x in xrange(width):
-        for y in xrange(height):
-            xy = (x * x_scale - 1.0, y * y_scale - 1.0)
-            mixture.score_value(model, xy, scores)
-            prob = numpy.exp(scores, out=scores).sum()
-            image[x, y] = prob
+    xs = numpy.arange(width, dtype=numpy.float32) * x_scale - 1.0
+    ys = numpy.arange(height, dtype=numpy.float32) * y_scale - 1.0
+
+    scores = numpy.zeros(len(mixture), dtype=numpy.float32)
+    mixture.clustering.score_value(model.clustering, scores)
+    x_scores = numpy.zeros((width, len(mixture)), dtype=numpy.float32)
+    y_scores = numpy.zeros((height, len(mixture)), dtype=numpy.float32)
+    x_scores += scores
+    mixture.feature_x.score_value_batch(model.feature, xs, x_scores)
+    mixture.feature_y.score_value_batch(model.feature, ys, y_scores)
+
+    # prob(x, y) = sum_g exp(score_g + score_g(x) + score_g(y))
+    image = numpy.exp(x_scores).dot(numpy.exp(y_scores).T)
 
     image /= image.max()
     image -= 1.0
@@ -233,15 +245,17 @@ def compress_gibbs(passes=PASSES):
 
     print 'prior+gibbs init with {} components'.format(len(mixture))
 
+    features = mixture.bind(model, list(json_stream_load(SAMPLES)))
+    assignments = numpy.array(
+        [assignments[i] for i in xrange(len(assignments))],
+        dtype=numpy.int32)
     for _ in xrange(passes):
-        for i, xy in enumerate(json_stream_load(SAMPLES)):
-            groupid = mixture.id_tracker.global_to_packed(assignments[i])
-            mixture.remove_value(model, groupid, xy)
-            scores.resize(len(mixture))
-            mixture.score_value(model, xy, scores)
-            groupid = sample_discrete_log(scores)
-            mixture.add_value(model, groupid, xy)
-            assignments[i] = mixture.id_tracker.packed_to_global(groupid)
+        gibbs_pass(
+            model.clustering,
+            mixture.clustering,
+            mixture.id_tracker,
+            features,
+            assignments)
 
     print 'prior+gibbs found {} components'.format(len(mixture))
     image = synthesize_image(model, mixture)
@@ -259,27 +273,25 @@ def compress_seq_gibbs(passes=PASSES):
     model = ImageModel()
     mixture = ImageModel.Mixture()
     mixture.init(model)
-    scores = numpy.zeros(1, dtype=numpy.float32)
-    assignments = {}
+    features = mixture.bind(model, list(json_stream_load(SAMPLES)))
+    assignments = numpy.zeros(len(features[0]), dtype=numpy.int32)
 
-    for i, xy in enumerate(json_stream_load(SAMPLES)):
-        scores.resize(len(mixture))
-        mixture.score_value(model, xy, scores)
-        groupid = sample_discrete_log(scores)
-        mixture.add_value(model, groupid, xy)
-        assignments[i] = mixture.id_tracker.packed_to_global(groupid)
+    gibbs_init(
+        model.clustering,
+        mixture.clustering,
+        mixture.id_tracker,
+        features,
+        assignments)
 
     print 'seq+gibbs init with {} components'.format(len(mixture))
 
     for _ in xrange(passes - 1):
-        for i, xy in enumerate(json_stream_load(SAMPLES)):
-            groupid = mixture.id_tracker.global_to_packed(assignments[i])
-            mixture.remove_value(model, groupid, xy)
-            scores.resize(len(mixture))
-            mixture.score_value(model, xy, scores)
-            groupid = sample_discrete_log(scores)
-            mixture.add_value(model, groupid, xy)
-            assignments[i] = mixture.id_tracker.packed_to_global(groupid)
+        gibbs_pass(
+            model.clustering,
+            mixture.clustering,
+            mixture.id_tracker,
+            features,
+            assignments)
 
     print 'seq+gibbs found {} components'.format(len(mixture))
     image = synthesize_image(model, mixture)
@@ -61,6 +61,11 @@ namespace distributions {
 // avx instructions require alignment of 32 bytes
 static const size_t default_alignment = 32;
 
+template<class T>
+inline bool is_aligned(const T * data, size_t alignment = default_alignment) {
+    return (reinterpret_cast<size_t>(data) & (alignment - 1UL)) == 0;
+}
+
 template<class T, size_t alignment = default_alignment>
 class aligned_allocator {
  public:
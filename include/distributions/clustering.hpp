@@ -27,7 +27,9 @@
 
 #pragma once
 
+#include <cmath>
 #include <vector>
+#include <algorithm>
 #include <unordered_map>
 #include <unordered_set>
 #include <distributions/common.hpp>
@@ -51,6 +53,27 @@ typedef std::unordered_map<count_t, count_t, TrivialHash<count_t>> Assignments;
 static std::vector<count_t> count_assignments(
         const Assignments & assignments);
 
+// Count group sizes of an assignment vector with arbitrary nonnegative
+// groupids, relabeling groups to contiguous ids in order of groupid.
+// Optional arguments may be null:
+// - weights[i] is the count of row i (default 1)
+// - packed_assignments is written with each row's contiguous groupid
+// - relabel is written with the original groupid of each contiguous id
+static std::vector<count_t> count_assignments(
+        size_t size,
+        const count_t * assignments,
+        const count_t * weights = nullptr,
+        count_t * packed_assignments = nullptr,
+        std::vector<count_t> * relabel = nullptr);
+
+// A histogram of group sizes, as (group_size, group_count) pairs sorted by
+// group_size.  Scoring a histogram costs O(#distinct sizes), not O(#groups).
+typedef std::vector<std::pair<count_t, count_t>> CountHistogram;
+
+static CountHistogram count_histogram(
+        size_t size,
+        const count_t * counts);
+
 
 // --------------------------------------------------------------------------
 // Pitman-Yor Model
@@ -75,8 +98,64 @@ struct PitmanYor {
             count_t size,
             rng_t & rng) const;
 
+    // Equivalent to sample_assignments, but samples each table in
+    // O(log(table_count)) rather than by a linear scan.  This is faster
+    // for very large sizes when d > 0, since table_count ~ size^d.
+    std::vector<count_t> sample_assignments_sublinear(
+            count_t size,
+            rng_t & rng) const;
+
+    float score_counts(
+            const std::vector<count_t> & counts) const {
+        return score_counts(counts.size(), counts.data());
+    }
+
     float score_counts(
-            const std::vector<count_t> & counts) const;
+            size_t size,
+            const count_t * counts) const {
+        return score_count_histogram(count_histogram(size, counts));
+    }
+
+    float score_count_histogram(const CountHistogram & histogram) const;
+
+    // change in score_counts if nonempty group groupid of mixture were
+    // split into two nonempty groups of sizes size0 and size1
+    template<class Mixture>
+    float score_split(
+            const Mixture & mixture,
+            size_t groupid,
+            count_t size0,
+            count_t size1) const {
+        const count_t size = mixture.counts(groupid);
+        DIST_ASSERT_EQ(size0 + size1, size);
+        const double nonempty_group_count =
+            mixture.counts().size() - mixture.empty_groupids().size();
+        const double sample_size = mixture.sample_size();
+        return _score_group(size0)
+             + _score_group(size1)
+             - _score_group(size)
+             + _score_partition(nonempty_group_count + 1, sample_size)
+             - _score_partition(nonempty_group_count, sample_size);
+    }
+
+    // change in score_counts if nonempty groups groupid1 and groupid2 of
+    // mixture were merged into one
+    template<class Mixture>
+    float score_merge(
+            const Mixture & mixture,
+            size_t groupid1,
+            size_t groupid2) const {
+        const count_t size1 = mixture.counts(groupid1);
+        const count_t size2 = mixture.counts(groupid2);
+        const double nonempty_group_count =
+            mixture.counts().size() - mixture.empty_groupids().size();
+        const double sample_size = mixture.sample_size();
+        return _score_group(size1 + size2)
+             - _score_group(size1)
+             - _score_group(size2)
+             + _score_partition(nonempty_group_count - 1, sample_size)
+             - _score_partition(nonempty_group_count, sample_size);
+    }
 
     float score_add_value(
             count_t group_size,
@@ -150,6 +229,7 @@ struct PitmanYor {
 
         void init(const Model & model) {
             driver_.init(model);
+            _init_score(model);
             const size_t group_count = driver_.counts().size();
             shifted_scores_.resize(group_count);
             for (size_t i = 0; i < group_count; ++i) {
@@ -164,7 +244,9 @@ struct PitmanYor {
                 const Model & model,
                 size_t groupid,
                 count_t count = 1) {
+            const count_t old_size = counts(groupid);
             const bool add_group = driver_.add_value(model, groupid, count);
+            _update_score(model, old_size, old_size + count);
 
             if (DIST_UNLIKELY(add_group)) {
                 shifted_scores_.packed_add();
@@ -179,8 +261,10 @@ struct PitmanYor {
                 const Model & model,
                 size_t groupid,
                 count_t count = 1) {
+            const count_t old_size = counts(groupid);
             const bool remove_group =
                 driver_.remove_value(model, groupid, count);
+            _update_score(model, old_size, old_size - count);
 
             if (DIST_UNLIKELY(remove_group)) {
                 shifted_scores_.packed_remove(groupid);
@@ -208,10 +292,56 @@ struct PitmanYor {
         }
 
         float score_data(const Model & model) const {
-            return driver_.score_data(model);
+            const size_t nonempty_group_count =
+                counts().size() - empty_groupids().size();
+            return group_score_sum_ + model._score_partition(
+                nonempty_group_count,
+                sample_size());
+        }
+
+        template<class Writer>
+        void binary_dump(Writer & writer) const {
+            driver_.binary_dump(writer);
+            writer.write(group_score_sum_);
+            writer.write(update_count_);
+            writer.write_array(shifted_scores_);
+        }
+
+        template<class Reader>
+        void binary_load(Reader & reader) {
+            driver_.binary_load(reader);
+            reader.read(group_score_sum_);
+            reader.read(update_count_);
+            reader.read_array(shifted_scores_);
+            DIST_ASSERT_EQ(shifted_scores_.size(), counts().size());
         }
 
      private:
+        // score_data is tracked incrementally as a sum of per-group scores,
+        // and is periodically recomputed to bound accumulated rounding error.
+        void _init_score(const Model & model) {
+            const auto & sizes = counts();
+            group_score_sum_ = 0;
+            update_count_ = 0;
+            for (auto pair : count_histogram(sizes.size(), sizes.data())) {
+                const double score = model._score_group(pair.first);
+                group_score_sum_ += pair.second * score;
+            }
+        }
+
+        void _update_score(
+                const Model & model,
+                count_t old_size,
+                count_t new_size) {
+            const size_t refresh_period = 1024 + 16 * counts().size();
+            if (DIST_UNLIKELY(++update_count_ > refresh_period)) {
+                _init_score(model);
+            } else {
+                group_score_sum_ +=
+                    model._score_group_change(old_size, new_size);
+            }
+        }
+
         void _update_nonempty_group(const Model & model, size_t groupid) {
             auto const group_size = counts(groupid);
             DIST_ASSERT2(group_size, "expected nonempty group");
@@ -231,11 +361,41 @@ struct PitmanYor {
 
         MixtureDriver<PitmanYor, count_t> driver_;
         VectorFloat shifted_scores_;
+        double group_score_sum_;
+        size_t update_count_;
     };
 
     // The uncached version is useful for debugging
     // typedef MixtureDriver<PitmanYor, count_t> Mixture;
     typedef CachedMixture Mixture;
+
+ private:
+    // score_counts = sum of _score_group over groups + _score_partition
+
+    double _score_group(count_t group_size) const {
+        return group_size
+            ? std::lgamma(group_size - static_cast<double>(d))
+                - std::lgamma(1.0 - d)
+            : 0.0;
+    }
+
+    double _score_group_change(count_t old_size, count_t new_size) const {
+        if (new_size == old_size + 1) {
+            return old_size
+                ? std::log(old_size - static_cast<double>(d))
+                : 0.0;
+        } else if (old_size == new_size + 1) {
+            return new_size
+                ? -std::log(new_size - static_cast<double>(d))
+                : 0.0;
+        } else {
+            return _score_group(new_size) - _score_group(old_size);
+        }
+    }
+
+    double _score_partition(
+            double nonempty_group_count,
+            double sample_size) const;
 };
 
 
@@ -259,7 +419,52 @@ struct LowEntropy {
             count_t sample_size,
             rng_t & rng) const;
 
-    float score_counts(const std::vector<count_t> & counts) const;
+    float score_counts(const std::vector<count_t> & counts) const {
+        return score_counts(counts.size(), counts.data());
+    }
+
+    float score_counts(size_t size, const count_t * counts) const {
+        return score_count_histogram(count_histogram(size, counts));
+    }
+
+    float score_count_histogram(const CountHistogram & histogram) const;
+
+    // change in score_counts if nonempty group groupid of mixture were
+    // split into two nonempty groups of sizes size0 and size1
+    template<class Mixture>
+    float score_split(
+            const Mixture & mixture,
+            size_t groupid,
+            count_t size0,
+            count_t size1) const {
+        const count_t size = mixture.counts(groupid);
+        DIST_ASSERT_EQ(size0 + size1, size);
+        const count_t group_count = mixture.counts().size();
+        const count_t sample_size = mixture.sample_size();
+        return _score_group(size0)
+             + _score_group(size1)
+             - _score_group(size)
+             + _score_partition(group_count + 1, sample_size)
+             - _score_partition(group_count, sample_size);
+    }
+
+    // change in score_counts if nonempty groups groupid1 and groupid2 of
+    // mixture were merged into one
+    template<class Mixture>
+    float score_merge(
+            const Mixture & mixture,
+            size_t groupid1,
+            size_t groupid2) const {
+        const count_t size1 = mixture.counts(groupid1);
+        const count_t size2 = mixture.counts(groupid2);
+        const count_t group_count = mixture.counts().size();
+        const count_t sample_size = mixture.sample_size();
+        return _score_group(size1 + size2)
+             - _score_group(size1)
+             - _score_group(size2)
+             + _score_partition(group_count - 1, sample_size)
+             - _score_partition(group_count, sample_size);
+    }
 
     float score_add_value(
             count_t group_size,
@@ -273,21 +478,9 @@ struct LowEntropy {
         }
 
         if (group_size == 0) {
-            float score = -fast_log(empty_group_count);
-            if (sample_size + 1 < dataset_size) {
-                score += _approximate_postpred_correction(sample_size + 1);
-            }
-            return score;
-        }
-
-        // see `python derivations/clustering.py fastlog`
-        const count_t very_large = 10000;
-        float bigger = 1.f + group_size;
-        if (group_size > very_large) {
-            return 1.f + fast_log(bigger);
+            return _score_add_empty_value(sample_size, empty_group_count);
         } else {
-            return fast_log(bigger / group_size) * group_size
-                 + fast_log(bigger);
+            return _score_add_nonempty_value(group_size);
         }
     }
 
@@ -310,9 +503,205 @@ struct LowEntropy {
 
     float log_partition_function(count_t sample_size) const;
 
-    typedef MixtureDriver<LowEntropy, count_t> Mixture;
+    // HACK gcc doesn't want Mixture defined outside of LowEntropy
+    class CachedMixture {
+     public:
+        typedef LowEntropy Model;
+        typedef typename MixtureDriver<LowEntropy, count_t>::IdSet IdSet;
+
+        std::vector<count_t> & counts() {
+            return driver_.counts();
+        }
+
+        const std::vector<count_t> & counts() const {
+            return driver_.counts();
+        }
+
+        count_t counts(size_t groupid) const {
+            return driver_.counts(groupid);
+        }
+
+        const IdSet & empty_groupids() const {
+            return driver_.empty_groupids();
+        }
+
+        size_t sample_size() const {
+            return driver_.sample_size();
+        }
+
+        void init(const Model & model) {
+            driver_.init(model);
+            _init_score(model);
+            const size_t group_count = driver_.counts().size();
+            scores_.resize(group_count);
+            for (size_t i = 0; i < group_count; ++i) {
+                if (driver_.counts(i)) {
+                    _update_nonempty_group(model, i);
+                }
+            }
+            _update_empty_groups(model);
+        }
+
+        bool add_value(
+                const Model & model,
+                size_t groupid,
+                count_t count = 1) {
+            const count_t old_size = counts(groupid);
+            const bool add_group = driver_.add_value(model, groupid, count);
+            _update_score(model, old_size, old_size + count);
+
+            if (DIST_UNLIKELY(add_group)) {
+                scores_.packed_add();
+            }
+            _update_nonempty_group(model, groupid);
+            _update_empty_groups(model);
+
+            return add_group;
+        }
+
+        bool remove_value(
+                const Model & model,
+                size_t groupid,
+                count_t count = 1) {
+            const count_t old_size = counts(groupid);
+            const bool remove_group =
+                driver_.remove_value(model, groupid, count);
+            _update_score(model, old_size, old_size - count);
+
+            if (DIST_UNLIKELY(remove_group)) {
+                scores_.packed_remove(groupid);
+            } else {
+                _update_nonempty_group(model, groupid);
+            }
+            _update_empty_groups(model);
+
+            return remove_group;
+        }
+
+        void score_value(const Model & model, AlignedFloats scores) const {
+            if (DIST_DEBUG_LEVEL >= 1) {
+                DIST_ASSERT_EQ(scores.size(), counts().size());
+                DIST_ASSERT_LT(
+                    sample_size(),
+                    static_cast<size_t>(model.dataset_size));
+            }
+
+            const size_t size = counts().size();
+            const float * __restrict__ in = VectorFloat_data(scores_);
+            float * __restrict__ out = VectorFloat_data(scores);
+            std::copy(in, in + size, out);
+        }
+
+        float score_data(const Model & model) const {
+            return group_score_sum_ + model._score_partition(
+                counts().size(),
+                sample_size());
+        }
+
+        template<class Writer>
+        void binary_dump(Writer & writer) const {
+            driver_.binary_dump(writer);
+            writer.write(group_score_sum_);
+            writer.write(update_count_);
+            writer.write_array(scores_);
+        }
+
+        template<class Reader>
+        void binary_load(Reader & reader) {
+            driver_.binary_load(reader);
+            reader.read(group_score_sum_);
+            reader.read(update_count_);
+            reader.read_array(scores_);
+            DIST_ASSERT_EQ(scores_.size(), counts().size());
+        }
+
+     private:
+        // score_data is tracked incrementally as a sum of per-group scores,
+        // and is periodically recomputed to bound accumulated rounding error.
+        void _init_score(const Model & model) {
+            const auto & sizes = counts();
+            group_score_sum_ = 0;
+            update_count_ = 0;
+            for (auto pair : count_histogram(sizes.size(), sizes.data())) {
+                const double score = model._score_group(pair.first);
+                group_score_sum_ += pair.second * score;
+            }
+        }
+
+        void _update_score(
+                const Model & model,
+                count_t old_size,
+                count_t new_size) {
+            const size_t refresh_period = 1024 + 16 * counts().size();
+            if (DIST_UNLIKELY(++update_count_ > refresh_period)) {
+                _init_score(model);
+            } else {
+                group_score_sum_ +=
+                    model._score_group_change(old_size, new_size);
+            }
+        }
+
+        void _update_nonempty_group(const Model & model, size_t groupid) {
+            auto const group_size = counts(groupid);
+            DIST_ASSERT2(group_size, "expected nonempty group");
+            scores_[groupid] = model._score_add_nonempty_value(group_size);
+        }
+
+        // empty groups share one score, which depends on sample_size
+        void _update_empty_groups(const Model & model) {
+            const float score = model._score_add_empty_value(
+                sample_size(),
+                empty_groupids().size());
+            for (size_t i : empty_groupids()) {
+                scores_[i] = score;
+            }
+        }
+
+        MixtureDriver<LowEntropy, count_t> driver_;
+        VectorFloat scores_;
+        double group_score_sum_;
+        size_t update_count_;
+    };
+
+    // The uncached version is useful for debugging
+    // typedef MixtureDriver<LowEntropy, count_t> Mixture;
+    typedef CachedMixture Mixture;
 
  private:
+    // score_counts = sum of _score_group over groups + _score_partition
+
+    double _score_group(count_t group_size) const {
+        return group_size > 1 ? group_size * std::log(group_size) : 0.0;
+    }
+
+    double _score_group_change(count_t old_size, count_t new_size) const {
+        return _score_group(new_size) - _score_group(old_size);
+    }
+
+    double _score_partition(count_t group_count, count_t sample_size) const;
+
+    float _score_add_empty_value(
+            count_t sample_size,
+            count_t empty_group_count) const {
+        float score = -fast_log(empty_group_count);
+        if (sample_size + 1 < dataset_size) {
+            score += _approximate_postpred_correction(sample_size + 1);
+        }
+        return score;
+    }
+
+    float _score_add_nonempty_value(count_t group_size) const {
+        // see `python derivations/clustering.py fastlog`
+        const count_t very_large = 10000;
+        float bigger = 1.f + group_size;
+        if (group_size > very_large) {
+            return 1.f + fast_log(bigger);
+        } else {
+            return fast_log(bigger / group_size) * group_size
+                 + fast_log(bigger);
+        }
+    }
+
     // ad hoc approximation,
     // see `python derivations/clustering.py postpred`
     // see `python derivations/clustering.py approximations`
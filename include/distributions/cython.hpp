@@ -27,7 +27,10 @@
 
 #pragma once
 
+#include <vector>
 #include <distributions/common.hpp>
+#include <distributions/random_fwd.hpp>
+#include <distributions/vector.hpp>
 
 namespace distributions {
 // helpers for cython-- declaring operator()(unsigned, unsigned) doesn't quite
@@ -50,4 +53,55 @@ inline DIST_ALWAYS_INLINE void float_op_set2(
     t(arg0, arg1) = v;
 }
 
+// AlignedFloats has no default constructor, so cython can only hold one on
+// the heap; these build the view on the stack around an aligned buffer
+
+template <typename Mixture, typename Model>
+inline DIST_ALWAYS_INLINE void mixture_score_value(
+    const Mixture & mixture,
+    const Model & model,
+    float * scores,
+    size_t size) {
+    mixture.score_value(model, AlignedFloats(scores, size));
+}
+
+template <typename Mixture, typename Shared, typename Value>
+inline DIST_ALWAYS_INLINE void mixture_score_value(
+    const Mixture & mixture,
+    const Shared & shared,
+    const Value & value,
+    float * scores_accum,
+    size_t size,
+    rng_t & rng) {
+    mixture.score_value(shared, value, AlignedFloats(scores_accum, size), rng);
+}
+
+template <typename BlockMixture, typename Shared, typename Value>
+inline DIST_ALWAYS_INLINE void block_mixture_score_row(
+    const BlockMixture & mixture,
+    const std::vector<Shared> & shareds,
+    const Value * row,
+    float * scores_accum,
+    size_t size,
+    rng_t & rng) {
+    mixture.score_row(shareds, row, AlignedFloats(scores_accum, size), rng);
+}
+
+template <typename BlockMixture, typename Shared, typename Word>
+inline DIST_ALWAYS_INLINE void block_mixture_score_row(
+    const BlockMixture & mixture,
+    const std::vector<Shared> & shareds,
+    const Word * heads,
+    const Word * present,
+    float * scores_accum,
+    size_t size,
+    rng_t & rng) {
+    mixture.score_row(
+        shareds,
+        heads,
+        present,
+        AlignedFloats(scores_accum, size),
+        rng);
+}
+
 }  // namespace distributions
@@ -0,0 +1,750 @@
+// Copyright (c) 2014, Salesforce.com, Inc.  All rights reserved.
+//
+// Redistribution and use in source and binary forms, with or without
+// modification, are permitted provided that the following conditions
+// are met:
+//
+// - Redistributions of source code must retain the above copyright
+//   notice, this list of conditions and the following disclaimer.
+// - Redistributions in binary form must reproduce the above copyright
+//   notice, this list of conditions and the following disclaimer in the
+//   documentation and/or other materials provided with the distribution.
+// - Neither the name of Salesforce.com nor the names of its contributors
+//   may be used to endorse or promote products derived from this
+//   software without specific prior written permission.
+//
+// THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+// "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+// LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+// FOR A PARTICULAR PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE
+// COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+// INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+// BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS
+// OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+// ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR
+// TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
+// USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#pragma once
+
+#include <vector>
+#include <algorithm>
+#include <unordered_map>
+#include <thread>  // NOLINT(*)
+#include <mutex>  // NOLINT(*)
+#include <condition_variable>  // NOLINT(*)
+#include <exception>
+#include <string>
+#include <distributions/common.hpp>
+#include <distributions/special.hpp>
+#include <distributions/random.hpp>
+#include <distributions/vector.hpp>
+#include <distributions/vector_math.hpp>
+#include <distributions/trivial_hash.hpp>
+#include <distributions/mixture.hpp>
+#include <distributions/io/checkpoint.hpp>
+
+namespace distributions {
+
+// --------------------------------------------------------------------------
+// Mixture Feature
+//
+// This interface binds a feature mixture to its shared model and to a
+// column of data, so that heterogeneous features can be driven by a
+// single sampling loop.  Rows are addressed by their index in the column.
+
+class MixtureFeature {
+ public:
+    virtual ~MixtureFeature() {}
+
+    virtual size_t row_count() const = 0;
+    virtual size_t group_count() const = 0;
+
+    virtual void add_group(rng_t & rng) = 0;
+    virtual void remove_group(size_t groupid) = 0;
+    virtual void add_value(size_t groupid, size_t rowid, rng_t & rng) = 0;
+    virtual void remove_value(size_t groupid, size_t rowid, rng_t & rng) = 0;
+    virtual void score_value(
+            size_t rowid,
+            AlignedFloats scores_accum,
+            rng_t & rng) const = 0;
+    virtual float score_group(size_t groupid, rng_t & rng) const = 0;
+
+    // Split-merge proposals build two scratch groups outside the mixture.
+    virtual void split_init(rng_t & rng) = 0;
+    virtual void split_add_value(size_t half, size_t rowid, rng_t & rng) = 0;
+    virtual float split_score_value(
+            size_t half,
+            size_t rowid,
+            rng_t & rng) const = 0;
+    virtual float split_score_data(rng_t & rng) const = 0;
+    virtual float merge_score_data(rng_t & rng) const = 0;
+
+    virtual void binary_dump(CheckpointWriter & writer) const = 0;
+    virtual void binary_load(CheckpointReader & reader) = 0;
+};
+
+template<class Model>
+class MixtureFeature_ : public MixtureFeature {
+ public:
+    typedef typename Model::Value Value;
+    typedef typename Model::Shared Shared;
+    typedef typename Model::Mixture Mixture;
+    typedef typename Model::Group Group;
+
+    MixtureFeature_(
+            const Shared & shared,
+            Mixture & mixture,
+            const Value * values,
+            size_t row_count) :
+        shared_(shared),
+        mixture_(mixture),
+        values_(values),
+        row_count_(row_count) {
+    }
+
+    size_t row_count() const { return row_count_; }
+    size_t group_count() const { return mixture_.groups().size(); }
+
+    void add_group(rng_t & rng) {
+        mixture_.add_group(shared_, rng);
+    }
+
+    void remove_group(size_t groupid) {
+        mixture_.remove_group(shared_, groupid);
+    }
+
+    void add_value(size_t groupid, size_t rowid, rng_t & rng) {
+        if (DIST_DEBUG_LEVEL >= 2) {
+            DIST_ASSERT_LT(rowid, row_count_);
+        }
+        mixture_.add_value(shared_, groupid, values_[rowid], rng);
+    }
+
+    void remove_value(size_t groupid, size_t rowid, rng_t & rng) {
+        if (DIST_DEBUG_LEVEL >= 2) {
+            DIST_ASSERT_LT(rowid, row_count_);
+        }
+        mixture_.remove_value(shared_, groupid, values_[rowid], rng);
+    }
+
+    void score_value(
+            size_t rowid,
+            AlignedFloats scores_accum,
+            rng_t & rng) const {
+        if (DIST_DEBUG_LEVEL >= 2) {
+            DIST_ASSERT_LT(rowid, row_count_);
+        }
+        mixture_.score_value(shared_, values_[rowid], scores_accum, rng);
+    }
+
+    float score_group(size_t groupid, rng_t & rng) const {
+        return mixture_.groups(groupid).score_data(shared_, rng);
+    }
+
+    void split_init(rng_t & rng) {
+        split_[0].init(shared_, rng);
+        split_[1].init(shared_, rng);
+    }
+
+    void split_add_value(size_t half, size_t rowid, rng_t & rng) {
+        if (DIST_DEBUG_LEVEL >= 2) {
+            DIST_ASSERT_LT(half, 2);
+            DIST_ASSERT_LT(rowid, row_count_);
+        }
+        split_[half].add_value(shared_, values_[rowid], rng);
+    }
+
+    float split_score_value(size_t half, size_t rowid, rng_t & rng) const {
+        if (DIST_DEBUG_LEVEL >= 2) {
+            DIST_ASSERT_LT(half, 2);
+            DIST_ASSERT_LT(rowid, row_count_);
+        }
+        return split_[half].score_value(shared_, values_[rowid], rng);
+    }
+
+    float split_score_data(rng_t & rng) const {
+        return split_[0].score_data(shared_, rng)
+             + split_[1].score_data(shared_, rng);
+    }
+
+    float merge_score_data(rng_t & rng) const {
+        Group merged = split_[0];
+        merged.merge(shared_, split_[1], rng);
+        return merged.score_data(shared_, rng);
+    }
+
+    void binary_dump(CheckpointWriter & writer) const {
+        mixture_.binary_dump(writer);
+    }
+
+    void binary_load(CheckpointReader & reader) {
+        mixture_.binary_load(reader);
+        if (DIST_DEBUG_LEVEL >= 3) {
+            mixture_.validate(shared_);
+        }
+    }
+
+ private:
+    const Shared & shared_;
+    Mixture & mixture_;
+    const Value * const values_;
+    const size_t row_count_;
+    Group split_[2];
+};
+
+
+// --------------------------------------------------------------------------
+// Product Mixture
+//
+// This container drives many features as a single product mixture,
+// following the add_group/remove_group/add_value/remove_value contract of
+// MixtureSlave.  score_value splits the features among a persistent pool
+// of worker threads; each worker accumulates into its own partial scores,
+// which are summed into scores_accum once all workers finish.
+
+class ProductMixture {
+ public:
+    ProductMixture(
+            const std::vector<MixtureFeature *> & features,
+            size_t thread_count,
+            rng_t & rng) :
+        features_(features),
+        tasks_(std::max(size_t(1), std::min(thread_count, features.size()))),
+        generation_(0),
+        pending_(0),
+        stopping_(false),
+        rowid_(0) {
+        const size_t task_count = tasks_.size();
+        const size_t feature_count = features_.size();
+        for (size_t i = 0; i < task_count; ++i) {
+            Task & task = tasks_[i];
+            task.begin = feature_count * i / task_count;
+            task.end = feature_count * (i + 1) / task_count;
+        }
+        for (size_t i = 1; i < task_count; ++i) {
+            tasks_[i].rng.seed(rng());
+            workers_.push_back(std::thread(&ProductMixture::_work, this, i));
+        }
+    }
+
+    ~ProductMixture() {
+        {
+            std::unique_lock<std::mutex> lock(mutex_);
+            stopping_ = true;
+        }
+        work_cond_.notify_all();
+        for (auto & worker : workers_) {
+            worker.join();
+        }
+    }
+
+    const std::vector<MixtureFeature *> & features() const {
+        return features_;
+    }
+
+    size_t thread_count() const { return tasks_.size(); }
+
+    void add_group(rng_t & rng) {
+        for (auto * feature : features_) {
+            feature->add_group(rng);
+        }
+    }
+
+    void remove_group(size_t groupid) {
+        for (auto * feature : features_) {
+            feature->remove_group(groupid);
+        }
+    }
+
+    void add_value(size_t groupid, size_t rowid, rng_t & rng) {
+        for (auto * feature : features_) {
+            feature->add_value(groupid, rowid, rng);
+        }
+    }
+
+    void remove_value(size_t groupid, size_t rowid, rng_t & rng) {
+        for (auto * feature : features_) {
+            feature->remove_value(groupid, rowid, rng);
+        }
+    }
+
+    void score_value(
+            size_t rowid,
+            AlignedFloats scores_accum,
+            rng_t & rng) {
+        if (workers_.empty()) {
+            for (const auto * feature : features_) {
+                feature->score_value(rowid, scores_accum, rng);
+            }
+            return;
+        }
+
+        const size_t size = scores_accum.size();
+        {
+            std::unique_lock<std::mutex> lock(mutex_);
+            rowid_ = rowid;
+            for (size_t i = 1; i < tasks_.size(); ++i) {
+                tasks_[i].scores.resize(size);
+            }
+            pending_ = workers_.size();
+            ++generation_;
+        }
+        work_cond_.notify_all();
+
+        // workers write into tasks_ and features, so even on error we must
+        // wait for all of them before returning
+        std::exception_ptr error;
+        try {
+            const Task & task = tasks_[0];
+            for (size_t f = task.begin; f < task.end; ++f) {
+                features_[f]->score_value(rowid, scores_accum, rng);
+            }
+        } catch (...) {
+            error = std::current_exception();
+        }
+
+        {
+            std::unique_lock<std::mutex> lock(mutex_);
+            done_cond_.wait(lock, [this]{ return pending_ == 0; });
+        }
+        for (size_t i = 1; i < tasks_.size(); ++i) {
+            Task & task = tasks_[i];
+            if (DIST_UNLIKELY(task.error)) {
+                if (not error) {
+                    error = task.error;
+                }
+                task.error = nullptr;
+            }
+        }
+        if (DIST_UNLIKELY(error)) {
+            std::rethrow_exception(error);
+        }
+        for (size_t i = 1; i < tasks_.size(); ++i) {
+            vector_add(size, scores_accum.data(), tasks_[i].scores.data());
+        }
+    }
+
+ private:
+    struct Task {
+        size_t begin;
+        size_t end;
+        VectorFloat scores;
+        rng_t rng;
+        std::exception_ptr error;
+    };
+
+    void _work(size_t taskid) {
+        Task & task = tasks_[taskid];
+        size_t generation = 0;
+        while (true) {
+            size_t rowid;
+            {
+                std::unique_lock<std::mutex> lock(mutex_);
+                work_cond_.wait(lock, [this, generation]{
+                    return stopping_ or generation_ != generation;
+                });
+                if (stopping_) {
+                    return;
+                }
+                generation = generation_;
+                rowid = rowid_;
+            }
+
+            try {
+                vector_zero(task.scores.size(), task.scores.data());
+                for (size_t f = task.begin; f < task.end; ++f) {
+                    features_[f]->score_value(rowid, task.scores, task.rng);
+                }
+            } catch (...) {
+                task.error = std::current_exception();
+            }
+
+            {
+                std::unique_lock<std::mutex> lock(mutex_);
+                if (--pending_ == 0) {
+                    done_cond_.notify_one();
+                }
+            }
+        }
+    }
+
+    const std::vector<MixtureFeature *> features_;
+    std::vector<Task> tasks_;
+    std::vector<std::thread> workers_;
+    std::mutex mutex_;
+    std::condition_variable work_cond_;
+    std::condition_variable done_cond_;
+    size_t generation_;
+    size_t pending_;
+    bool stopping_;
+    size_t rowid_;
+};
+
+
+// --------------------------------------------------------------------------
+// Gibbs Sampling
+//
+// These sweeps resample the assignments of rows to groups under a
+// clustering model (e.g. Clustering<int>::PitmanYor) times a product of
+// feature mixtures.  Assignments are stored as global ids of id_tracker,
+// which remain valid as groups are added and removed.
+
+template<class Clustering>
+struct GibbsSampler {
+    typedef typename Clustering::Mixture ClusteringMixture;
+    typedef MixtureIdTracker::Id Id;
+
+    GibbsSampler(
+            const Clustering & clustering,
+            ClusteringMixture & mixture,
+            MixtureIdTracker & id_tracker,
+            const std::vector<MixtureFeature *> & features,
+            size_t thread_count,
+            rng_t & rng) :
+        clustering_(clustering),
+        mixture_(mixture),
+        id_tracker_(id_tracker),
+        product_(features, thread_count, rng) {
+        const size_t group_count = mixture_.counts().size();
+        DIST_ASSERT_EQ(id_tracker_.packed_size(), group_count);
+        for (const auto * feature : product_.features()) {
+            DIST_ASSERT_EQ(feature->group_count(), group_count);
+        }
+    }
+
+    void add_row(size_t rowid, Id & assignment, rng_t & rng) {
+        const size_t groupid = _sample(rowid, rng);
+        _add(groupid, rowid, rng);
+        assignment = id_tracker_.packed_to_global(groupid);
+    }
+
+    void remove_row(size_t rowid, Id assignment, rng_t & rng) {
+        const size_t groupid = id_tracker_.global_to_packed(assignment);
+        _remove(groupid, rowid, rng);
+    }
+
+    // sequentially assign rows that have not yet been added
+    void init(size_t row_count, Id * assignments, rng_t & rng) {
+        _check_row_count(row_count);
+        for (size_t rowid = 0; rowid < row_count; ++rowid) {
+            add_row(rowid, assignments[rowid], rng);
+        }
+    }
+
+    // resample every row, each of which must already be added
+    void pass(size_t row_count, Id * assignments, rng_t & rng) {
+        _check_row_count(row_count);
+        for (size_t rowid = 0; rowid < row_count; ++rowid) {
+            remove_row(rowid, assignments[rowid], rng);
+            add_row(rowid, assignments[rowid], rng);
+        }
+        id_tracker_.compact();
+    }
+
+    // propose move_count split-merge moves, returning the number accepted
+    size_t split_merge(
+            size_t row_count,
+            Id * assignments,
+            size_t move_count,
+            rng_t & rng) {
+        _check_row_count(row_count);
+        if (row_count < 2) {
+            return 0;
+        }
+
+        members_.clear();
+        for (size_t rowid = 0; rowid < row_count; ++rowid) {
+            members_[assignments[rowid]].push_back(rowid);
+        }
+
+        size_t accepted = 0;
+        for (size_t move = 0; move < move_count; ++move) {
+            const size_t i = sample_int(rng, 0, row_count - 1);
+            size_t j = sample_int(rng, 0, row_count - 2);
+            j += (j >= i);
+            if (assignments[i] == assignments[j]) {
+                accepted += _split(i, j, assignments, rng);
+            } else {
+                accepted += _merge(i, j, assignments, rng);
+            }
+        }
+        id_tracker_.compact();
+        return accepted;
+    }
+
+ private:
+    typedef std::unordered_map<Id, std::vector<size_t>, TrivialHash<Id>>
+        Members;
+
+    bool _split(size_t i, size_t j, Id * assignments, rng_t & rng) {
+        const Id global = assignments[i];
+        const size_t groupid = id_tracker_.global_to_packed(global);
+        others_.clear();
+        for (size_t rowid : members_[global]) {
+            if (rowid != i and rowid != j) {
+                others_.push_back(rowid);
+            }
+        }
+        std::shuffle(others_.begin(), others_.end(), rng);
+        const float log_q = _allocate(i, j, nullptr, rng);
+
+        float delta = clustering_.score_split(
+            mixture_,
+            groupid,
+            split_counts_[0],
+            split_counts_[1]);
+        for (const auto * feature : product_.features()) {
+            delta += feature->split_score_data(rng)
+                   - feature->score_group(groupid, rng);
+        }
+        if (fast_log(sample_unif01(rng)) >= delta - log_q) {
+            return false;
+        }
+
+        const size_t empty_groupid = *mixture_.empty_groupids().begin();
+        const Id empty_global = id_tracker_.packed_to_global(empty_groupid);
+        std::vector<size_t> & kept = members_[global];
+        std::vector<size_t> & moved = members_[empty_global];
+        kept.assign(1, i);
+        moved.assign(1, j);
+        for (size_t k = 0, size = others_.size(); k < size; ++k) {
+            (halves_[k] ? moved : kept).push_back(others_[k]);
+        }
+        for (size_t rowid : moved) {
+            _remove(groupid, rowid, rng);
+            _add(empty_groupid, rowid, rng);
+            assignments[rowid] = empty_global;
+        }
+        return true;
+    }
+
+    bool _merge(size_t i, size_t j, Id * assignments, rng_t & rng) {
+        const Id global_i = assignments[i];
+        const Id global_j = assignments[j];
+        const size_t groupid_i = id_tracker_.global_to_packed(global_i);
+        const size_t groupid_j = id_tracker_.global_to_packed(global_j);
+        others_.clear();
+        for (Id global : {global_i, global_j}) {
+            for (size_t rowid : members_[global]) {
+                if (rowid != i and rowid != j) {
+                    others_.push_back(rowid);
+                }
+            }
+        }
+        std::shuffle(others_.begin(), others_.end(), rng);
+        const float log_q = _allocate(i, j, assignments, rng);
+
+        float delta = clustering_.score_merge(mixture_, groupid_i, groupid_j);
+        for (const auto * feature : product_.features()) {
+            delta += feature->merge_score_data(rng)
+                   - feature->split_score_data(rng);
+        }
+        if (fast_log(sample_unif01(rng)) >= delta + log_q) {
+            return false;
+        }
+
+        std::vector<size_t> & kept = members_[global_i];
+        std::vector<size_t> & moved = members_[global_j];
+        for (size_t rowid : moved) {
+            _remove(id_tracker_.global_to_packed(global_j), rowid, rng);
+            _add(id_tracker_.global_to_packed(global_i), rowid, rng);
+            assignments[rowid] = global_i;
+        }
+        kept.insert(kept.end(), moved.begin(), moved.end());
+        members_.erase(global_j);
+        return true;
+    }
+
+    // Sequentially allocate others_ between two halves seeded by rows i
+    // and j, returning the log probability of the allocation.  If
+    // assignments is given, the allocation is forced to match it.
+    float _allocate(size_t i, size_t j, const Id * assignments, rng_t & rng) {
+        const auto & features = product_.features();
+        for (auto * feature : features) {
+            feature->split_init(rng);
+            feature->split_add_value(0, i, rng);
+            feature->split_add_value(1, j, rng);
+        }
+
+        split_counts_[0] = 1;
+        split_counts_[1] = 1;
+        halves_.clear();
+        float log_q = 0;
+        for (size_t rowid : others_) {
+            float scores[2] = {
+                fast_log(split_counts_[0]),
+                fast_log(split_counts_[1])
+            };
+            for (const auto * feature : features) {
+                scores[0] += feature->split_score_value(0, rowid, rng);
+                scores[1] += feature->split_score_value(1, rowid, rng);
+            }
+            const float total = log_sum_exp(scores[0], scores[1]);
+            size_t half;
+            if (assignments) {
+                half = (assignments[rowid] == assignments[j]);
+            } else {
+                half = sample_bernoulli(rng, expf(scores[1] - total));
+            }
+            log_q += scores[half] - total;
+            for (auto * feature : features) {
+                feature->split_add_value(half, rowid, rng);
+            }
+            split_counts_[half] += 1;
+            halves_.push_back(half);
+        }
+        return log_q;
+    }
+
+    void _check_row_count(size_t row_count) const {
+        for (const auto * feature : product_.features()) {
+            DIST_ASSERT_EQ(feature->row_count(), row_count);
+        }
+    }
+
+    size_t _sample(size_t rowid, rng_t & rng) {
+        scores_.resize(mixture_.counts().size());
+        mixture_.score_value(clustering_, scores_);
+        product_.score_value(rowid, scores_, rng);
+        return sample_from_scores_overwrite(rng, scores_);
+    }
+
+    void _add(size_t groupid, size_t rowid, rng_t & rng) {
+        const bool add_group = mixture_.add_value(clustering_, groupid);
+        product_.add_value(groupid, rowid, rng);
+        if (DIST_UNLIKELY(add_group)) {
+            product_.add_group(rng);
+            id_tracker_.add_group();
+        }
+    }
+
+    void _remove(size_t groupid, size_t rowid, rng_t & rng) {
+        const bool remove_group = mixture_.remove_value(clustering_, groupid);
+        product_.remove_value(groupid, rowid, rng);
+        if (DIST_UNLIKELY(remove_group)) {
+            product_.remove_group(groupid);
+            id_tracker_.remove_group(groupid);
+        }
+    }
+
+    const Clustering & clustering_;
+    ClusteringMixture & mixture_;
+    MixtureIdTracker & id_tracker_;
+    ProductMixture product_;
+    VectorFloat scores_;
+    Members members_;
+    std::vector<size_t> others_;
+    std::vector<size_t> halves_;
+    size_t split_counts_[2];
+};
+
+template<class Clustering>
+void gibbs_init(
+        const Clustering & clustering,
+        typename Clustering::Mixture & mixture,
+        MixtureIdTracker & id_tracker,
+        const std::vector<MixtureFeature *> & features,
+        size_t row_count,
+        MixtureIdTracker::Id * assignments,
+        size_t thread_count,
+        rng_t & rng) {
+    GibbsSampler<Clustering> sampler(
+        clustering,
+        mixture,
+        id_tracker,
+        features,
+        thread_count,
+        rng);
+    sampler.init(row_count, assignments, rng);
+}
+
+template<class Clustering>
+void gibbs_pass(
+        const Clustering & clustering,
+        typename Clustering::Mixture & mixture,
+        MixtureIdTracker & id_tracker,
+        const std::vector<MixtureFeature *> & features,
+        size_t row_count,
+        MixtureIdTracker::Id * assignments,
+        size_t thread_count,
+        rng_t & rng) {
+    GibbsSampler<Clustering> sampler(
+        clustering,
+        mixture,
+        id_tracker,
+        features,
+        thread_count,
+        rng);
+    sampler.pass(row_count, assignments, rng);
+}
+
+template<class Clustering>
+size_t split_merge_pass(
+        const Clustering & clustering,
+        typename Clustering::Mixture & mixture,
+        MixtureIdTracker & id_tracker,
+        const std::vector<MixtureFeature *> & features,
+        size_t row_count,
+        MixtureIdTracker::Id * assignments,
+        size_t move_count,
+        rng_t & rng) {
+    GibbsSampler<Clustering> sampler(
+        clustering,
+        mixture,
+        id_tracker,
+        features,
+        1,
+        rng);
+    return sampler.split_merge(row_count, assignments, move_count, rng);
+}
+
+
+// --------------------------------------------------------------------------
+// Checkpoints
+//
+// A checkpoint holds the clustering mixture, the id tracker and every
+// feature mixture including its cached scores, so that checkpoint_load
+// restores a sampler without recomputing any scores.  Shared models and
+// data columns are not stored; features must be bound to the same shared
+// models and columns as when the checkpoint was dumped.
+
+template<class Mixture>
+void checkpoint_dump(
+        const std::string & filename,
+        const Mixture & mixture,
+        const MixtureIdTracker & id_tracker,
+        const std::vector<MixtureFeature *> & features) {
+    CheckpointWriter writer(filename);
+    const uint64_t feature_count = features.size();
+    writer.write(feature_count);
+    mixture.binary_dump(writer);
+    id_tracker.binary_dump(writer);
+    for (auto feature : features) {
+        feature->binary_dump(writer);
+    }
+    writer.flush();
+}
+
+template<class Mixture>
+void checkpoint_load(
+        const std::string & filename,
+        Mixture & mixture,
+        MixtureIdTracker & id_tracker,
+        const std::vector<MixtureFeature *> & features) {
+    CheckpointReader reader(filename);
+    uint64_t feature_count;
+    reader.read(feature_count);
+    DIST_ASSERT_EQ(feature_count, features.size());
+    mixture.binary_load(reader);
+    id_tracker.binary_load(reader);
+    const size_t group_count = mixture.counts().size();
+    DIST_ASSERT_EQ(id_tracker.packed_size(), group_count);
+    for (auto feature : features) {
+        feature->binary_load(reader);
+        DIST_ASSERT_EQ(feature->group_count(), group_count);
+    }
+    DIST_ASSERT(reader.done(), "trailing data in " << filename);
+}
+
+}  // namespace distributions
@@ -0,0 +1,184 @@
+// Copyright (c) 2014, Salesforce.com, Inc.  All rights reserved.
+//
+// Redistribution and use in source and binary forms, with or without
+// modification, are permitted provided that the following conditions
+// are met:
+//
+// - Redistributions of source code must retain the above copyright
+//   notice, this list of conditions and the following disclaimer.
+// - Redistributions in binary form must reproduce the above copyright
+//   notice, this list of conditions and the following disclaimer in the
+//   documentation and/or other materials provided with the distribution.
+// - Neither the name of Salesforce.com nor the names of its contributors
+//   may be used to endorse or promote products derived from this
+//   software without specific prior written permission.
+//
+// THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+// "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+// LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+// FOR A PARTICULAR PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE
+// COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+// INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+// BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS
+// OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+// ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR
+// TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
+// USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#pragma once
+
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#include <stdint.h>
+#include <cstdio>
+#include <cstring>
+#include <string>
+#include <type_traits>
+#include <distributions/common.hpp>
+
+namespace distributions {
+
+// --------------------------------------------------------------------------
+// Binary Checkpoints
+//
+// A checkpoint is a flat sequence of POD values and length-prefixed POD
+// arrays in host byte order, meant for restarting a sampler on the same
+// build and architecture; use protobuf messages for portable storage.
+// Readers mmap the whole file and copy each array directly into place.
+//
+// Classes that support checkpointing define
+//   template<class Writer> void binary_dump(Writer & writer) const;
+//   template<class Reader> void binary_load(Reader & reader);
+
+class CheckpointWriter {
+ public:
+    explicit CheckpointWriter(const std::string & filename) :
+        filename_(filename),
+        file_(fopen(filename.c_str(), "wb")) {
+        DIST_ASSERT(file_, "failed to open " << filename);
+        const uint64_t magic = MAGIC;
+        const uint32_t version = VERSION;
+        write(magic);
+        write(version);
+    }
+
+    ~CheckpointWriter() { fclose(file_); }
+
+    template<class T>
+    void write(const T & value) {
+        write(1, & value);
+    }
+
+    template<class T>
+    void write(size_t size, const T * data) {
+        static_assert(std::is_pod<T>::value, "cannot write non-POD type");
+        const size_t written = fwrite(data, sizeof(T), size, file_);
+        DIST_ASSERT(written == size, "failed to write " << filename_);
+    }
+
+    template<class Array>
+    void write_array(const Array & array) {
+        const uint64_t size = array.size();
+        write(size);
+        write(array.size(), array.data());
+    }
+
+    void flush() {
+        DIST_ASSERT(fflush(file_) == 0, "failed to write " << filename_);
+    }
+
+    static const uint64_t MAGIC = 0x54504b4354534944ULL;  // "DISTCKPT"
+    static const uint32_t VERSION = 1;
+
+ private:
+    CheckpointWriter(const CheckpointWriter &) = delete;
+    void operator=(const CheckpointWriter &) = delete;
+
+    const std::string filename_;
+    FILE * const file_;
+};
+
+class CheckpointReader {
+ public:
+    explicit CheckpointReader(const std::string & filename) :
+        filename_(filename),
+        data_(nullptr),
+        size_(0),
+        pos_(0) {
+        const int fd = open(filename.c_str(), O_RDONLY);
+        DIST_ASSERT(fd != -1, "failed to open " << filename);
+        struct stat info;
+        if (fstat(fd, & info) == 0 and info.st_size > 0) {
+            size_ = info.st_size;
+            void * data = mmap(nullptr, size_, PROT_READ, MAP_PRIVATE, fd, 0);
+            if (data != MAP_FAILED) {
+                data_ = static_cast<const char *>(data);
+                madvise(data, size_, MADV_SEQUENTIAL);
+            }
+        }
+        close(fd);
+        DIST_ASSERT(data_, "failed to mmap " << filename);
+
+        // the destructor does not run if the constructor throws
+        try {
+            uint64_t magic;
+            uint32_t version;
+            read(magic);
+            read(version);
+            DIST_ASSERT(magic == CheckpointWriter::MAGIC,
+                "not a checkpoint: " << filename);
+            DIST_ASSERT(version == CheckpointWriter::VERSION,
+                "unsupported checkpoint version: " << version);
+        } catch (...) {
+            munmap(const_cast<char *>(data_), size_);
+            throw;
+        }
+    }
+
+    ~CheckpointReader() {
+        munmap(const_cast<char *>(data_), size_);
+    }
+
+    template<class T>
+    void read(T & value) {
+        read(1, & value);
+    }
+
+    template<class T>
+    void read(size_t size, T * data) {
+        static_assert(std::is_pod<T>::value, "cannot read non-POD type");
+        DIST_ASSERT(
+            size <= (size_ - pos_) / sizeof(T),
+            "truncated " << filename_);
+        const size_t bytes = size * sizeof(T);
+        memcpy(data, data_ + pos_, bytes);
+        pos_ += bytes;
+    }
+
+    template<class Array>
+    void read_array(Array & array) {
+        uint64_t size;
+        read(size);
+        typedef typename Array::value_type value_type;
+        DIST_ASSERT(
+            size <= (size_ - pos_) / sizeof(value_type),
+            "truncated " << filename_);
+        array.resize(size);
+        read(size, array.data());
+    }
+
+    bool done() const { return pos_ == size_; }
+
+ private:
+    CheckpointReader(const CheckpointReader &) = delete;
+    void operator=(const CheckpointReader &) = delete;
+
+    const std::string filename_;
+    const char * data_;
+    size_t size_;
+    size_t pos_;
+};
+
+}  // namespace distributions
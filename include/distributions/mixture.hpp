@@ -28,7 +28,7 @@
 #pragma once
 
 #include <vector>
-#include <unordered_set>
+#include <algorithm>
 #include <unordered_map>
 #include <type_traits>
 #include <distributions/common.hpp>
@@ -38,6 +38,76 @@
 
 namespace distributions {
 
+// --------------------------------------------------------------------------
+// Mixture Id Set
+//
+// This set of small ids supports O(1) insert, erase and lookup, and
+// stores its members contiguously for iteration.  Each member's position
+// in the dense array is indexed by id; erase swaps in the last member.
+
+class MixtureIdSet {
+ public:
+    typedef Packed_<size_t>::const_iterator const_iterator;
+
+    const_iterator begin() const { return ids_.begin(); }
+    const_iterator end() const { return ids_.end(); }
+    const size_t * data() const { return ids_.data(); }
+    size_t size() const { return ids_.size(); }
+
+    void clear() {
+        ids_.clear();
+        positions_.clear();
+    }
+
+    bool contains(size_t id) const {
+        return id < positions_.size() and positions_[id] != NONE;
+    }
+
+    void insert(size_t id) {
+        if (id >= positions_.size()) {
+            positions_.resize(id + 1, NONE);
+        }
+        DIST_ASSERT2(positions_[id] == NONE, "id already present: " << id);
+        positions_[id] = ids_.size();
+        ids_.packed_add(id);
+    }
+
+    void erase(size_t id) {
+        DIST_ASSERT2(contains(id), "id not present: " << id);
+        const size_t pos = positions_[id];
+        positions_[id] = NONE;
+        ids_.packed_remove(pos);
+        if (pos != ids_.size()) {
+            positions_[ids_[pos]] = pos;
+        }
+    }
+
+    template<class Writer>
+    void binary_dump(Writer & writer) const {
+        writer.write_array(ids_);
+    }
+
+    template<class Reader>
+    void binary_load(Reader & reader) {
+        reader.read_array(ids_);
+        positions_.clear();
+        for (size_t pos = 0, size = ids_.size(); pos < size; ++pos) {
+            const size_t id = ids_[pos];
+            if (id >= positions_.size()) {
+                positions_.resize(id + 1, NONE);
+            }
+            positions_[id] = pos;
+        }
+    }
+
+ private:
+    enum : size_t { NONE = static_cast<size_t>(-1) };
+
+    Packed_<size_t> ids_;
+    std::vector<size_t> positions_;
+};
+
+
 // --------------------------------------------------------------------------
 // Mixture Driver
 //
@@ -48,7 +118,7 @@ namespace distributions {
 template<class Model_, class count_t>
 struct MixtureDriver {
     typedef Model_ Model;
-    typedef std::unordered_set<size_t, TrivialHash<size_t>> IdSet;
+    typedef MixtureIdSet IdSet;
 
     std::vector<count_t> & counts() { return counts_; }
     const std::vector<count_t> & counts() const { return counts_; }
@@ -144,6 +214,21 @@ struct MixtureDriver {
         return model.score_counts(counts_);
     }
 
+    template<class Writer>
+    void binary_dump(Writer & writer) const {
+        writer.write_array(counts_);
+        writer.write(sample_size_);
+        empty_groupids_.binary_dump(writer);
+    }
+
+    template<class Reader>
+    void binary_load(Reader & reader) {
+        reader.read_array(counts_);
+        reader.read(sample_size_);
+        empty_groupids_.binary_load(reader);
+        _validate();
+    }
+
  private:
     std::vector<count_t> counts_;
     IdSet empty_groupids_;
@@ -154,8 +239,7 @@ struct MixtureDriver {
         if (DIST_DEBUG_LEVEL >= 2) {
             for (size_t i = 0; i < counts_.size(); ++i) {
                 bool count_is_zero = (counts_[i] == 0);
-                bool is_empty =
-                    (empty_groupids_.find(i) != empty_groupids_.end());
+                bool is_empty = empty_groupids_.contains(i);
                 DIST_ASSERT_EQ(count_is_zero, is_empty);
             }
         }
@@ -220,7 +304,47 @@ struct MixtureSlaveGroups {
         }
     }
 
+    // POD groups are copied as one array; others define binary_dump/load
+    template<class Writer>
+    void binary_dump(Writer & writer) const {
+        _binary_dump(writer, std::is_pod<Group>());
+    }
+
+    template<class Reader>
+    void binary_load(Reader & reader) {
+        _binary_load(reader, std::is_pod<Group>());
+    }
+
  private:
+    template<class Writer>
+    void _binary_dump(Writer & writer, std::true_type) const {
+        writer.write_array(groups_);
+    }
+
+    template<class Writer>
+    void _binary_dump(Writer & writer, std::false_type) const {
+        const uint64_t size = groups_.size();
+        writer.write(size);
+        for (auto const & group : groups_) {
+            group.binary_dump(writer);
+        }
+    }
+
+    template<class Reader>
+    void _binary_load(Reader & reader, std::true_type) {
+        reader.read_array(groups_);
+    }
+
+    template<class Reader>
+    void _binary_load(Reader & reader, std::false_type) {
+        uint64_t size;
+        reader.read(size);
+        groups_.resize(size);
+        for (auto & group : groups_) {
+            group.binary_load(reader);
+        }
+    }
+
     Packed_<Group> groups_;
 };
 
@@ -295,6 +419,12 @@ struct MixtureSlaveValueScorerMixin {
             rng_t &) {}
 
     void validate(const Shared &, const std::vector<Group> &) const {}
+
+    template<class Writer>
+    void binary_dump(Writer &) const {}
+
+    template<class Reader>
+    void binary_load(Reader &) {}
 };
 
 template<class Model>
@@ -337,6 +467,156 @@ struct SmallMixtureSlaveValueScorer : MixtureSlaveValueScorerMixin<Model> {
     }
 };
 
+// This cache lazily memoizes a per-group function of small count values,
+// e.g. lgamma(post_alpha + value), for count models whose data are
+// dominated by a few small values.  Rows are indexed [value][groupid] so
+// scoring one value against all groups reads one contiguous row.  Callers
+// must invalidate a group whenever its posterior changes.  Entries are
+// filled from const scoring methods, so the cache is mutable and, like the
+// scratch vectors of other scorers, not safe to share between threads.
+class MixtureSmallValueCache {
+ public:
+    MixtureSmallValueCache() : rows_(capacity()) {}
+
+    static uint32_t capacity() { return 32; }
+
+    static bool is_cached(uint32_t value) { return value < capacity(); }
+
+    size_t size() const { return filled_.size(); }
+
+    void resize(size_t size) {
+        for (auto & row : rows_) {
+            row.resize(size);
+        }
+        filled_.resize(0);
+        filled_.resize(size, 0);
+    }
+
+    void packed_add() {
+        for (auto & row : rows_) {
+            row.packed_add(0);
+        }
+        filled_.packed_add(0);
+    }
+
+    void packed_remove(size_t groupid) {
+        for (auto & row : rows_) {
+            row.packed_remove(groupid);
+        }
+        filled_.packed_remove(groupid);
+    }
+
+    void invalidate(size_t groupid) {
+        filled_[groupid] = 0;
+    }
+
+    // fun(groupid) computes an entry for the given value
+    template<class Fun>
+    float get(size_t groupid, uint32_t value, Fun fun) const {
+        DIST_ASSERT1(is_cached(value), "uncached value: " << value);
+        const uint32_t bit = 1U << value;
+        float & entry = rows_[value][groupid];
+        if (DIST_UNLIKELY(not (filled_[groupid] & bit))) {
+            entry = fun(groupid);
+            filled_[groupid] |= bit;
+        }
+        return entry;
+    }
+
+    template<class Fun>
+    const float * row(uint32_t value, Fun fun) const {
+        DIST_ASSERT1(is_cached(value), "uncached value: " << value);
+        const uint32_t bit = 1U << value;
+        VectorFloat & row = rows_[value];
+        for (size_t i = 0, size = filled_.size(); i < size; ++i) {
+            if (DIST_UNLIKELY(not (filled_[i] & bit))) {
+                row[i] = fun(i);
+                filled_[i] |= bit;
+            }
+        }
+        return row.data();
+    }
+
+ private:
+    mutable std::vector<VectorFloat> rows_;
+    mutable Packed_<uint32_t> filled_;
+};
+
+// This table stores many rows of per-group floats for block mixtures that
+// fuse several feature columns.  Each row is padded to the alignment width
+// so that every row is an aligned array indexed by groupid, and capacity
+// grows by doubling.  Groups follow packed_add/packed_remove semantics
+// across all rows at once.
+class MixtureGroupTable {
+ public:
+    MixtureGroupTable() : row_count_(0), group_count_(0), stride_(0) {}
+
+    size_t row_count() const { return row_count_; }
+    size_t group_count() const { return group_count_; }
+
+    // zero-fills all entries
+    void init(size_t row_count, size_t group_count) {
+        row_count_ = row_count;
+        group_count_ = group_count;
+        stride_ = _padded(group_count);
+        data_.resize(0);
+        data_.resize(row_count_ * stride_, 0);
+    }
+
+    float * row(size_t r) { return & data_[r * stride_]; }
+    const float * row(size_t r) const { return & data_[r * stride_]; }
+
+    // adds a zero-filled group
+    void packed_add() {
+        if (group_count_ == stride_) {
+            _reshape(_padded(2 * group_count_ + 1));
+        }
+        for (size_t r = 0; r < row_count_; ++r) {
+            row(r)[group_count_] = 0;
+        }
+        ++group_count_;
+    }
+
+    void packed_remove(size_t groupid) {
+        DIST_ASSERT1(groupid < group_count_, "bad groupid: " << groupid);
+        const size_t last = --group_count_;
+        if (groupid != last) {
+            for (size_t r = 0; r < row_count_; ++r) {
+                float * values = row(r);
+                values[groupid] = values[last];
+            }
+        }
+    }
+
+    void validate() const {
+        DIST_ASSERT_LE(group_count_, stride_);
+        DIST_ASSERT_EQ(data_.size(), row_count_ * stride_);
+    }
+
+ private:
+    static size_t _padded(size_t size) {
+        const size_t block = default_alignment / sizeof(float);
+        return (size + block - 1) / block * block;
+    }
+
+    void _reshape(size_t stride) {
+        VectorFloat reshaped(row_count_ * stride, 0);
+        for (size_t r = 0; r < row_count_; ++r) {
+            std::copy(
+                data_.begin() + r * stride_,
+                data_.begin() + r * stride_ + group_count_,
+                reshaped.begin() + r * stride);
+        }
+        data_.swap(reshaped);
+        stride_ = stride;
+    }
+
+    size_t row_count_;
+    size_t group_count_;
+    size_t stride_;
+    VectorFloat data_;
+};
+
 template<
     class Model,  // NOLINT(*)
     class DataScorer = SmallMixtureSlaveDataScorer<Model>,
@@ -424,6 +704,81 @@ struct MixtureSlave {
         value_scorer_.score_value(shared, groups(), value, scores_accum, rng);
     }
 
+    // Batched operations take parallel arrays of length value_count.
+    // Entries whose observed flag is false are missing and are skipped;
+    // observed may be null if all values are observed.
+
+    void add_value_batch(
+            const Shared & shared,
+            size_t value_count,
+            const uint32_t * groupids,
+            const Value * values,
+            const bool * observed,
+            rng_t & rng) {
+        for (size_t i = 0; i < value_count; ++i) {
+            if (not observed or observed[i]) {
+                add_value(shared, groupids[i], values[i], rng);
+            }
+        }
+    }
+
+    void remove_value_batch(
+            const Shared & shared,
+            size_t value_count,
+            const uint32_t * groupids,
+            const Value * values,
+            const bool * observed,
+            rng_t & rng) {
+        for (size_t i = 0; i < value_count; ++i) {
+            if (not observed or observed[i]) {
+                remove_value(shared, groupids[i], values[i], rng);
+            }
+        }
+    }
+
+    // scores_accum is a row-major [value_count x group_count] matrix,
+    // whose rows of missing values are left unchanged
+    void score_value_batch(
+            const Shared & shared,
+            size_t value_count,
+            const Value * values,
+            const bool * observed,
+            float * scores_accum,
+            rng_t & rng) const {
+        const size_t group_count = groups().size();
+
+        static thread_local VectorFloat * temp_ = nullptr;
+        if (DIST_UNLIKELY(not temp_)) {
+            temp_ = new VectorFloat(group_count);  // never freed
+        } else {
+            temp_->resize(group_count);
+        }
+
+        for (size_t i = 0; i < value_count; ++i) {
+            if (observed and not observed[i]) {
+                continue;
+            }
+            float * row = scores_accum + i * group_count;
+            if (is_aligned(row)) {
+                value_scorer_.score_value(
+                    shared,
+                    groups(),
+                    values[i],
+                    AlignedFloats(row, group_count),
+                    rng);
+            } else {
+                std::copy(row, row + group_count, temp_->begin());
+                value_scorer_.score_value(
+                    shared,
+                    groups(),
+                    values[i],
+                    *temp_,
+                    rng);
+                std::copy(temp_->begin(), temp_->end(), row);
+            }
+        }
+    }
+
     float score_data(
             const Shared & shared,
             rng_t & rng) const {
@@ -443,6 +798,19 @@ struct MixtureSlave {
         data_scorer_.validate(shared, groups());
     }
 
+    // binary_load restores cached scores as dumped, without update_all
+    template<class Writer>
+    void binary_dump(Writer & writer) const {
+        groups_.binary_dump(writer);
+        value_scorer_.binary_dump(writer);
+    }
+
+    template<class Reader>
+    void binary_load(Reader & reader) {
+        groups_.binary_load(reader);
+        value_scorer_.binary_load(reader);
+    }
+
  private:
     MixtureSlaveGroups<Shared> groups_;
     ValueScorer value_scorer_;
@@ -456,14 +824,24 @@ struct MixtureSlave {
 // This interface tracks a mapping between contiguous "packed" group ids
 // and fixed unique "global" ids.  Packed ids can change when groups are
 // added or removed, but global ids never change.
+//
+// Recent global ids are indexed densely from dense_offset, with removed
+// groups left as tombstones.  Live ids older than the dense window are kept
+// in a hash map, so memory stays O(live groups) even when a few old groups
+// outlive many newer ones.  compact() advances the dense window, and runs
+// automatically once tombstones make up over half of it.
 
 struct MixtureIdTracker {
     typedef uint32_t Id;
 
+    enum : Id { TOMBSTONE = static_cast<Id>(-1) };
+
     void init(size_t group_count = 0) {
         packed_to_global_.clear();
-        global_to_packed_.clear();
-        global_size_ = 0;
+        dense_global_to_packed_.clear();
+        sparse_global_to_packed_.clear();
+        dense_offset_ = 0;
+        tombstone_count_ = 0;
         for (size_t i = 0; i < group_count; ++i) {
             add_group();
         }
@@ -471,25 +849,23 @@ struct MixtureIdTracker {
 
     void add_group() {
         const Id packed = packed_to_global_.size();
-        const Id global = global_size_++;
+        const Id global = global_size();
+        DIST_ASSERT1(global != TOMBSTONE, "global ids exhausted");
         packed_to_global_.packed_add(global);
-        global_to_packed_.insert(std::make_pair(global, packed));
+        dense_global_to_packed_.push_back(packed);
     }
 
     void remove_group(Id packed) {
         DIST_ASSERT1(packed < packed_size(), "bad packed id: " << packed);
-        const Id global = packed_to_global_[packed];
-        DIST_ASSERT1(global < global_size(), "bad global id: " << global);
-        global_to_packed_.erase(global);
+        _remove_global(packed_to_global_[packed]);
         packed_to_global_.packed_remove(packed);
         if (packed != packed_size()) {
             const Id global = packed_to_global_[packed];
-            DIST_ASSERT1(global < global_size(), "bad global id: " << global);
-            auto i = global_to_packed_.find(global);
-            DIST_ASSERT1(
-                i != global_to_packed_.end(),
-                "stale global id: " << global);
-            i->second = packed;
+            _global_to_packed(global) = packed;
+        }
+        const size_t dense_size = dense_global_to_packed_.size();
+        if (tombstone_count_ * 2 > dense_size and dense_size > 64) {
+            compact();
         }
     }
 
@@ -502,22 +878,153 @@ struct MixtureIdTracker {
 
     Id global_to_packed(Id global) const {
         DIST_ASSERT1(global < global_size(), "bad global id: " << global);
-        auto i = global_to_packed_.find(global);
-        DIST_ASSERT1(
-            i != global_to_packed_.end(),
-            "stale global id: " << global);
-        Id packed = i->second;
+        Id packed;
+        if (DIST_LIKELY(global >= dense_offset_)) {
+            packed = dense_global_to_packed_[global - dense_offset_];
+        } else {
+            auto i = sparse_global_to_packed_.find(global);
+            packed = (i == sparse_global_to_packed_.end())
+                   ? static_cast<Id>(TOMBSTONE)
+                   : i->second;
+        }
+        DIST_ASSERT1(packed != TOMBSTONE, "stale global id: " << global);
         DIST_ASSERT1(packed < packed_size(), "bad packed id: " << packed);
         return packed;
     }
 
+    void packed_to_global(size_t size, const Id * packed, Id * global) const {
+        for (size_t i = 0; i < size; ++i) {
+            global[i] = packed_to_global(packed[i]);
+        }
+    }
+
+    void global_to_packed(size_t size, const Id * global, Id * packed) const {
+        for (size_t i = 0; i < size; ++i) {
+            packed[i] = global_to_packed(global[i]);
+        }
+    }
+
+    // Advance the dense window to its longest suffix that is at most a
+    // quarter tombstones, moving live ids before it to the hash map.
+    void compact() {
+        const size_t dense_size = dense_global_to_packed_.size();
+        size_t begin = dense_size;
+        size_t tombstones = 0;
+        size_t dropped_tombstones = tombstone_count_;
+        for (size_t i = dense_size; i--;) {
+            if (dense_global_to_packed_[i] == TOMBSTONE) {
+                ++tombstones;
+            }
+            if (tombstones * 4 <= dense_size - i) {
+                begin = i;
+                dropped_tombstones = tombstone_count_ - tombstones;
+            }
+        }
+        while (begin < dense_size and
+               dense_global_to_packed_[begin] == TOMBSTONE) {
+            ++begin;
+            ++dropped_tombstones;
+        }
+
+        for (size_t i = 0; i < begin; ++i) {
+            const Id packed = dense_global_to_packed_[i];
+            if (packed != TOMBSTONE) {
+                sparse_global_to_packed_[dense_offset_ + i] = packed;
+            }
+        }
+        dense_global_to_packed_.erase(
+            dense_global_to_packed_.begin(),
+            dense_global_to_packed_.begin() + begin);
+        dense_offset_ += begin;
+        tombstone_count_ -= dropped_tombstones;
+    }
+
     size_t packed_size() const { return packed_to_global_.size(); }
-    size_t global_size() const { return global_size_; }
+    size_t global_size() const {
+        return dense_offset_ + dense_global_to_packed_.size();
+    }
+
+    // number of entries held by the global-to-packed index
+    size_t index_size() const {
+        return dense_global_to_packed_.size()
+             + sparse_global_to_packed_.size();
+    }
+
+    template<class Writer>
+    void binary_dump(Writer & writer) const {
+        const uint64_t dense_offset = dense_offset_;
+        std::vector<Id> sparse_globals;
+        std::vector<Id> sparse_packeds;
+        for (const auto & pair : sparse_global_to_packed_) {
+            sparse_globals.push_back(pair.first);
+        }
+        std::sort(sparse_globals.begin(), sparse_globals.end());
+        for (Id global : sparse_globals) {
+            sparse_packeds.push_back(sparse_global_to_packed_.at(global));
+        }
+        writer.write_array(packed_to_global_);
+        writer.write_array(dense_global_to_packed_);
+        writer.write(dense_offset);
+        writer.write_array(sparse_globals);
+        writer.write_array(sparse_packeds);
+    }
+
+    template<class Reader>
+    void binary_load(Reader & reader) {
+        uint64_t dense_offset;
+        std::vector<Id> sparse_globals;
+        std::vector<Id> sparse_packeds;
+        reader.read_array(packed_to_global_);
+        reader.read_array(dense_global_to_packed_);
+        reader.read(dense_offset);
+        reader.read_array(sparse_globals);
+        reader.read_array(sparse_packeds);
+        DIST_ASSERT_EQ(sparse_globals.size(), sparse_packeds.size());
+        dense_offset_ = dense_offset;
+        sparse_global_to_packed_.clear();
+        for (size_t i = 0; i < sparse_globals.size(); ++i) {
+            sparse_global_to_packed_[sparse_globals[i]] = sparse_packeds[i];
+        }
+        tombstone_count_ = std::count(
+            dense_global_to_packed_.begin(),
+            dense_global_to_packed_.end(),
+            TOMBSTONE);
+    }
 
  private:
+    Id & _global_to_packed(Id global) {
+        DIST_ASSERT1(global < global_size(), "bad global id: " << global);
+        if (DIST_LIKELY(global >= dense_offset_)) {
+            Id & packed = dense_global_to_packed_[global - dense_offset_];
+            DIST_ASSERT1(packed != TOMBSTONE, "stale global id: " << global);
+            return packed;
+        } else {
+            auto i = sparse_global_to_packed_.find(global);
+            DIST_ASSERT1(
+                i != sparse_global_to_packed_.end(),
+                "stale global id: " << global);
+            return i->second;
+        }
+    }
+
+    void _remove_global(Id global) {
+        DIST_ASSERT1(global < global_size(), "bad global id: " << global);
+        if (DIST_LIKELY(global >= dense_offset_)) {
+            Id & packed = dense_global_to_packed_[global - dense_offset_];
+            DIST_ASSERT1(packed != TOMBSTONE, "stale global id: " << global);
+            packed = TOMBSTONE;
+            ++tombstone_count_;
+        } else {
+            const size_t erased = sparse_global_to_packed_.erase(global);
+            DIST_ASSERT1(erased, "stale global id: " << global);
+        }
+    }
+
     Packed_<Id> packed_to_global_;
-    std::unordered_map<Id, Id, TrivialHash<Id>> global_to_packed_;
-    size_t global_size_;
+    std::vector<Id> dense_global_to_packed_;
+    std::unordered_map<Id, Id, TrivialHash<Id>> sparse_global_to_packed_;
+    size_t dense_offset_;
+    size_t tombstone_count_;
 };
 
 }   // namespace distributions
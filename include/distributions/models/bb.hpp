@@ -28,6 +28,7 @@
 #pragma once
 
 #include <vector>
+#include <utility>
 #include <distributions/common.hpp>
 #include <distributions/special.hpp>
 #include <distributions/random.hpp>
@@ -226,6 +227,54 @@ struct MixtureDataScorer
         }
         return score;
     }
+
+    void score_data_grid(
+            const std::vector<Shared> & shareds,
+            const std::vector<Group> & groups,
+            AlignedFloats scores_out,
+            rng_t &) const {
+        DIST_ASSERT_EQ(shareds.size(), scores_out.size());
+        VectorFloat heads;
+        VectorFloat tails;
+        for (auto const & group : groups) {
+            if (group.heads + group.tails) {
+                heads.push_back(group.heads);
+                tails.push_back(group.tails);
+            }
+        }
+        const size_t group_count = heads.size();
+        VectorFloat temp(group_count);
+        for (size_t i = 0, size = shareds.size(); i < size; ++i) {
+            const Shared & shared = shareds[i];
+            const float alpha = shared.alpha;
+            const float beta = shared.beta;
+            const float shared_part =
+                   + fast_lgamma(alpha + beta)
+                   - fast_lgamma(alpha)
+                   - fast_lgamma(beta);
+            float score = group_count * shared_part;
+
+            for (size_t g = 0; g < group_count; ++g) {
+                temp[g] = alpha + heads[g];
+            }
+            vector_lgamma(group_count, temp.data());
+            score += vector_sum(group_count, temp.data());
+
+            for (size_t g = 0; g < group_count; ++g) {
+                temp[g] = beta + tails[g];
+            }
+            vector_lgamma(group_count, temp.data());
+            score += vector_sum(group_count, temp.data());
+
+            for (size_t g = 0; g < group_count; ++g) {
+                temp[g] = alpha + beta + heads[g] + tails[g];
+            }
+            vector_lgamma(group_count, temp.data());
+            score -= vector_sum(group_count, temp.data());
+
+            scores_out[i] = score;
+        }
+    }
 };
 
 struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
@@ -319,9 +368,288 @@ struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
         DIST_ASSERT_EQ(tails_scores_.size(), groups.size());
     }
 
+    template<class Writer>
+    void binary_dump(Writer & writer) const {
+        writer.write_array(heads_scores_);
+        writer.write_array(tails_scores_);
+    }
+
+    template<class Reader>
+    void binary_load(Reader & reader) {
+        reader.read_array(heads_scores_);
+        reader.read_array(tails_scores_);
+    }
+
  private:
     VectorFloat heads_scores_;
     VectorFloat tails_scores_;
 };
+
+// BlockMixture fuses many BetaBernoulli columns that share one set of
+// groups, e.g. the boolean flags of a wide table.  Rows are bit-packed into
+// Words: bit c % 32 of heads[c / 32] is the value of column c, and the
+// optional present mask marks observed values; missing values are ignored.
+// Per-group sums of the heads and tails scores over all columns are cached,
+// so scoring a row starts from the cheaper sum and only visits the columns
+// that differ from it.
+struct BlockMixture {
+    typedef uint32_t Word;
+
+    static size_t word_count(size_t column_count) {
+        return (column_count + 31) / 32;
+    }
+
+    // groups()[column][groupid]
+    std::vector<std::vector<Group>> & groups() { return groups_; }
+    const std::vector<std::vector<Group>> & groups() const { return groups_; }
+
+    size_t column_count() const { return groups_.size(); }
+    size_t group_count() const {
+        return groups_.empty() ? 0 : groups_[0].size();
+    }
+
+    void init(
+            const std::vector<Shared> & shareds,
+            rng_t &) {
+        const size_t column_count = this->column_count();
+        const size_t group_count = this->group_count();
+        DIST_ASSERT_EQ(shareds.size(), column_count);
+
+        scores_.init(2 * column_count, group_count);
+        for (size_t c = 0; c < column_count; ++c) {
+            DIST_ASSERT_EQ(groups_[c].size(), group_count);
+            const Shared & shared = shareds[c];
+            float * tails_scores = scores_.row(2 * c);
+            float * heads_scores = scores_.row(2 * c + 1);
+            for (size_t g = 0; g < group_count; ++g) {
+                const Group & group = groups_[c][g];
+                float heads = shared.alpha + group.heads;
+                float tails = shared.beta + group.tails;
+                heads_scores[g] = heads / (heads + tails);
+                tails_scores[g] = tails / (heads + tails);
+            }
+            vector_log(group_count, heads_scores);
+            vector_log(group_count, tails_scores);
+        }
+        heads_sums_.resize(group_count);
+        tails_sums_.resize(group_count);
+        for (size_t g = 0; g < group_count; ++g) {
+            _update_sums(g);
+        }
+    }
+
+    void add_group(
+            const std::vector<Shared> & shareds,
+            rng_t & rng) {
+        const size_t groupid = group_count();
+        scores_.packed_add();
+        for (size_t c = 0, size = column_count(); c < size; ++c) {
+            const Shared & shared = shareds[c];
+            groups_[c].resize(groupid + 1);
+            groups_[c].back().init(shared, rng);
+            _update_group(shared, c, groupid);
+        }
+        heads_sums_.packed_add(0);
+        tails_sums_.packed_add(0);
+        _update_sums(groupid);
+    }
+
+    void remove_group(
+            const std::vector<Shared> &,
+            size_t groupid) {
+        DIST_ASSERT1(groupid < group_count(), "bad groupid: " << groupid);
+        for (auto & groups : groups_) {
+            if (groupid != groups.size() - 1) {
+                groups[groupid] = std::move(groups.back());
+            }
+            groups.pop_back();
+        }
+        scores_.packed_remove(groupid);
+        heads_sums_.packed_remove(groupid);
+        tails_sums_.packed_remove(groupid);
+    }
+
+    // present may be null if all values are observed
+    void add_row(
+            const std::vector<Shared> & shareds,
+            size_t groupid,
+            const Word * heads,
+            const Word * present,
+            rng_t & rng) {
+        _for_each_present(heads, present, [&](size_t c, bool value) {
+            groups_[c][groupid].add_value(shareds[c], value, rng);
+            _update_group(shareds[c], c, groupid);
+        });
+        _update_sums(groupid);
+    }
+
+    void remove_row(
+            const std::vector<Shared> & shareds,
+            size_t groupid,
+            const Word * heads,
+            const Word * present,
+            rng_t & rng) {
+        _for_each_present(heads, present, [&](size_t c, bool value) {
+            groups_[c][groupid].remove_value(shareds[c], value, rng);
+            _update_group(shareds[c], c, groupid);
+        });
+        _update_sums(groupid);
+    }
+
+    float score_row_group(
+            const std::vector<Shared> &,
+            size_t groupid,
+            const Word * heads,
+            const Word * present,
+            rng_t &) const {
+        float score = 0;
+        _for_each_present(heads, present, [&](size_t c, bool value) {
+            score += scores_.row(2 * c + value)[groupid];
+        });
+        return score;
+    }
+
+    void score_row(
+            const std::vector<Shared> &,
+            const Word * heads,
+            const Word * present,
+            AlignedFloats scores_accum,
+            rng_t &) const {
+        const size_t size = group_count();
+        float * io = scores_accum.data();
+        if (DIST_DEBUG_LEVEL >= 1) {
+            DIST_ASSERT_EQ(scores_accum.size(), size);
+        }
+
+        size_t head_count = 0;
+        size_t tail_count = 0;
+        size_t missing_count = 0;
+        for (size_t w = 0, words = word_count(column_count());
+                w < words; ++w) {
+            const Word valid = _valid_bits(w);
+            const Word observed = present ? present[w] & valid : valid;
+            head_count += __builtin_popcount(heads[w] & observed);
+            tail_count += __builtin_popcount(~heads[w] & observed);
+            missing_count += __builtin_popcount(~observed & valid);
+        }
+
+        // each strategy costs one vector op per visited column
+        if (head_count + tail_count <= missing_count + std::min(
+                head_count, tail_count)) {
+            _for_each_present(heads, present, [&](size_t c, bool value) {
+                vector_add(size, io, scores_.row(2 * c + value));
+            });
+        } else {
+            const bool base = tail_count < head_count;
+            const Word base_bits = base ? ~Word(0) : Word(0);
+            vector_add(
+                size,
+                io,
+                (base ? heads_sums_.data() : tails_sums_.data()));
+            for (size_t w = 0, words = word_count(column_count());
+                    w < words; ++w) {
+                const Word valid = _valid_bits(w);
+                const Word observed = present ? present[w] & valid : valid;
+                Word visit = (valid & ~observed)
+                           | (observed & (heads[w] ^ base_bits));
+                while (visit) {
+                    const size_t bit = __builtin_ctz(visit);
+                    visit &= visit - 1;
+                    const size_t c = 32 * w + bit;
+                    const float * base_scores = scores_.row(2 * c + base);
+                    if ((observed >> bit) & 1) {
+                        vector_add_subtract(
+                            size,
+                            io,
+                            scores_.row(2 * c + not base),
+                            base_scores);
+                    } else {
+                        vector_add_subtract(size, io, 0.f, base_scores);
+                    }
+                }
+            }
+        }
+    }
+
+    float score_data(
+            const std::vector<Shared> & shareds,
+            rng_t & rng) const {
+        MixtureDataScorer data_scorer;
+        float score = 0;
+        for (size_t c = 0, size = column_count(); c < size; ++c) {
+            score += data_scorer.score_data(shareds[c], groups_[c], rng);
+        }
+        return score;
+    }
+
+    void validate(const std::vector<Shared> & shareds) const {
+        const size_t column_count = this->column_count();
+        const size_t group_count = this->group_count();
+        DIST_ASSERT_EQ(shareds.size(), column_count);
+        scores_.validate();
+        DIST_ASSERT_EQ(scores_.row_count(), 2 * column_count);
+        DIST_ASSERT_EQ(scores_.group_count(), group_count);
+        DIST_ASSERT_EQ(heads_sums_.size(), group_count);
+        DIST_ASSERT_EQ(tails_sums_.size(), group_count);
+        for (size_t c = 0; c < column_count; ++c) {
+            DIST_ASSERT_EQ(groups_[c].size(), group_count);
+            for (auto const & group : groups_[c]) {
+                group.validate(shareds[c]);
+            }
+        }
+    }
+
+ private:
+    Word _valid_bits(size_t word) const {
+        const size_t remaining = column_count() - 32 * word;
+        return remaining >= 32 ? ~Word(0) : (Word(1) << remaining) - 1;
+    }
+
+    // calls fun(column, value) for each observed value
+    template<class Fun>
+    void _for_each_present(
+            const Word * heads,
+            const Word * present,
+            Fun fun) const {
+        for (size_t w = 0, words = word_count(column_count());
+                w < words; ++w) {
+            const Word valid = _valid_bits(w);
+            Word observed = present ? present[w] & valid : valid;
+            while (observed) {
+                const size_t bit = __builtin_ctz(observed);
+                observed &= observed - 1;
+                fun(32 * w + bit, (heads[w] >> bit) & 1);
+            }
+        }
+    }
+
+    void _update_group(
+            const Shared & shared,
+            size_t column,
+            size_t groupid) {
+        const Group & group = groups_[column][groupid];
+        float heads = shared.alpha + group.heads;
+        float tails = shared.beta + group.tails;
+        const float total = heads + tails;
+        scores_.row(2 * column + 1)[groupid] = fast_log(heads / total);
+        scores_.row(2 * column)[groupid] = fast_log(tails / total);
+    }
+
+    void _update_sums(size_t groupid) {
+        float heads_sum = 0;
+        float tails_sum = 0;
+        for (size_t c = 0, size = column_count(); c < size; ++c) {
+            tails_sum += scores_.row(2 * c)[groupid];
+            heads_sum += scores_.row(2 * c + 1)[groupid];
+        }
+        heads_sums_[groupid] = heads_sum;
+        tails_sums_[groupid] = tails_sum;
+    }
+
+    std::vector<std::vector<Group>> groups_;
+    MixtureGroupTable scores_;
+    VectorFloat heads_sums_;
+    VectorFloat tails_sums_;
+};
 };  // struct BetaBernoulli
 }   // namespace distributions
@@ -32,6 +32,7 @@
 #include <distributions/special.hpp>
 #include <distributions/random.hpp>
 #include <distributions/vector.hpp>
+#include <distributions/vector_math.hpp>
 #include <distributions/mixins.hpp>
 #include <distributions/mixture.hpp>
 
@@ -240,6 +241,48 @@ struct MixtureDataScorer
         }
         return score;
     }
+
+    void score_data_grid(
+            const std::vector<Shared> & shareds,
+            const std::vector<Group> & groups,
+            AlignedFloats scores_out,
+            rng_t &) const {
+        DIST_ASSERT_EQ(shareds.size(), scores_out.size());
+        VectorFloat counts;
+        VectorFloat sums;
+        for (auto const & group : groups) {
+            if (group.count) {
+                counts.push_back(group.count);
+                sums.push_back(group.sum);
+            }
+        }
+        const size_t group_count = counts.size();
+        VectorFloat post_alpha(group_count);
+        VectorFloat post_beta(group_count);
+        VectorFloat temp(group_count);
+        for (size_t i = 0, size = shareds.size(); i < size; ++i) {
+            const Shared & shared = shareds[i];
+            const float r = shared.r;
+            const float shared_part = fast_lgamma(shared.alpha + shared.beta)
+                                    - fast_lgamma(shared.alpha)
+                                    - fast_lgamma(shared.beta);
+            float score = group_count * shared_part;
+
+            for (size_t g = 0; g < group_count; ++g) {
+                post_alpha[g] = shared.alpha + r * counts[g];
+                post_beta[g] = shared.beta + sums[g];
+                temp[g] = post_alpha[g] + post_beta[g];
+            }
+            vector_lgamma(group_count, post_alpha.data());
+            vector_lgamma(group_count, post_beta.data());
+            vector_lgamma(group_count, temp.data());
+            score += vector_sum(group_count, post_alpha.data());
+            score += vector_sum(group_count, post_beta.data());
+            score -= vector_sum(group_count, temp.data());
+
+            scores_out[i] = score;
+        }
+    }
 };
 
 struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
@@ -247,18 +290,21 @@ struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
         score_.resize(size);
         post_beta_.resize(size);
         alpha_.resize(size);
+        lgamma_cache_.resize(size);
     }
 
     void add_group(const Shared &, rng_t &) {
         score_.packed_add();
         post_beta_.packed_add();
         alpha_.packed_add();
+        lgamma_cache_.packed_add();
     }
 
     void remove_group(const Shared &, size_t groupid) {
         score_.packed_remove(groupid);
         post_beta_.packed_remove(groupid);
         alpha_.packed_remove(groupid);
+        lgamma_cache_.packed_remove(groupid);
     }
 
     void update_group(
@@ -272,6 +318,7 @@ struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
         score_[groupid] = base.score;
         post_beta_[groupid] = base.post_beta;
         alpha_[groupid] = base.alpha;
+        lgamma_cache_.invalidate(groupid);
     }
 
     void add_value(
@@ -308,9 +355,15 @@ struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
             size_t groupid,
             const Value & value,
             rng_t &) const {
-        float beta = post_beta_[groupid] + value;
-        return score_[groupid] + fast_lgamma(beta)
-                               - fast_lgamma(beta + alpha_[groupid]);
+        auto lgamma_fun = [&](size_t i) {
+            float beta = post_beta_[i] + value;
+            return fast_lgamma(beta) - fast_lgamma(beta + alpha_[i]);
+        };
+        const float lgamma_part =
+            MixtureSmallValueCache::is_cached(value)
+            ? lgamma_cache_.get(groupid, value, lgamma_fun)
+            : lgamma_fun(groupid);
+        return score_[groupid] + lgamma_part;
     }
 
     void score_value(
@@ -319,10 +372,19 @@ struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
             const Value & value,
             AlignedFloats scores_accum,
             rng_t &) const {
-        for (size_t i = 0, size = scores_accum.size(); i < size; ++i) {
+        auto lgamma_fun = [&](size_t i) {
             float beta = post_beta_[i] + value;
-            scores_accum[i] += score_[i] + fast_lgamma(beta)
-                                         - fast_lgamma(beta + alpha_[i]);
+            return fast_lgamma(beta) - fast_lgamma(beta + alpha_[i]);
+        };
+        const size_t size = scores_accum.size();
+        if (MixtureSmallValueCache::is_cached(value)) {
+            const float * lgamma_part = lgamma_cache_.row(value, lgamma_fun);
+            vector_add(size, scores_accum.data(), score_.data());
+            vector_add(size, scores_accum.data(), lgamma_part);
+        } else {
+            for (size_t i = 0; i < size; ++i) {
+                scores_accum[i] += score_[i] + lgamma_fun(i);
+            }
         }
     }
 
@@ -332,12 +394,29 @@ struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
         DIST_ASSERT_EQ(score_.size(), groups.size());
         DIST_ASSERT_EQ(post_beta_.size(), groups.size());
         DIST_ASSERT_EQ(alpha_.size(), groups.size());
+        DIST_ASSERT_EQ(lgamma_cache_.size(), groups.size());
+    }
+
+    template<class Writer>
+    void binary_dump(Writer & writer) const {
+        writer.write_array(score_);
+        writer.write_array(post_beta_);
+        writer.write_array(alpha_);
+    }
+
+    template<class Reader>
+    void binary_load(Reader & reader) {
+        reader.read_array(score_);
+        reader.read_array(post_beta_);
+        reader.read_array(alpha_);
+        lgamma_cache_.resize(score_.size());
     }
 
  private:
     VectorFloat score_;
     VectorFloat post_beta_;
     VectorFloat alpha_;
+    MixtureSmallValueCache lgamma_cache_;
 };
 };  // struct BetaNegativeBinomial
 }   // namespace distributions
@@ -28,6 +28,7 @@
 #pragma once
 
 #include <vector>
+#include <utility>
 #include <distributions/common.hpp>
 #include <distributions/special.hpp>
 #include <distributions/random.hpp>
@@ -37,12 +38,32 @@
 #include <distributions/mixture.hpp>
 
 namespace distributions {
-template<int max_dim_>
+
+// Per-category storage for DirichletDiscrete: an inline array of capacity
+// max_dim, or, when max_dim == -1, a heap array sized to the runtime dim.
+template<class T, int max_dim>
+struct DirichletDiscreteArray {
+    T values[max_dim];
+
+    void resize(int dim) { DIST_ASSERT_LE(dim, max_dim); }
+    T * data() { return values; }
+    const T * data() const { return values; }
+    T & operator[] (size_t i) { return values[i]; }
+    const T & operator[] (size_t i) const { return values[i]; }
+};
+
+template<class T>
+struct DirichletDiscreteArray<T, -1> : std::vector<T> {};
+
+// max_dim == -1 selects a runtime dimension, with per-category counts of
+// type count_t_ (e.g. uint16_t for compact groups).
+template<int max_dim_, class count_t_ = int>
 struct DirichletDiscrete {
+static_assert(max_dim_ == -1 || max_dim_ > 0, "invalid dimension");
 enum { max_dim = max_dim_ };
 
-typedef DirichletDiscrete<max_dim> Model;
-typedef int count_t;
+typedef DirichletDiscrete<max_dim_, count_t_> Model;
+typedef count_t_ count_t;
 typedef int Value;
 struct Group;
 struct Scorer;
@@ -56,12 +77,12 @@ typedef FastMixture Mixture;
 
 struct Shared : SharedMixin<Model> {
     int dim;  // fixed parameter
-    float alphas[max_dim];  // hyperparamter
+    DirichletDiscreteArray<float, max_dim> alphas;  // hyperparamter
 
     template<class Message>
     void protobuf_load(const Message & message) {
         dim = message.alphas_size();
-        DIST_ASSERT_LE(dim, max_dim);
+        alphas.resize(dim);
         for (int i = 0; i < dim; ++i) {
             alphas[i] = message.alphas(i);
         }
@@ -77,8 +98,9 @@ struct Shared : SharedMixin<Model> {
 
     static Shared EXAMPLE() {
         Shared shared;
-        shared.dim = max_dim;
-        for (int i = 0; i < max_dim; ++i) {
+        shared.dim = (max_dim == -1) ? 4 : max_dim;
+        shared.alphas.resize(shared.dim);
+        for (int i = 0; i < shared.dim; ++i) {
             shared.alphas[i] = 0.5;
         }
         return shared;
@@ -88,13 +110,13 @@ struct Shared : SharedMixin<Model> {
 
 struct Group : GroupMixin<Model> {
     int dim;
-    count_t count_sum;
-    count_t counts[max_dim];
+    int count_sum;
+    DirichletDiscreteArray<count_t, max_dim> counts;
 
     template<class Message>
     void protobuf_load(const Message & message) {
         dim = message.counts_size();
-        DIST_ASSERT_LE(dim, max_dim);
+        counts.resize(dim);
         count_sum = 0;
         for (int i = 0; i < dim; ++i) {
             count_sum += counts[i] = message.counts(i);
@@ -110,11 +132,27 @@ struct Group : GroupMixin<Model> {
         }
     }
 
+    template<class Writer>
+    void binary_dump(Writer & writer) const {
+        writer.write(dim);
+        writer.write(count_sum);
+        writer.write(dim, counts.data());
+    }
+
+    template<class Reader>
+    void binary_load(Reader & reader) {
+        reader.read(dim);
+        reader.read(count_sum);
+        counts.resize(dim);
+        reader.read(dim, counts.data());
+    }
+
     void init(
             const Shared & shared,
             rng_t &) {
         dim = shared.dim;
         count_sum = 0;
+        counts.resize(dim);
         for (Value value = 0; value < dim; ++value) {
             counts[value] = 0;
         }
@@ -152,6 +190,7 @@ struct Group : GroupMixin<Model> {
             const Shared &,
             const Group & source,
             rng_t &) {
+        count_sum += source.count_sum;
         for (Value value = 0; value < dim; ++value) {
             counts[value] += source.counts[value];
         }
@@ -199,34 +238,36 @@ struct Group : GroupMixin<Model> {
 };
 
 struct Sampler {
-    float ps[max_dim];
+    DirichletDiscreteArray<float, max_dim> ps;
 
     void init(
             const Shared & shared,
             const Group & group,
             rng_t & rng) {
+        ps.resize(shared.dim);
         for (Value value = 0; value < shared.dim; ++value) {
             ps[value] = shared.alphas[value] + group.counts[value];
         }
 
-        sample_dirichlet(rng, shared.dim, ps, ps);
+        sample_dirichlet(rng, shared.dim, ps.data(), ps.data());
     }
 
     Value eval(
             const Shared & shared,
             rng_t & rng) const {
-        return sample_discrete(rng, shared.dim, ps);
+        return sample_discrete(rng, shared.dim, ps.data());
     }
 };
 
 struct Scorer {
     float alpha_sum;
-    float alphas[max_dim];
+    DirichletDiscreteArray<float, max_dim> alphas;
 
     void init(
             const Shared & shared,
             const Group & group,
             rng_t &) {
+        alphas.resize(shared.dim);
         alpha_sum = 0;
         for (Value value = 0; value < shared.dim; ++value) {
             float alpha = shared.alphas[value] + group.counts[value];
@@ -269,8 +310,8 @@ struct MixtureDataScorer
             scores_out[0] = _eval();
 
             for (size_t i = 1; i < size; ++i) {
-                const float * old_alphas = shareds[i-1].alphas;
-                const float * new_alphas = shareds[i].alphas;
+                const float * old_alphas = shareds[i-1].alphas.data();
+                const float * new_alphas = shareds[i].alphas.data();
                 for (Value value = 0; value < dim; ++value) {
                     const float & old_alpha = old_alphas[value];
                     const float & new_alpha = new_alphas[value];
@@ -454,6 +495,29 @@ struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
         DIST_ASSERT_EQ(scores_shift_.size(), groups.size());
     }
 
+    template<class Writer>
+    void binary_dump(Writer & writer) const {
+        const uint64_t dim = scores_.size();
+        writer.write(alpha_sum_);
+        writer.write(dim);
+        for (auto const & scores : scores_) {
+            writer.write_array(scores);
+        }
+        writer.write_array(scores_shift_);
+    }
+
+    template<class Reader>
+    void binary_load(Reader & reader) {
+        uint64_t dim;
+        reader.read(alpha_sum_);
+        reader.read(dim);
+        scores_.resize(dim);
+        for (auto & scores : scores_) {
+            reader.read_array(scores);
+        }
+        reader.read_array(scores_shift_);
+    }
+
  private:
     void _update_group_value(
             const Shared & shared,
@@ -470,5 +534,232 @@ struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
     std::vector<VectorFloat> scores_;
     VectorFloat scores_shift_;
 };
+
+// BlockMixture fuses many DirichletDiscrete columns that share one set of
+// groups, e.g. the low-cardinality columns of a categorical table.  Value
+// scores of all columns live in one table with an aligned row of group
+// scores per (column, value), and score shifts are summed over columns, so
+// scoring a row of category codes is one pass of contiguous vector adds.
+struct BlockMixture {
+    // groups()[column][groupid]
+    std::vector<std::vector<Group>> & groups() { return groups_; }
+    const std::vector<std::vector<Group>> & groups() const { return groups_; }
+
+    size_t column_count() const { return groups_.size(); }
+    size_t group_count() const {
+        return groups_.empty() ? 0 : groups_[0].size();
+    }
+
+    void init(
+            const std::vector<Shared> & shareds,
+            rng_t &) {
+        const size_t column_count = this->column_count();
+        const size_t group_count = this->group_count();
+        DIST_ASSERT_EQ(shareds.size(), column_count);
+
+        offsets_.resize(column_count + 1);
+        alpha_sums_.resize(column_count);
+        offsets_[0] = 0;
+        for (size_t c = 0; c < column_count; ++c) {
+            DIST_ASSERT_EQ(groups_[c].size(), group_count);
+            const Shared & shared = shareds[c];
+            offsets_[c + 1] = offsets_[c] + shared.dim;
+            float alpha_sum = 0;
+            for (Value value = 0; value < shared.dim; ++value) {
+                alpha_sum += shared.alphas[value];
+            }
+            alpha_sums_[c] = alpha_sum;
+        }
+
+        scores_.init(offsets_.back(), group_count);
+        shifts_.init(column_count, group_count);
+        shift_sums_.resize(group_count);
+        for (size_t c = 0; c < column_count; ++c) {
+            const Shared & shared = shareds[c];
+            float * shifts = shifts_.row(c);
+            for (size_t g = 0; g < group_count; ++g) {
+                const Group & group = groups_[c][g];
+                for (Value value = 0; value < shared.dim; ++value) {
+                    _scores(c, value)[g] =
+                        shared.alphas[value] + group.counts[value];
+                }
+                shifts[g] = alpha_sums_[c] + group.count_sum;
+            }
+            for (Value value = 0; value < shared.dim; ++value) {
+                vector_log(group_count, _scores(c, value));
+            }
+            vector_log(group_count, shifts);
+        }
+        for (size_t g = 0; g < group_count; ++g) {
+            _update_shift_sum(g);
+        }
+    }
+
+    void add_group(
+            const std::vector<Shared> & shareds,
+            rng_t & rng) {
+        const size_t groupid = group_count();
+        scores_.packed_add();
+        shifts_.packed_add();
+        for (size_t c = 0, size = column_count(); c < size; ++c) {
+            const Shared & shared = shareds[c];
+            groups_[c].resize(groupid + 1);
+            groups_[c].back().init(shared, rng);
+            for (Value value = 0; value < shared.dim; ++value) {
+                _scores(c, value)[groupid] = fast_log(shared.alphas[value]);
+            }
+            shifts_.row(c)[groupid] = fast_log(alpha_sums_[c]);
+        }
+        shift_sums_.packed_add(0);
+        _update_shift_sum(groupid);
+    }
+
+    void remove_group(
+            const std::vector<Shared> &,
+            size_t groupid) {
+        DIST_ASSERT1(groupid < group_count(), "bad groupid: " << groupid);
+        for (auto & groups : groups_) {
+            if (groupid != groups.size() - 1) {
+                groups[groupid] = std::move(groups.back());
+            }
+            groups.pop_back();
+        }
+        scores_.packed_remove(groupid);
+        shifts_.packed_remove(groupid);
+        shift_sums_.packed_remove(groupid);
+    }
+
+    // row is an array of column_count() category codes
+    void add_row(
+            const std::vector<Shared> & shareds,
+            size_t groupid,
+            const Value * row,
+            rng_t & rng) {
+        for (size_t c = 0, size = column_count(); c < size; ++c) {
+            groups_[c][groupid].add_value(shareds[c], row[c], rng);
+            _update_group_value(shareds[c], c, groupid, row[c]);
+        }
+        _update_shift_sum(groupid);
+    }
+
+    void remove_row(
+            const std::vector<Shared> & shareds,
+            size_t groupid,
+            const Value * row,
+            rng_t & rng) {
+        for (size_t c = 0, size = column_count(); c < size; ++c) {
+            groups_[c][groupid].remove_value(shareds[c], row[c], rng);
+            _update_group_value(shareds[c], c, groupid, row[c]);
+        }
+        _update_shift_sum(groupid);
+    }
+
+    float score_row_group(
+            const std::vector<Shared> & shareds,
+            size_t groupid,
+            const Value * row,
+            rng_t &) const {
+        float score = -shift_sums_[groupid];
+        for (size_t c = 0, size = column_count(); c < size; ++c) {
+            DIST_ASSERT1(row[c] < shareds[c].dim, "bad value: " << row[c]);
+            score += _scores(c, row[c])[groupid];
+        }
+        return score;
+    }
+
+    void score_row(
+            const std::vector<Shared> & shareds,
+            const Value * row,
+            AlignedFloats scores_accum,
+            rng_t &) const {
+        const size_t group_count = this->group_count();
+        const size_t column_count = this->column_count();
+        if (DIST_DEBUG_LEVEL >= 1) {
+            DIST_ASSERT_EQ(scores_accum.size(), group_count);
+            for (size_t c = 0; c < column_count; ++c) {
+                DIST_ASSERT_LT(row[c], shareds[c].dim);
+            }
+        }
+        if (column_count) {
+            vector_add_subtract(
+                group_count,
+                scores_accum.data(),
+                _scores(0, row[0]),
+                shift_sums_.data());
+        }
+        for (size_t c = 1; c < column_count; ++c) {
+            vector_add(group_count, scores_accum.data(), _scores(c, row[c]));
+        }
+    }
+
+    float score_data(
+            const std::vector<Shared> & shareds,
+            rng_t & rng) const {
+        MixtureDataScorer data_scorer;
+        float score = 0;
+        for (size_t c = 0, size = column_count(); c < size; ++c) {
+            score += data_scorer.score_data(shareds[c], groups_[c], rng);
+        }
+        return score;
+    }
+
+    void validate(const std::vector<Shared> & shareds) const {
+        const size_t column_count = this->column_count();
+        const size_t group_count = this->group_count();
+        DIST_ASSERT_EQ(shareds.size(), column_count);
+        DIST_ASSERT_EQ(offsets_.size(), column_count + 1);
+        scores_.validate();
+        shifts_.validate();
+        DIST_ASSERT_EQ(scores_.row_count(), offsets_.back());
+        DIST_ASSERT_EQ(scores_.group_count(), group_count);
+        DIST_ASSERT_EQ(shifts_.row_count(), column_count);
+        DIST_ASSERT_EQ(shifts_.group_count(), group_count);
+        DIST_ASSERT_EQ(shift_sums_.size(), group_count);
+        for (size_t c = 0; c < column_count; ++c) {
+            DIST_ASSERT_EQ(groups_[c].size(), group_count);
+            DIST_ASSERT_EQ(
+                offsets_[c + 1] - offsets_[c],
+                static_cast<size_t>(shareds[c].dim));
+            for (auto const & group : groups_[c]) {
+                group.validate(shareds[c]);
+            }
+        }
+    }
+
+ private:
+    float * _scores(size_t column, Value value) {
+        return scores_.row(offsets_[column] + value);
+    }
+    const float * _scores(size_t column, Value value) const {
+        return scores_.row(offsets_[column] + value);
+    }
+
+    void _update_group_value(
+            const Shared & shared,
+            size_t column,
+            size_t groupid,
+            const Value & value) {
+        const Group & group = groups_[column][groupid];
+        _scores(column, value)[groupid] =
+            fast_log(shared.alphas[value] + group.counts[value]);
+        shifts_.row(column)[groupid] =
+            fast_log(alpha_sums_[column] + group.count_sum);
+    }
+
+    void _update_shift_sum(size_t groupid) {
+        float shift_sum = 0;
+        for (size_t c = 0, size = column_count(); c < size; ++c) {
+            shift_sum += shifts_.row(c)[groupid];
+        }
+        shift_sums_[groupid] = shift_sum;
+    }
+
+    std::vector<std::vector<Group>> groups_;
+    std::vector<size_t> offsets_;
+    std::vector<float> alpha_sums_;
+    MixtureGroupTable scores_;
+    MixtureGroupTable shifts_;
+    VectorFloat shift_sums_;
+};
 };  // struct DirichletDiscrete
 }   // namespace distributions
@@ -80,22 +80,59 @@ struct Shared : SharedMixin<Model> {
         }
     }
 
-    void realize(rng_t & rng) {
-        const size_t max_size = 10000;
-        const float min_beta0 = 1e-4f;
+    // Realizes new values by truncated stick-breaking until beta0 drops to
+    // min_beta0 or betas reaches max_size, then lumps the remaining mass
+    // into one last value.  Stick fractions are drawn a block at a time by
+    // inverting the Beta(1, gamma) cdf, at one uniform per value.
+    void realize(
+            rng_t & rng,
+            size_t max_size = 10000,
+            float min_beta0 = 1e-4f) {
+        DIST_ASSERT_LT(0, max_size);
+        const size_t block_size = 256;
+        const float min_beta = MIN_BETA();
 
         Value new_value = 0;
         for (auto const & i : betas) {
             new_value = std::max(new_value, 1 + i.first);
         }
 
-        while (betas.size() < max_size - 1 and beta0 > min_beta0) {
-            add_value(new_value++, rng);
+        std::vector<float> new_betas;
+        VectorFloat fractions;
+        while (betas.size() + new_betas.size() + 1 < max_size
+                and beta0 > min_beta0) {
+            // about gamma * log(beta0 / min_beta0) values remain
+            const float expected = 1 + gamma * fast_log(beta0 / min_beta0);
+            const size_t size = std::min(
+                std::min(block_size, static_cast<size_t>(expected)),
+                max_size - 1 - betas.size() - new_betas.size());
+            fractions.resize(size);
+            for (auto & fraction : fractions) {
+                fraction = 1.f - sample_unif01(rng);
+            }
+            vector_log(size, fractions.data());
+            vector_scale(size, fractions.data(), 1.f / gamma);
+            vector_exp(size, fractions.data());
+            for (size_t i = 0; i < size and beta0 > min_beta0; ++i) {
+                const float fraction =
+                    (1.f - fractions[i] + min_beta) / (1.f + min_beta);
+                const float beta = beta0 * fraction;
+                beta0 = std::max(min_beta, beta0 - beta);
+                new_betas.push_back(beta);
+            }
         }
 
+        const size_t new_size = new_betas.size() + (beta0 > 0 ? 1 : 0);
+        betas.reserve(betas.size() + new_size);
+        counts.reserve(counts.size() + new_size);
+        for (float beta : new_betas) {
+            betas.add(new_value, beta);
+            counts.add(new_value);
+            ++new_value;
+        }
         if (beta0 > 0) {
-            add_value(new_value, rng);
-            betas.get(new_value) += beta0;
+            betas.add(new_value, beta0);
+            counts.add(new_value);
             beta0 = 0;
         }
     }
@@ -179,6 +216,31 @@ struct Group : GroupMixin<Model> {
         }
     }
 
+    template<class Writer>
+    void binary_dump(Writer & writer) const {
+        std::vector<Value> keys;
+        std::vector<count_t> values;
+        for (auto const & pair : counts) {
+            keys.push_back(pair.first);
+            values.push_back(pair.second);
+        }
+        writer.write_array(keys);
+        writer.write_array(values);
+    }
+
+    template<class Reader>
+    void binary_load(Reader & reader) {
+        std::vector<Value> keys;
+        std::vector<count_t> values;
+        reader.read_array(keys);
+        reader.read_array(values);
+        DIST_ASSERT_EQ(keys.size(), values.size());
+        counts.clear();
+        for (size_t i = 0, size = keys.size(); i < size; ++i) {
+            counts.add(keys[i], values[i]);
+        }
+    }
+
     void init(
             const Shared &,
             rng_t &) {
@@ -371,44 +433,102 @@ struct MixtureDataScorer
 
         return score;
     }
-};
 
-struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
-    void resize(const Shared & shared, size_t size) {
-        scores_shift_.resize(size);
-        for (auto const & i : shared.betas) {
-            Value value = i.first;
-            auto & entry = scores_.get_or_add(value);
-            entry.ref_count = 1;
-            entry.scores.resize(size);
-        }
-        if (scores_.size() != shared.betas.size()) {
-            for (auto i = scores_.begin(); i != scores_.end();) {
-                if (DIST_UNLIKELY(not shared.betas.contains(i->first))) {
-                    scores_.unsafe_erase(i++);
-                } else {
-                    ++i;
+    void score_data_grid(
+            const std::vector<Shared> & shareds,
+            const std::vector<Group> & groups,
+            AlignedFloats scores_out,
+            rng_t &) const {
+        DIST_ASSERT_EQ(shareds.size(), scores_out.size());
+        std::vector<Value> values;
+        VectorFloat counts;
+        VectorFloat totals;
+        for (auto const & group : groups) {
+            if (const count_t total = group.counts.get_total()) {
+                for (auto & i : group.counts) {
+                    values.push_back(i.first);
+                    counts.push_back(i.second);
                 }
+                totals.push_back(total);
+            }
+        }
+        const size_t entry_count = counts.size();
+        const size_t group_count = totals.size();
+        VectorFloat prior(entry_count);
+        VectorFloat post(entry_count);
+        VectorFloat temp(group_count);
+        for (size_t i = 0, size = shareds.size(); i < size; ++i) {
+            const Shared & shared = shareds[i];
+            const float alpha = shared.alpha;
+            float score = group_count * fast_lgamma(alpha);
+
+            for (size_t e = 0; e < entry_count; ++e) {
+                prior[e] = alpha * shared.betas.get(values[e]);
+                post[e] = prior[e] + counts[e];
+            }
+            vector_lgamma(entry_count, prior.data());
+            vector_lgamma(entry_count, post.data());
+            score += vector_sum(entry_count, post.data());
+            score -= vector_sum(entry_count, prior.data());
+
+            for (size_t g = 0; g < group_count; ++g) {
+                temp[g] = alpha + totals[g];
             }
+            vector_lgamma(group_count, temp.data());
+            score -= vector_sum(group_count, temp.data());
+
+            scores_out[i] = score;
         }
+    }
+};
 
-        _validate(shared, size);
+// MixtureValueScorer stores scores only for (value, group) pairs that have
+// been observed.  An unobserved pair scores as the prior-only row
+// log(alpha * beta) - scores_shift_[groupid], computed on demand; each
+// observed value keeps a list of (groupid, delta) corrections to that row,
+// sorted by groupid.  Memory thus scales with the number of nonzero counts
+// rather than with (vocabulary x groups).
+struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
+    void resize(const Shared &, size_t size) {
+        scores_shift_.resize(size);
+        entry_counts_.resize(size);
     }
 
     void add_group(const Shared & shared, rng_t &) {
-        const float alpha = shared.alpha;
-        for (auto & i : scores_) {
-            i.second.scores.packed_add(
-                fast_log(alpha * shared.betas.get(i.first)));
-        }
-        scores_shift_.packed_add(fast_log(alpha));
+        scores_shift_.packed_add(fast_log(shared.alpha));
+        entry_counts_.packed_add(0);
     }
 
     void remove_group(const Shared &, size_t groupid) {
-        for (auto & i : scores_) {
-            i.second.scores.packed_remove(groupid);
+        const uint32_t last = scores_shift_.size() - 1;
+        size_t to_remove = entry_counts_[groupid];
+        size_t to_move = (groupid == last) ? 0 : entry_counts_[last];
+        for (auto i = values_.begin();
+                (to_remove or to_move) and i != values_.end();) {
+            auto & entry = i->second;
+            if (to_remove) {
+                auto pos = _find(entry, groupid);
+                if (pos != entry.end() and pos->groupid == groupid) {
+                    entry.erase(pos);
+                    --to_remove;
+                }
+            }
+            if (to_move and not entry.empty() and
+                    entry.back().groupid == last) {
+                GroupScore moved = entry.back();
+                entry.pop_back();
+                moved.groupid = groupid;
+                entry.insert(_find(entry, groupid), moved);
+                --to_move;
+            }
+            if (entry.empty()) {
+                values_.unsafe_erase(i++);
+            } else {
+                ++i;
+            }
         }
         scores_shift_.packed_remove(groupid);
+        entry_counts_.packed_remove(groupid);
     }
 
     void update_group(
@@ -416,13 +536,20 @@ struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
             size_t groupid,
             const Group & group,
             rng_t &) {
+        if (entry_counts_[groupid]) {
+            _clear_group(groupid);
+        }
         const float alpha = shared.alpha;
-        for (auto & i : scores_) {
-            Value value = i.first;
-            auto & entry = i.second;
-            count_t count = group.counts.get_count(value);
-            entry.scores[groupid] =
-                fast_log(alpha * shared.betas.get(value) + count);
+        for (auto const & i : group.counts) {
+            if (i.second) {
+                const float prior = alpha * shared.betas.get(i.first);
+                auto & entry = values_.get_or_add(i.first);
+                GroupScore score = {
+                    static_cast<uint32_t>(groupid),
+                    fast_log(prior + i.second) - fast_log(prior)};
+                entry.insert(_find(entry, groupid), score);
+                ++entry_counts_[groupid];
+            }
         }
         scores_shift_[groupid] = fast_log(alpha + group.counts.get_total());
     }
@@ -434,16 +561,18 @@ struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
             const Value & value,
             rng_t &) {
         DIST_ASSERT1(value != OTHER(), "cannot add OTHER");
-        auto & entry = scores_.get_or_add(value);
-        ++entry.ref_count;
-        if (DIST_UNLIKELY(entry.ref_count == 1)) {
-            const size_t group_count = scores_shift_.size();
-            const float beta = shared.alpha * shared.betas.get(value);
-            entry.scores.resize(group_count, fast_log(beta));
-        }
-        entry.scores[groupid] = fast_log(
-            shared.alpha * shared.betas.get(value) +
-            group.counts.get_count(value));
+        const float prior = shared.alpha * shared.betas.get(value);
+        const count_t count = group.counts.get_count(value);
+        const float delta = fast_log(prior + count) - fast_log(prior);
+        auto & entry = values_.get_or_add(value);
+        auto pos = _find(entry, groupid);
+        if (DIST_LIKELY(pos != entry.end() and pos->groupid == groupid)) {
+            pos->score = delta;
+        } else {
+            GroupScore score = {static_cast<uint32_t>(groupid), delta};
+            entry.insert(pos, score);
+            ++entry_counts_[groupid];
+        }
         scores_shift_[groupid] = fast_log(
             shared.alpha + group.counts.get_total());
     }
@@ -455,14 +584,20 @@ struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
             const Value & value,
             rng_t &) {
         DIST_ASSERT1(value != OTHER(), "cannot remove OTHER");
-        auto & entry = scores_.get(value);
-        --entry.ref_count;
-        if (DIST_UNLIKELY(entry.ref_count == 0)) {
-            scores_.remove(value);
+        auto & entry = values_.get(value);
+        auto pos = _find(entry, groupid);
+        DIST_ASSERT1(
+            pos != entry.end() and pos->groupid == groupid,
+            "value " << value << " not in group " << groupid);
+        if (const count_t count = group.counts.get_count(value)) {
+            const float prior = shared.alpha * shared.betas.get(value);
+            pos->score = fast_log(prior + count) - fast_log(prior);
         } else {
-            entry.scores[groupid] = fast_log(
-                shared.alpha * shared.betas.get(value) +
-                group.counts.get_count(value));
+            entry.erase(pos);
+            --entry_counts_[groupid];
+            if (entry.empty()) {
+                values_.remove(value);
+            }
         }
         scores_shift_[groupid] = fast_log(
             shared.alpha + group.counts.get_total());
@@ -472,21 +607,40 @@ struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
             const Shared & shared,
             const std::vector<Group> & groups,
             rng_t &) {
-        _validate(shared, groups.size());
         const size_t group_count = groups.size();
         const float alpha = shared.alpha;
 
-        for (auto & i : scores_) {
-            Value value = i.first;
+        values_.clear();
+        for (size_t groupid = 0; groupid < group_count; ++groupid) {
+            entry_counts_[groupid] = 0;
+            for (auto const & i : groups[groupid].counts) {
+                if (i.second) {
+                    GroupScore score = {
+                        static_cast<uint32_t>(groupid),
+                        static_cast<float>(i.second)};
+                    values_.get_or_add(i.first).push_back(score);
+                    ++entry_counts_[groupid];
+                }
+            }
+        }
+
+        VectorFloat prior;
+        VectorFloat post;
+        for (auto & i : values_) {
             auto & entry = i.second;
-            entry.ref_count = 0;
-            const float beta = shared.betas.get(value);
-            for (size_t groupid = 0; groupid < group_count; ++groupid) {
-                auto count = groups[groupid].counts.get_count(value);
-                entry.ref_count += count;
-                entry.scores[groupid] = alpha * beta + count;
+            const size_t size = entry.size();
+            const float beta = alpha * shared.betas.get(i.first);
+            prior.resize(size);
+            post.resize(size);
+            for (size_t e = 0; e < size; ++e) {
+                prior[e] = beta;
+                post[e] = beta + entry[e].score;
+            }
+            vector_log(size, prior.data());
+            vector_log(size, post.data());
+            for (size_t e = 0; e < size; ++e) {
+                entry[e].score = post[e] - prior[e];
             }
-            vector_log(group_count, entry.scores.data());
         }
 
         for (size_t groupid = 0; groupid < group_count; ++groupid) {
@@ -494,6 +648,8 @@ struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
             scores_shift_[groupid] = alpha + total;
         }
         vector_log(group_count, scores_shift_.data());
+
+        _validate(shared, groups);
     }
 
     float score_value_group(
@@ -502,16 +658,16 @@ struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
             size_t groupid,
             const Value & value,
             rng_t &) const {
-        _validate(shared, groups.size());
+        _validate(shared, groups);
 
-        if (DIST_LIKELY(scores_.contains(value))) {
-            return scores_.get(value).scores[groupid] - scores_shift_[groupid];
+        float numer;
+        if (value == OTHER()) {
+            numer = shared.alpha * shared.beta0;
         } else {
-            float beta = (value == OTHER())
-                       ? shared.beta0
-                       : shared.betas.get(value);
-            return fast_log(shared.alpha * beta) - scores_shift_[groupid];
+            numer = shared.alpha * shared.betas.get(value)
+                  + groups[groupid].counts.get_count(value);
         }
+        return fast_log(numer) - scores_shift_[groupid];
     }
 
     void score_value(
@@ -520,61 +676,130 @@ struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
             const Value & value,
             AlignedFloats scores_accum,
             rng_t &) const {
-        _validate(shared, groups.size());
-
-        if (DIST_LIKELY(scores_.contains(value))) {
-            vector_add_subtract(
-                scores_accum.size(),
-                scores_accum.data(),
-                scores_.get(value).scores.data(),
-                scores_shift_.data());
-
-        } else {
-            float beta = (value == OTHER())
-                       ? shared.beta0
-                       : shared.betas.get(value);
-            float score = fast_log(shared.alpha * beta);
-            vector_add_subtract(
-                scores_accum.size(),
-                scores_accum.data(),
-                score,
-                scores_shift_.data());
+        _validate(shared, groups);
+
+        float beta = (value == OTHER())
+                   ? shared.beta0
+                   : shared.betas.get(value);
+        float score = fast_log(shared.alpha * beta);
+        vector_add_subtract(
+            scores_accum.size(),
+            scores_accum.data(),
+            score,
+            scores_shift_.data());
+
+        if (DIST_LIKELY(values_.contains(value))) {
+            for (auto const & i : values_.get(value)) {
+                scores_accum[i.groupid] += i.score;
+            }
         }
     }
 
-    void validate(const Shared & shared, size_t group_count) const {
-        DIST_ASSERT_LE(scores_.size(), shared.betas.size());
+    void validate(
+            const Shared & shared,
+            const std::vector<Group> & groups) const {
+        const size_t group_count = groups.size();
         DIST_ASSERT_EQ(scores_shift_.size(), group_count);
-        for (auto const & i : scores_) {
+        DIST_ASSERT_EQ(entry_counts_.size(), group_count);
+        std::vector<uint32_t> entry_counts(group_count, 0);
+        for (auto const & i : values_) {
             const Value & value = i.first;
             auto const & entry = i.second;
             DIST_ASSERT(
                 shared.betas.contains(value),
                 "missing value: " << value);
-            DIST_ASSERT_EQ(entry.scores.size(), group_count);
+            DIST_ASSERT(not entry.empty(), "empty entry: " << value);
+            for (size_t e = 0; e < entry.size(); ++e) {
+                const uint32_t groupid = entry[e].groupid;
+                DIST_ASSERT_LT(groupid, group_count);
+                if (e) {
+                    DIST_ASSERT_LT(entry[e - 1].groupid, groupid);
+                }
+                DIST_ASSERT(
+                    groups[groupid].counts.get_count(value),
+                    "value " << value << " not in group " << groupid);
+                ++entry_counts[groupid];
+            }
+        }
+        for (size_t groupid = 0; groupid < group_count; ++groupid) {
+            DIST_ASSERT_EQ(entry_counts_[groupid], entry_counts[groupid]);
         }
     }
 
-    void validate(
-            const Shared & shared,
-            const std::vector<Group> & groups) const {
-        validate(shared, groups.size());
+    template<class Writer>
+    void binary_dump(Writer & writer) const {
+        const uint64_t size = values_.size();
+        writer.write(size);
+        for (auto const & i : values_) {
+            writer.write(i.first);
+            writer.write_array(i.second);
+        }
+        writer.write_array(scores_shift_);
+    }
+
+    template<class Reader>
+    void binary_load(Reader & reader) {
+        uint64_t size;
+        reader.read(size);
+        values_.clear();
+        for (uint64_t i = 0; i < size; ++i) {
+            Value value;
+            reader.read(value);
+            reader.read_array(values_.add(value));
+        }
+        reader.read_array(scores_shift_);
+        entry_counts_.assign(scores_shift_.size(), 0);
+        for (auto const & i : values_) {
+            for (auto const & score : i.second) {
+                ++entry_counts_[score.groupid];
+            }
+        }
     }
 
  private:
-    void _validate(const Shared & shared, size_t group_count) const {
+    struct GroupScore {
+        uint32_t groupid;
+        float score;
+    };
+    typedef std::vector<GroupScore> Entry;
+
+    static Entry::iterator _find(Entry & entry, size_t groupid) {
+        return std::lower_bound(
+            entry.begin(),
+            entry.end(),
+            groupid,
+            [](const GroupScore & score, size_t groupid) {
+                return score.groupid < groupid;
+            });
+    }
+
+    void _clear_group(size_t groupid) {
+        for (auto i = values_.begin(); i != values_.end();) {
+            auto & entry = i->second;
+            auto pos = _find(entry, groupid);
+            if (pos != entry.end() and pos->groupid == groupid) {
+                entry.erase(pos);
+            }
+            if (entry.empty()) {
+                values_.unsafe_erase(i++);
+            } else {
+                ++i;
+            }
+        }
+        entry_counts_[groupid] = 0;
+    }
+
+    void _validate(
+            const Shared & shared,
+            const std::vector<Group> & groups) const {
         if (DIST_DEBUG_LEVEL >= 3) {
-            validate(shared, group_count);
+            validate(shared, groups);
         }
     }
 
-    struct CountAndScores {
-        uint32_t ref_count;
-        VectorFloat scores;
-        CountAndScores() : ref_count(0), scores() {}
-    };
-    Sparse_<Value, CountAndScores> scores_;
+    Sparse_<Value, Entry> values_;
     VectorFloat scores_shift_;
+    Packed_<uint32_t> entry_counts_;
 };
 };  // struct DirichletProcessDiscrete
 }   // namespace distributions
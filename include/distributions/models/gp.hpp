@@ -32,6 +32,7 @@
 #include <distributions/special.hpp>
 #include <distributions/random.hpp>
 #include <distributions/vector.hpp>
+#include <distributions/vector_math.hpp>
 #include <distributions/mixins.hpp>
 #include <distributions/mixture.hpp>
 
@@ -238,6 +239,44 @@ struct MixtureDataScorer
 
         return score;
     }
+
+    void score_data_grid(
+            const std::vector<Shared> & shareds,
+            const std::vector<Group> & groups,
+            AlignedFloats scores_out,
+            rng_t &) const {
+        DIST_ASSERT_EQ(shareds.size(), scores_out.size());
+        VectorFloat counts;
+        VectorFloat sums;
+        float log_prod = 0;
+        for (auto const & group : groups) {
+            if (group.count) {
+                counts.push_back(group.count);
+                sums.push_back(group.sum);
+                log_prod += group.log_prod;
+            }
+        }
+        const size_t group_count = counts.size();
+        VectorFloat post_alpha(group_count);
+        VectorFloat temp(group_count);
+        for (size_t i = 0, size = shareds.size(); i < size; ++i) {
+            const Shared & shared = shareds[i];
+            const float alpha_part = fast_lgamma(shared.alpha);
+            const float beta_part = shared.alpha * fast_log(shared.inv_beta);
+            float score = group_count * (beta_part - alpha_part) - log_prod;
+
+            for (size_t g = 0; g < group_count; ++g) {
+                post_alpha[g] = shared.alpha + sums[g];
+                temp[g] = shared.inv_beta + counts[g];
+            }
+            vector_log(group_count, temp.data());
+            score -= vector_dot(group_count, post_alpha.data(), temp.data());
+            vector_lgamma(group_count, post_alpha.data());
+            score += vector_sum(group_count, post_alpha.data());
+
+            scores_out[i] = score;
+        }
+    }
 };
 
 struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
@@ -245,18 +284,21 @@ struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
         score_.resize(size);
         post_alpha_.resize(size);
         score_coeff_.resize(size);
+        lgamma_cache_.resize(size);
     }
 
     void add_group(const Shared &, rng_t &) {
         score_.packed_add();
         post_alpha_.packed_add();
         score_coeff_.packed_add();
+        lgamma_cache_.packed_add();
     }
 
     void remove_group(const Shared &, size_t groupid) {
         score_.packed_remove(groupid);
         post_alpha_.packed_remove(groupid);
         score_coeff_.packed_remove(groupid);
+        lgamma_cache_.packed_remove(groupid);
     }
 
     void update_group(
@@ -270,6 +312,7 @@ struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
         score_[groupid] = base.score;
         post_alpha_[groupid] = base.post_alpha;
         score_coeff_[groupid] = base.score_coeff;
+        lgamma_cache_.invalidate(groupid);
     }
 
     void add_value(
@@ -306,8 +349,15 @@ struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
             size_t groupid,
             const Value & value,
             rng_t &) const {
+        auto lgamma_fun = [&](size_t i) {
+            return fast_lgamma(post_alpha_[i] + value);
+        };
+        const float lgamma_part =
+            MixtureSmallValueCache::is_cached(value)
+            ? lgamma_cache_.get(groupid, value, lgamma_fun)
+            : lgamma_fun(groupid);
         return score_[groupid]
-            + fast_lgamma(post_alpha_[groupid] + value)
+            + lgamma_part
             - fast_log_factorial(value)
             + score_coeff_[groupid] * value;
     }
@@ -325,12 +375,29 @@ struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
         DIST_ASSERT_EQ(score_.size(), groups.size());
         DIST_ASSERT_EQ(post_alpha_.size(), groups.size());
         DIST_ASSERT_EQ(score_coeff_.size(), groups.size());
+        DIST_ASSERT_EQ(lgamma_cache_.size(), groups.size());
+    }
+
+    template<class Writer>
+    void binary_dump(Writer & writer) const {
+        writer.write_array(score_);
+        writer.write_array(post_alpha_);
+        writer.write_array(score_coeff_);
+    }
+
+    template<class Reader>
+    void binary_load(Reader & reader) {
+        reader.read_array(score_);
+        reader.read_array(post_alpha_);
+        reader.read_array(score_coeff_);
+        lgamma_cache_.resize(score_.size());
     }
 
  private:
     VectorFloat score_;
     VectorFloat post_alpha_;
     VectorFloat score_coeff_;
+    MixtureSmallValueCache lgamma_cache_;
 };
 };  // struct GammaPoisson
 }   // namespace distributions
@@ -32,6 +32,7 @@
 #include <distributions/special.hpp>
 #include <distributions/random.hpp>
 #include <distributions/vector.hpp>
+#include <distributions/vector_math.hpp>
 #include <distributions/mixins.hpp>
 #include <distributions/mixture.hpp>
 
@@ -285,6 +286,61 @@ struct MixtureDataScorer
 
         return score;
     }
+
+    void score_data_grid(
+            const std::vector<Shared> & shareds,
+            const std::vector<Group> & groups,
+            AlignedFloats scores_out,
+            rng_t &) const {
+        DIST_ASSERT_EQ(shareds.size(), scores_out.size());
+        VectorFloat counts;
+        VectorFloat means;
+        VectorFloat count_times_variances;
+        float count_sum = 0;
+        for (auto const & group : groups) {
+            if (group.count) {
+                counts.push_back(group.count);
+                means.push_back(group.mean);
+                count_times_variances.push_back(group.count_times_variance);
+                count_sum += group.count;
+            }
+        }
+        const size_t group_count = counts.size();
+        VectorFloat post_kappa(group_count);
+        VectorFloat post_nu_sigmasq(group_count);
+        VectorFloat half_post_nu(group_count);
+        const float log_pi = 1.1447298858493991f;
+        for (size_t i = 0, size = shareds.size(); i < size; ++i) {
+            const Shared & shared = shareds[i];
+            const float nu_part = fast_lgamma(0.5f * shared.nu);
+            const float kappa_part = 0.5f * fast_log(shared.kappa);
+            const float nu_sigmasq = shared.nu * shared.sigmasq;
+            const float sigmasq_part = 0.5f * shared.nu * fast_log(nu_sigmasq);
+            float score = group_count * (sigmasq_part + kappa_part - nu_part)
+                        - 0.5f * log_pi * count_sum;
+
+            for (size_t g = 0; g < group_count; ++g) {
+                const float count = counts[g];
+                const float mu_1 = shared.mu - means[g];
+                post_kappa[g] = shared.kappa + count;
+                half_post_nu[g] = 0.5f * (shared.nu + count);
+                post_nu_sigmasq[g] = nu_sigmasq
+                    + count_times_variances[g]
+                    + (count * shared.kappa * mu_1 * mu_1) / post_kappa[g];
+            }
+            vector_log(group_count, post_nu_sigmasq.data());
+            score -= vector_dot(
+                group_count,
+                half_post_nu.data(),
+                post_nu_sigmasq.data());
+            vector_lgamma(group_count, half_post_nu.data());
+            score += vector_sum(group_count, half_post_nu.data());
+            vector_log(group_count, post_kappa.data());
+            score -= 0.5f * vector_sum(group_count, post_kappa.data());
+
+            scores_out[i] = score;
+        }
+    }
 };
 
 struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
@@ -377,6 +433,22 @@ struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
         DIST_ASSERT_EQ(mean_.size(), groups.size());
     }
 
+    template<class Writer>
+    void binary_dump(Writer & writer) const {
+        writer.write_array(score_);
+        writer.write_array(log_coeff_);
+        writer.write_array(precision_);
+        writer.write_array(mean_);
+    }
+
+    template<class Reader>
+    void binary_load(Reader & reader) {
+        reader.read_array(score_);
+        reader.read_array(log_coeff_);
+        reader.read_array(precision_);
+        reader.read_array(mean_);
+    }
+
  private:
     VectorFloat score_;
     VectorFloat log_coeff_;
@@ -27,6 +27,7 @@
 
 #pragma once
 
+#include <vector>
 #include <distributions/common.hpp>
 #include <distributions/special.hpp>
 #include <distributions/random.hpp>
@@ -60,6 +61,62 @@ is_symmetric_positive_definite(const Matrix &m) {
     return ldlt.isPositive();
 }
 
+// log|A| of a symmetric positive definite A, from its lower Cholesky factor
+template <typename Matrix>
+static inline float
+cholesky_log_determinant(const Matrix & L) {
+    float half_log_det = 0;
+    for (int i = 0, dim = L.rows(); i < dim; ++i) {
+        half_log_det += fast_log(L(i, i));
+    }
+    return 2.f * half_log_det;
+}
+
+// log|A| of a symmetric positive definite A.  Unlike log(A.determinant()),
+// this does not overflow float for moderate dimensions.
+template <typename Matrix>
+static inline float
+log_determinant(const Matrix & m) {
+    Eigen::LLT<Matrix> llt(m);
+    DIST_ASSERT1(llt.info() == Eigen::Success, "expected SPD matrix");
+    return cholesky_log_determinant(llt.matrixLLT());
+}
+
+// Replaces the lower Cholesky factor L of A by that of A + sigma v v^T in
+// O(dim^2) time.  Returns false, leaving L in an unspecified state, if the
+// result is not numerically positive definite.
+template <typename Matrix, typename Vector>
+static inline bool
+cholesky_rank_update(Matrix & L, Vector v, float sigma) {
+    const int dim = L.rows();
+    float beta = 1.f;
+    for (int j = 0; j < dim; ++j) {
+        const float Ljj = L(j, j);
+        const float djj = Ljj * Ljj;
+        const float wj = v(j);
+        const float swj2 = sigma * wj * wj;
+        const float gamma = djj * beta + swj2;
+        const float x = djj + swj2 / beta;
+        if (not (x > 0.f)) {
+            return false;
+        }
+        const float new_Ljj = std::sqrt(x);
+        L(j, j) = new_Ljj;
+        beta += swj2 / djj;
+
+        const int rest = dim - j - 1;
+        if (rest) {
+            v.tail(rest) -= (wj / Ljj) * L.col(j).tail(rest);
+            if (gamma != 0.f) {
+                L.col(j).tail(rest) *= new_Ljj / Ljj;
+                L.col(j).tail(rest) +=
+                    (new_Ljj * sigma * wj / gamma) * v.tail(rest);
+            }
+        }
+    }
+    return true;
+}
+
 template<int dim_ = -1>
 struct NormalInverseWishart {
 static_assert(dim_ == -1 || dim_ > 0, "invalid dimension");
@@ -72,6 +129,11 @@ typedef Vector Value;
 struct Group;
 struct Scorer;
 struct Sampler;
+struct MixtureDataScorer;
+struct MixtureValueScorer;
+typedef MixtureSlave<Model, MixtureDataScorer> SmallMixture;
+typedef MixtureSlave<Model, MixtureDataScorer, MixtureValueScorer> FastMixture;
+typedef FastMixture Mixture;
 
 struct Shared : SharedMixin<Model> {
     Vector mu;
@@ -233,6 +295,27 @@ struct Group : GroupMixin<Model> {
         }
     }
 
+    template<class Writer>
+    void binary_dump(Writer & writer) const {
+        const uint32_t dim = sum_x.size();
+        writer.write(count);
+        writer.write(dim);
+        writer.write(dim, sum_x.data());
+        writer.write(dim * dim, sum_xxT.data());
+    }
+
+    template<class Reader>
+    void binary_load(Reader & reader) {
+        uint32_t dim;
+        reader.read(count);
+        reader.read(dim);
+        Shared::check_row_or_col_size(dim);
+        sum_x.resize(dim, Eigen::NoChange);
+        sum_xxT.resize(dim, dim);
+        reader.read(dim, sum_x.data());
+        reader.read(dim * dim, sum_xxT.data());
+    }
+
     void init(
             const Shared & shared,
             rng_t &) {
@@ -299,10 +382,10 @@ struct Group : GroupMixin<Model> {
         Shared post = shared.plus_group(*this);
         const float log_pi = 1.1447298858494002;
         return lmultigamma(shared.dim(), post.nu * 0.5)
-            + shared.nu * 0.5 * fast_log(shared.psi.determinant())
+            + shared.nu * 0.5 * log_determinant(shared.psi)
             - static_cast<float>(count * shared.dim()) * 0.5 * log_pi
             - lmultigamma(shared.dim(), shared.nu * 0.5)
-            - post.nu * 0.5 * fast_log(post.psi.determinant())
+            - post.nu * 0.5 * log_determinant(post.psi)
             + static_cast<float>(shared.dim())
               * 0.5 * fast_log(shared.kappa / post.kappa);
     }
@@ -340,24 +423,268 @@ struct Sampler {
     }
 };
 
+// The posterior predictive is a multivariate Student-t.  Scorer caches the
+// posterior mean and the lower Cholesky factor of the posterior psi, and
+// keeps them current under add_value/remove_value with O(dim^2) rank-one
+// updates.  The factor is recomputed from the group's sufficient statistics
+// when a downdate loses definiteness, when the group empties, and every
+// refactor_period() updates to bound accumulated rounding error.
 struct Scorer {
-    Shared post;
+    Vector mu;
+    Matrix chol;
+    float kappa;
+    float nu;
+    float coeff;
+    float score;
+    uint32_t update_count;
+
+    Scorer() : kappa(0), nu(0), coeff(0), score(0), update_count(0) {
+        mu.setZero();
+        chol.setZero();
+    }
+
+    static uint32_t refactor_period() { return 64; }
 
     void init(
             const Shared & shared,
             const Group & group,
             rng_t &) {
-        post = shared.plus_group(group);
+        const Shared post = shared.plus_group(group);
+        Eigen::LLT<Matrix> llt(post.psi);
+        DIST_ASSERT1(llt.info() == Eigen::Success, "expected SPD matrix");
+        mu = post.mu;
+        chol = llt.matrixL();
+        kappa = post.kappa;
+        nu = post.nu;
+        update_count = 0;
+        update_score();
     }
 
-    float eval(
+    // group must already contain value
+    void add_value(
+            const Shared & shared,
+            const Group & group,
+            const Value & value,
+            rng_t & rng) {
+        if (++update_count >= refactor_period()) {
+            init(shared, group, rng);
+            return;
+        }
+        const Vector diff = value - mu;
+        if (not cholesky_rank_update(chol, diff, kappa / (kappa + 1.f))) {
+            init(shared, group, rng);
+            return;
+        }
+        mu += diff / (kappa + 1.f);
+        kappa += 1.f;
+        nu += 1.f;
+        update_score();
+    }
+
+    // group must already exclude value
+    void remove_value(
             const Shared & shared,
+            const Group & group,
             const Value & value,
+            rng_t & rng) {
+        if (group.count == 0 or ++update_count >= refactor_period()) {
+            init(shared, group, rng);
+            return;
+        }
+        const Vector diff = value - mu;
+        if (not cholesky_rank_update(chol, diff, -kappa / (kappa - 1.f))) {
+            init(shared, group, rng);
+            return;
+        }
+        mu -= diff / (kappa - 1.f);
+        kappa -= 1.f;
+        nu -= 1.f;
+        update_score();
+    }
+
+    float eval(
+            const Shared &,
+            const Value & value,
+            rng_t &) const {
+        const Vector z =
+            chol.template triangularView<Eigen::Lower>().solve(value - mu);
+        const float mahalanobis = coeff * z.squaredNorm();
+        return score - 0.5f * (nu + 1.f) * fast_log(1.f + mahalanobis);
+    }
+
+    template<class Writer>
+    void binary_dump(Writer & writer) const {
+        const uint32_t dim = mu.size();
+        writer.write(dim);
+        writer.write(dim, mu.data());
+        writer.write(dim * dim, chol.data());
+        writer.write(kappa);
+        writer.write(nu);
+        writer.write(update_count);
+    }
+
+    template<class Reader>
+    void binary_load(Reader & reader) {
+        uint32_t dim;
+        reader.read(dim);
+        Shared::check_row_or_col_size(dim);
+        mu.resize(dim, Eigen::NoChange);
+        chol.resize(dim, dim);
+        reader.read(dim, mu.data());
+        reader.read(dim * dim, chol.data());
+        reader.read(kappa);
+        reader.read(nu);
+        reader.read(update_count);
+        update_score();
+    }
+
+ private:
+    // The predictive scale matrix is psi (kappa + 1) / (kappa dof), with
+    // dof = nu - dim + 1; its dof factor cancels out of the density.
+    void update_score() {
+        const unsigned dim = mu.size();
+        const float dof = nu - static_cast<float>(dim) + 1.f;
+        const float log_pi = 1.1447298858494002;
+        coeff = kappa / (kappa + 1.f);
+        score = fast_lgamma(0.5f * (nu + 1.f))
+              - fast_lgamma(0.5f * dof)
+              - 0.5f * cholesky_log_determinant(chol)
+              - 0.5f * dim * (log_pi - fast_log(coeff));
+    }
+};
+
+struct MixtureDataScorer
+    : MixtureSlaveDataScorerMixin<Model, MixtureDataScorer> {
+    // factors the prior psi once, rather than once per group
+    float score_data(
+            const Shared & shared,
+            const std::vector<Group> & groups,
             rng_t &) const {
-        const float dof = post.nu - static_cast<float>(shared.dim()) + 1.;
-        const Matrix sigma = post.psi * (post.kappa + 1.) / (post.kappa * dof);
-        return score_mv_student_t(value, dof, post.mu, sigma);
+        const unsigned dim = shared.dim();
+        const float shared_part =
+            0.5f * shared.nu * log_determinant(shared.psi)
+            - lmultigamma(dim, 0.5f * shared.nu)
+            + 0.5f * dim * fast_log(shared.kappa);
+
+        float score = 0;
+        float data_count = 0;
+        for (auto const & group : groups) {
+            if (group.count) {
+                const Shared post = shared.plus_group(group);
+                score += shared_part
+                       + lmultigamma(dim, 0.5f * post.nu)
+                       - 0.5f * post.nu * log_determinant(post.psi)
+                       - 0.5f * dim * fast_log(post.kappa);
+                data_count += group.count;
+            }
+        }
+        const float log_pi = 1.1447298858494002;
+        score -= 0.5f * dim * log_pi * data_count;
+
+        return score;
+    }
+};
+
+struct MixtureValueScorer : MixtureSlaveValueScorerMixin<Model> {
+    void resize(const Shared &, size_t size) {
+        scorers_.resize(size);
+    }
+
+    void add_group(const Shared &, rng_t &) {
+        scorers_.packed_add();
+    }
+
+    void remove_group(const Shared &, size_t groupid) {
+        scorers_.packed_remove(groupid);
+    }
+
+    void update_group(
+            const Shared & shared,
+            size_t groupid,
+            const Group & group,
+            rng_t & rng) {
+        scorers_[groupid].init(shared, group, rng);
+    }
+
+    void add_value(
+            const Shared & shared,
+            size_t groupid,
+            const Group & group,
+            const Value & value,
+            rng_t & rng) {
+        scorers_[groupid].add_value(shared, group, value, rng);
+    }
+
+    void remove_value(
+            const Shared & shared,
+            size_t groupid,
+            const Group & group,
+            const Value & value,
+            rng_t & rng) {
+        scorers_[groupid].remove_value(shared, group, value, rng);
+    }
+
+    void update_all(
+            const Shared & shared,
+            const std::vector<Group> & groups,
+            rng_t & rng) {
+        const size_t group_count = groups.size();
+        for (size_t groupid = 0; groupid < group_count; ++groupid) {
+            update_group(shared, groupid, groups[groupid], rng);
+        }
+    }
+
+    float score_value_group(
+            const Shared & shared,
+            const std::vector<Group> &,
+            size_t groupid,
+            const Value & value,
+            rng_t & rng) const {
+        return scorers_[groupid].eval(shared, value, rng);
     }
+
+    void score_value(
+            const Shared & shared,
+            const std::vector<Group> & groups,
+            const Value & value,
+            AlignedFloats scores_accum,
+            rng_t & rng) const {
+        if (DIST_DEBUG_LEVEL >= 1) {
+            DIST_ASSERT_EQ(scores_accum.size(), groups.size());
+        }
+        const size_t group_count = groups.size();
+        for (size_t groupid = 0; groupid < group_count; ++groupid) {
+            scores_accum[groupid] += scorers_[groupid].eval(shared, value, rng);
+        }
+    }
+
+    void validate(
+            const Shared &,
+            const std::vector<Group> & groups) const {
+        DIST_ASSERT_EQ(scorers_.size(), groups.size());
+    }
+
+    template<class Writer>
+    void binary_dump(Writer & writer) const {
+        const uint64_t size = scorers_.size();
+        writer.write(size);
+        for (auto const & scorer : scorers_) {
+            scorer.binary_dump(writer);
+        }
+    }
+
+    template<class Reader>
+    void binary_load(Reader & reader) {
+        uint64_t size;
+        reader.read(size);
+        scorers_.resize(size);
+        for (auto & scorer : scorers_) {
+            scorer.binary_load(reader);
+        }
+    }
+
+ private:
+    Packed_<Scorer, Eigen::aligned_allocator<Scorer>> scorers_;
 };
 };  // struct NormalInverseWishart
 
@@ -48,6 +48,7 @@ class Sparse_ {
 
     size_t size() const { return map_.size(); }
     void clear() { map_.clear(); }
+    void reserve(size_t size) { map_.reserve(size); }
 
     bool contains(const Key & key) const {
         return map_.find(key) != map_.end();
@@ -120,6 +121,9 @@ class SparseCounter {
     typedef Value value_t;
     typedef typename map_t::const_iterator iterator;
 
+    size_t size() const { return map_.size(); }
+    void reserve(size_t size) { map_.reserve(size); }
+
     void clear() {
         map_.clear();
         total_ = 0;
@@ -164,7 +168,6 @@ class SparseCounter {
         for (auto & i : other.map_) {
             add(i.first, i.second);
         }
-        total_ += other.total_;
     }
 
     void rename(key_t old_key, key_t new_key) {
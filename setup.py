@@ -110,7 +110,7 @@ def make_extension(name):
     sources = [
         '{}.{}'.format(module.replace('.', '/'), 'pyx' if cython else 'cpp')
     ]
-    libraries = ['m']
+    libraries = ['m', 'pthread']
     if use_protobuf:
         libraries.append('protobuf')
     if name.startswith('lp'):
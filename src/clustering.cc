@@ -26,6 +26,9 @@
 // USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 #include <algorithm>
+#include <cmath>
+#include <vector>
+#include <utility>
 #include <distributions/clustering.hpp>
 #include <distributions/special.hpp>
 
@@ -62,6 +65,105 @@ std::vector<count_t> Clustering<count_t>::count_assignments(
     return counts;
 }
 
+template<class count_t>
+std::vector<count_t> Clustering<count_t>::count_assignments(
+        size_t size,
+        const count_t * assignments,
+        const count_t * weights,
+        count_t * packed_assignments,
+        std::vector<count_t> * relabel) {
+    count_t max_groupid = -1;
+    for (size_t i = 0; i < size; ++i) {
+        DIST_ASSERT1(assignments[i] >= 0, "bad groupid: " << assignments[i]);
+        max_groupid = std::max(max_groupid, assignments[i]);
+    }
+
+    // Find the set of groupids, in order.
+    std::vector<count_t> groupids;
+    const size_t dense_size = max_groupid + 1;
+    const bool dense = (dense_size <= 4 * size + 64);
+    std::vector<count_t> dense_to_packed;
+    if (dense) {
+        dense_to_packed.resize(dense_size, 0);
+        for (size_t i = 0; i < size; ++i) {
+            dense_to_packed[assignments[i]] = 1;
+        }
+        for (size_t g = 0; g < dense_size; ++g) {
+            if (dense_to_packed[g]) {
+                dense_to_packed[g] = groupids.size();
+                groupids.push_back(g);
+            }
+        }
+    } else {
+        groupids.assign(assignments, assignments + size);
+        std::sort(groupids.begin(), groupids.end());
+        groupids.erase(
+            std::unique(groupids.begin(), groupids.end()),
+            groupids.end());
+    }
+
+    // Count and relabel in a single pass.
+    std::vector<count_t> counts(groupids.size(), 0);
+    Assignments sparse_to_packed;
+    if (not dense) {
+        for (size_t g = 0; g < groupids.size(); ++g) {
+            sparse_to_packed[groupids[g]] = g;
+        }
+    }
+    for (size_t i = 0; i < size; ++i) {
+        const count_t groupid = dense
+            ? dense_to_packed[assignments[i]]
+            : sparse_to_packed[assignments[i]];
+        counts[groupid] += weights ? weights[i] : 1;
+        if (packed_assignments) {
+            packed_assignments[i] = groupid;
+        }
+    }
+
+    if (relabel) {
+        relabel->swap(groupids);
+    }
+
+    return counts;
+}
+
+template<class count_t>
+typename Clustering<count_t>::CountHistogram
+Clustering<count_t>::count_histogram(
+        size_t size,
+        const count_t * counts) {
+    // Small group sizes are tallied densely; the few large sizes are sorted.
+
+    static const count_t dense_size = 64;
+    count_t dense[dense_size] = {0};
+    std::vector<count_t> sparse;
+    for (size_t i = 0; i < size; ++i) {
+        count_t count = counts[i];
+        DIST_ASSERT1(count >= 0, "bad count: " << count);
+        if (DIST_LIKELY(count < dense_size)) {
+            ++dense[count];
+        } else {
+            sparse.push_back(count);
+        }
+    }
+
+    CountHistogram histogram;
+    for (count_t count = 0; count < dense_size; ++count) {
+        if (dense[count]) {
+            histogram.push_back(std::make_pair(count, dense[count]));
+        }
+    }
+    std::sort(sparse.begin(), sparse.end());
+    for (count_t count : sparse) {
+        if (histogram.empty() or histogram.back().first != count) {
+            histogram.push_back(std::make_pair(count, 0));
+        }
+        ++histogram.back().second;
+    }
+
+    return histogram;
+}
+
 
 // --------------------------------------------------------------------------
 // Pitman-Yor Model
@@ -141,44 +243,134 @@ std::vector<count_t> Clustering<count_t>::PitmanYor::sample_assignments(
     return assignments;
 }
 
-inline float fast_log_ratio(float numer, float denom) {
-    return fast_log(numer / denom);
-}
+namespace {
+
+// A Fenwick tree of nonnegative likelihoods supporting O(log(size))
+// append, increment, and sampling.  Sums are accumulated in double
+// precision, since totals can exceed the 2^24 limit of exact float counts.
+class LikelihoodTree {
+ public:
+    size_t size() const { return tree_.size() - 1; }
+    double total() const { return total_; }
+
+    void push_back(double likelihood) {
+        const size_t i = tree_.size();
+        double sum = likelihood;
+        for (size_t j = i - 1, stop = i - (i & -i); j > stop; j -= j & -j) {
+            sum += tree_[j];
+        }
+        tree_.push_back(sum);
+        total_ += likelihood;
+    }
+
+    void add(size_t pos, double likelihood) {
+        for (size_t i = pos + 1, size = tree_.size(); i < size; i += i & -i) {
+            tree_[i] += likelihood;
+        }
+        total_ += likelihood;
+    }
 
-inline float fast_lgamma_ratio(float start, size_t count) {
-    return fast_lgamma(start + count) - fast_lgamma(start);
+    // returns the position at which the cumulative likelihood exceeds t
+    size_t find(double t) const {
+        const size_t size = tree_.size();
+        size_t pos = 0;
+        size_t step = 1;
+        while (step * 2 < size) {
+            step *= 2;
+        }
+        for (; step; step /= 2) {
+            const size_t next = pos + step;
+            if (next < size and tree_[next] < t) {
+                t -= tree_[next];
+                pos = next;
+            }
+        }
+        return pos < size - 1 ? pos : size - 2;
+    }
+
+ private:
+    std::vector<double> tree_ = {0.0};
+    double total_ = 0.0;
+};
+
+}  // namespace
+
+template<class count_t>
+std::vector<count_t>
+Clustering<count_t>::PitmanYor::sample_assignments_sublinear(
+        count_t size,
+        rng_t & rng) const {
+    // The empty table is kept out of the tree, so that nonempty tables
+    // only ever grow: a new table is appended with likelihood 1 - d,
+    // and each subsequent customer adds 1 to their table's likelihood.
+
+    std::vector<count_t> assignments(size);
+    LikelihoodTree tables;
+    const double py_likelihood_new = 1 - d;
+
+    for (count_t i = 0; DIST_LIKELY(i < size); ++i) {
+        const count_t table_count = tables.size();
+        const double py_likelihood_empty = alpha + d * table_count;
+        double t = (tables.total() + py_likelihood_empty) * sample_unif01(rng);
+        if (DIST_UNLIKELY(t <= py_likelihood_empty or table_count == 0)) {
+            assignments[i] = table_count;
+            tables.push_back(py_likelihood_new);
+        } else {
+            count_t assign = tables.find(t - py_likelihood_empty);
+            assignments[i] = assign;
+            tables.add(assign, 1.0);
+        }
+    }
+
+    return assignments;
 }
 
 template<class count_t>
-float Clustering<count_t>::PitmanYor::score_counts(
-        const std::vector<count_t> & counts) const {
+double Clustering<count_t>::PitmanYor::_score_partition(
+        double nonempty_group_count,
+        double sample_size) const {
+    // The sequential form of score_counts telescopes to
+    //
+    //   prod_{k < K} (alpha + d k)
+    //   * prod_{groups} Gamma(count - d) / Gamma(1 - d)
+    //   / (Gamma(alpha + N) / Gamma(alpha))
+    //
+    // where K is the number of nonempty groups and N the sample size.
+    // This computes all but the per-group terms.
+
+    if (nonempty_group_count == 0) {
+        return 0.0;
+    }
+
     double score = 0.0;
-    size_t sample_size = 0;
-    size_t nonempty_group_count = 0;
+    if (d > 0) {
+        const double alpha_over_d = alpha / d;
+        score += nonempty_group_count * std::log(d)
+               + std::lgamma(alpha_over_d + nonempty_group_count)
+               - std::lgamma(alpha_over_d);
+    } else {
+        score += nonempty_group_count * std::log(alpha);
+    }
+    score -= std::lgamma(alpha + sample_size) - std::lgamma(alpha);
+    return score;
+}
 
-    for (size_t count : counts) {
+template<class count_t>
+float Clustering<count_t>::PitmanYor::score_count_histogram(
+        const CountHistogram & histogram) const {
+    double score = 0.0;
+    double sample_size = 0;
+    double nonempty_group_count = 0;
+    for (const auto & pair : histogram) {
+        const count_t count = pair.first;
+        const count_t multiplicity = pair.second;
         if (count) {
-            if (count == 1) {
-                score += fast_log_ratio(
-                    alpha + d * nonempty_group_count,
-                    alpha + sample_size);
-
-            } else if (count == 2) {
-                score += fast_log_ratio(
-                    (alpha + d * nonempty_group_count) * (1 - d),
-                    (alpha + sample_size) * (alpha + sample_size + 1));
-
-            } else {
-                score += fast_log(alpha + d * nonempty_group_count);
-                score += fast_lgamma_ratio(1 - d, count - 1);
-                score -= fast_lgamma_ratio(alpha + sample_size, count);
-            }
-
-            nonempty_group_count += 1;
-            sample_size += count;
+            score += multiplicity * _score_group(count);
+            nonempty_group_count += multiplicity;
+            sample_size += static_cast<double>(count) * multiplicity;
         }
     }
-
+    score += _score_partition(nonempty_group_count, sample_size);
     return score;
 }
 
@@ -226,27 +418,37 @@ inline float Clustering<count_t>::LowEntropy::_approximate_dataprob_correction(
 }
 
 template<class count_t>
-float Clustering<count_t>::LowEntropy::score_counts(
-        const std::vector<count_t> & counts) const {
-    float score = 0.0;
-    count_t sample_size = 0;
-    for (count_t count : counts) {
-        sample_size += count;
-        if (count > 1) {
-            score += count * fast_log(count);
-        }
-    }
+double Clustering<count_t>::LowEntropy::_score_partition(
+        count_t group_count,
+        count_t sample_size) const {
     DIST_ASSERT_LE(sample_size, dataset_size);
-
+    double score = 0.0;
     if (sample_size != dataset_size) {
         float log_factor = _approximate_postpred_correction(sample_size);
-        score += log_factor * (counts.size() - 1);
+        score += log_factor * (group_count - 1);
         score += _approximate_dataprob_correction(sample_size);
     }
     score -= log_partition_function(sample_size);
     return score;
 }
 
+template<class count_t>
+float Clustering<count_t>::LowEntropy::score_count_histogram(
+        const CountHistogram & histogram) const {
+    double score = 0.0;
+    count_t sample_size = 0;
+    count_t group_count = 0;
+    for (const auto & pair : histogram) {
+        const count_t count = pair.first;
+        const count_t multiplicity = pair.second;
+        score += multiplicity * _score_group(count);
+        sample_size += count * multiplicity;
+        group_count += multiplicity;
+    }
+    score += _score_partition(group_count, sample_size);
+    return score;
+}
+
 template<class count_t>
 std::vector<count_t> Clustering<count_t>::LowEntropy::sample_assignments(
         count_t sample_size,
@@ -25,6 +25,7 @@
 // TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
 // USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+#include <vector>
 #include <distributions/models/gp.hpp>
 #include <distributions/vector_math.hpp>
 
@@ -37,6 +38,26 @@ void GammaPoisson::MixtureValueScorer::score_value(
         rng_t &) const {
     const size_t size = scores_accum.size();
 
+    if (MixtureSmallValueCache::is_cached(value)) {
+        const float value_float = value;
+        const float * __restrict__ lgamma_part = lgamma_cache_.row(
+            value,
+            [&](size_t i) { return fast_lgamma(post_alpha_[i] + value); });
+        float * __restrict__ scores_accum_noalias =
+            VectorFloat_data(scores_accum);
+        const float * __restrict__ score = VectorFloat_data(score_);
+        const float * __restrict__ score_coeff =
+            VectorFloat_data(score_coeff_);
+        const float log_factorial_value = fast_log_factorial(value);
+        for (size_t i = 0; i < size; ++i) {
+            scores_accum_noalias[i] += score[i]
+                + lgamma_part[i]
+                - log_factorial_value
+                + score_coeff[i] * value_float;
+        }
+        return;
+    }
+
     static thread_local VectorFloat * temp_ = nullptr;
     if (DIST_UNLIKELY(not temp_)) {
         temp_ = new VectorFloat(size);  // never freed
@@ -0,0 +1,103 @@
+// Copyright (c) 2014, Salesforce.com, Inc.  All rights reserved.
+//
+// Redistribution and use in source and binary forms, with or without
+// modification, are permitted provided that the following conditions
+// are met:
+//
+// - Redistributions of source code must retain the above copyright
+//   notice, this list of conditions and the following disclaimer.
+// - Redistributions in binary form must reproduce the above copyright
+//   notice, this list of conditions and the following disclaimer in the
+//   documentation and/or other materials provided with the distribution.
+// - Neither the name of Salesforce.com nor the names of its contributors
+//   may be used to endorse or promote products derived from this
+//   software without specific prior written permission.
+//
+// THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+// "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+// LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+// FOR A PARTICULAR PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE
+// COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+// INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+// BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS
+// OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+// ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR
+// TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
+// USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#include <stdint.h>
+#include <distributions/common.hpp>
+#include <distributions/random.hpp>
+#include <distributions/vector.hpp>
+#include <distributions/models/dd.hpp>
+
+namespace distributions {
+
+// compact-count variants are not bound in python, so instantiate them here
+template struct DirichletDiscrete<-1, uint16_t>;
+template struct DirichletDiscrete<8, uint16_t>;
+
+}  // namespace distributions
+
+using namespace distributions;  // NOLINT(*)
+
+// compact counts must score exactly like the default int counts
+template<int max_dim>
+void test_compact_counts() {
+    typedef DirichletDiscrete<max_dim> Model;
+    typedef DirichletDiscrete<max_dim, uint16_t> CompactModel;
+    const size_t group_count = 3;
+    const size_t value_count = 1000;
+
+    rng_t rng;
+    const auto shared = Model::Shared::EXAMPLE();
+    typename CompactModel::Shared compact_shared;
+    compact_shared.dim = shared.dim;
+    compact_shared.alphas.resize(shared.dim);
+    for (int i = 0; i < shared.dim; ++i) {
+        compact_shared.alphas[i] = shared.alphas[i];
+    }
+
+    typename Model::Mixture mixture;
+    typename CompactModel::Mixture compact_mixture;
+    mixture.init(shared, rng);
+    compact_mixture.init(compact_shared, rng);
+    for (size_t i = 0; i < group_count; ++i) {
+        mixture.add_group(shared, rng);
+        compact_mixture.add_group(compact_shared, rng);
+    }
+
+    for (size_t i = 0; i < value_count; ++i) {
+        const size_t groupid = sample_int(rng, 0, group_count - 1);
+        const int value = sample_int(rng, 0, shared.dim - 1);
+        mixture.add_value(shared, groupid, value, rng);
+        compact_mixture.add_value(compact_shared, groupid, value, rng);
+    }
+
+    VectorFloat scores(group_count);
+    VectorFloat compact_scores(group_count);
+    for (int value = 0; value < shared.dim; ++value) {
+        scores.assign(group_count, 0);
+        compact_scores.assign(group_count, 0);
+        mixture.score_value(shared, value, scores, rng);
+        compact_mixture.score_value(
+            compact_shared,
+            value,
+            compact_scores,
+            rng);
+        for (size_t groupid = 0; groupid < group_count; ++groupid) {
+            DIST_ASSERT_EQ(compact_scores[groupid], scores[groupid]);
+        }
+    }
+    for (size_t groupid = 0; groupid < group_count; ++groupid) {
+        DIST_ASSERT_EQ(
+            compact_mixture.groups(groupid).score_data(compact_shared, rng),
+            mixture.groups(groupid).score_data(shared, rng));
+    }
+}
+
+int main() {
+    test_compact_counts<-1>();
+    test_compact_counts<8>();
+    return 0;
+}
@@ -3,6 +3,8 @@
 #include <distributions/clustering.hpp>
 #include <distributions/common.hpp>
 #include <distributions/cython.hpp>
+#include <distributions/gibbs.hpp>
+#include <distributions/io/checkpoint.hpp>
 #include <distributions/mixins.hpp>
 #include <distributions/mixture.hpp>
 #include <distributions/models/bb.hpp>